@@ -1,5 +1,6 @@
 import json
 
+import sqlparse
 from rest_framework import viewsets
 from rest_framework.response import Response
 
@@ -13,7 +14,10 @@ class DebugCHQueries(viewsets.ViewSet):
     """
 
     def list(self, request):
-        return Response(json.loads(get_safe_cache("save_query_{}".format(request.user.pk)) or "[]"))
+        queries = json.loads(get_safe_cache("save_query_{}".format(request.user.pk)) or "[]")
+        return Response(
+            [{**query, "query": sqlparse.format(query["query"], reindent_aligned=True)} for query in queries]
+        )
 
     def get(self, request):
         return Response([{"hey": "hi"}])
@@ -0,0 +1,49 @@
+from collections import defaultdict
+from typing import Any, Dict, Tuple
+
+from rest_framework import permissions, serializers, viewsets
+from rest_framework.response import Response
+
+from ee.clickhouse.client import get_slow_queries
+
+
+class SlowCHQueriesParamsSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, default=20)
+
+
+class SlowCHQueries(viewsets.ViewSet):
+    """
+    Show the slowest recent queries across all teams, and what ran them (staff only)
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        params = SlowCHQueriesParamsSerializer(data=request.GET)
+        params.is_valid(raise_exception=True)
+        limit = params.validated_data["limit"]
+        queries = get_slow_queries()
+
+        offenders: Dict[Tuple, Dict[str, Any]] = defaultdict(
+            lambda: {"count": 0, "total_execution_time": 0.0, "max_execution_time": 0.0, "rows_read": 0}
+        )
+        for query in queries:
+            offender = offenders[(query["insight"], query["call_site"], query["team_id"])]
+            offender["count"] += 1
+            offender["total_execution_time"] += query["execution_time"]
+            offender["max_execution_time"] = max(offender["max_execution_time"], query["execution_time"])
+            offender["rows_read"] += query["rows_read"]
+
+        return Response(
+            {
+                "offenders": sorted(
+                    (
+                        {"insight": insight, "call_site": call_site, "team_id": team_id, **stats}
+                        for (insight, call_site, team_id), stats in offenders.items()
+                    ),
+                    key=lambda offender: offender["total_execution_time"],
+                    reverse=True,
+                )[:limit],
+                "queries": sorted(queries, key=lambda query: query["execution_time"], reverse=True)[:limit],
+            }
+        )
@@ -1,21 +1,42 @@
 import asyncio
+import copy
 import hashlib
 import json
-from time import time
-from typing import Any, Dict, List, Tuple
+import pickle
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from time import sleep, time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import sqlparse
 import statsd
 from aioch import Client
 from asgiref.sync import async_to_sync
 from clickhouse_driver import Client as SyncClient
+from clickhouse_driver.errors import ErrorCodes, ServerException
 from clickhouse_pool import ChPool
 from django.conf import settings as app_settings
 from django.core.cache import cache
 from django.utils.timezone import now
+from rest_framework.exceptions import APIException
 from sentry_sdk.api import capture_exception
 
 from posthog import redis
+from posthog.cache_utils import TTLCache
 from posthog.constants import RDBMS
 from posthog.settings import (
     CLICKHOUSE_ASYNC,
@@ -37,10 +58,33 @@ from posthog.utils import get_safe_cache
 if STATSD_HOST is not None:
     statsd.Connection.set_defaults(host=STATSD_HOST, port=STATSD_PORT)
 
-CACHE_TTL = 60  # seconds
+CLICKHOUSE_QUERY_SLOT_LEASE = 300  # seconds a query slot is held for at most when there's no max_execution_time
+
+CACHE_TTL = 60  # seconds, for query classes without their own CLICKHOUSE_QUERY_CACHE_TTLS
+
+# Recent results, in front of Redis: (fresh until, rows)
+LOCAL_QUERY_CACHE: TTLCache[Tuple[float, Any]] = TTLCache(
+    maxsize=app_settings.CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_SIZE, ttl=app_settings.CLICKHOUSE_QUERY_CACHE_LOCAL_TTL
+)
+_LOCK_POLL_INTERVAL = 0.05  # seconds
+
+_query_executor: Optional[ThreadPoolExecutor] = None
+_query_executor_lock = threading.Lock()
 
 _save_query_user_id = False
 
+# What the queries being run are for, see `query_tags`
+_query_tags: ContextVar[Dict[str, Any]] = ContextVar("clickhouse_query_tags", default={})
+SLOW_QUERIES_KEY = "@posthog/clickhouse/slow-queries"
+_SLOW_QUERY_MAX_LENGTH = 10_000  # characters of SQL kept in the slow query log
+# Sorted sets of the queries running (with the time their slot expires), overall and per team
+RUNNING_QUERIES_KEY = "@posthog/clickhouse/running-queries"
+RUNNING_TEAM_QUERIES_KEY = "@posthog/clickhouse/running-queries/{}"
+_SLOT_POLL_INTERVAL = 0.1  # seconds
+_QUERY_LIMIT_ERROR_CODES = {ErrorCodes.TIMEOUT_EXCEEDED, ErrorCodes.MEMORY_LIMIT_EXCEEDED, ErrorCodes.TOO_MANY_ROWS}
+# Frames skipped when looking for the code that ran a query
+_CALL_SITE_SKIPPED_MODULES = {__name__, "contextlib", "functools"}
+
 if PRIMARY_DB != RDBMS.CLICKHOUSE:
     ch_client = None  # type: Client
 
@@ -50,7 +94,10 @@ if PRIMARY_DB != RDBMS.CLICKHOUSE:
     def sync_execute(query, args=None, settings=None):
         return
 
-    def cache_sync_execute(query, args=None, redis_client=None, ttl=None, settings=None):
+    def sync_execute_iter(query, args=None, settings=None):
+        return iter(())
+
+    def cache_sync_execute(query, args=None, redis_client=None, ttl=None, settings=None, query_class=None):
         return
 
 
@@ -111,19 +158,51 @@ else:
         def async_execute(query, args=None, settings=None):
             return sync_execute(query, args, settings=settings)
 
-    def cache_sync_execute(query, args=None, redis_client=None, ttl=CACHE_TTL, settings=None):
-        if not redis_client:
-            redis_client = redis.get_client()
-        key = _key_hash(query, args)
-        if redis_client.exists(key):
-            result = _deserialize(redis_client.get(key))
-            return result
-        else:
-            result = sync_execute(query, args, settings=settings)
-            redis_client.set(key, _serialize(result), ex=ttl)
-            return result
+    def cache_sync_execute(query, args=None, redis_client=None, ttl=None, settings=None, query_class=None):
+        """
+        Like `sync_execute`, with results cached for `ttl` seconds, or by default the TTL configured for
+        `query_class` in CLICKHOUSE_QUERY_CACHE_TTLS. Not cached with CLICKHOUSE_QUERY_CACHE_ENABLED off.
+        """
+        if not app_settings.CLICKHOUSE_QUERY_CACHE_ENABLED:
+            return sync_execute(query, args, settings=settings)
+        if ttl is None:
+            ttl = app_settings.CLICKHOUSE_QUERY_CACHE_TTLS.get(query_class, CACHE_TTL)
+        return _cached_execute(
+            _key_hash(query, args),
+            lambda: sync_execute(query, args, settings=settings),
+            redis_client=redis_client or redis.get_client(),
+            ttl=ttl,
+        )
 
     def sync_execute(query, args=None, settings=None):
+        """
+        Queries run with CLICKHOUSE_QUERY_LIMITS unless `settings` overrides them, or they're tagged with
+        `governed=False` (e.g. migrations and backfills). Queries run on behalf of a team (with a `team_id` query tag)
+        also wait for one of the team's and one of the cluster's query slots.
+        """
+        tags = _query_tags.get()
+        if not tags.get("governed", True):
+            return _execute(query, args, settings=settings)
+
+        limits = _query_limits(tags.get("insight"))
+        if tags.get("team_id") is None:
+            return _execute_within_limits(query, args, settings={**limits, **(settings or {})})
+        with _query_slot(tags["team_id"], lease=limits.get("max_execution_time") or CLICKHOUSE_QUERY_SLOT_LEASE):
+            return _execute_within_limits(query, args, settings={**limits, **(settings or {})})
+
+    def _execute_within_limits(query, args, settings):
+        try:
+            return _execute(query, args, settings=settings)
+        except ServerException as e:
+            if e.code not in _QUERY_LIMIT_ERROR_CODES:
+                raise
+            _governor_metrics().increment("limit_exceeded")
+            raise QueryLimitExceeded(
+                "This query would take too long or use too many resources. Try a shorter date range or "
+                "fewer events and properties."
+            ) from e
+
+    def _execute(query, args=None, settings=None):
         with ch_pool.get_client() as client:
             start_time = time()
             try:
@@ -132,6 +211,7 @@ else:
                 execution_time = time() - start_time
                 g = statsd.Gauge("%s_clickhouse_sync_execution_time" % (STATSD_PREFIX,))
                 g.send("clickhouse_sync_query_time", execution_time)
+                _record_query(client, query, args, execution_time)
                 if app_settings.SHELL_PLUS_PRINT_SQL:
                     print(format_sql(query, args))
                     print("Execution time: %.6fs" % (execution_time,))
@@ -139,28 +219,344 @@ else:
                     save_query(query, args, execution_time)
         return result
 
+    def sync_execute_iter(query, args=None, settings=None):
+        """
+        Like `sync_execute`, but yields rows as ClickHouse sends them, in blocks of up to `max_block_size` rows,
+        instead of reading the whole result into memory. Holds a `ch_pool` connection until exhausted or closed.
+
+        Runs with CLICKHOUSE_QUERY_LIMITS, like `sync_execute`, but without waiting for a query slot, as rows may be
+        read for as long as the client takes to download them. Rows read by a streaming response are read once the
+        request's query tags are gone, so re-enter them with `query_tags(**get_query_tags())` captured in the view.
+        """
+        if _query_tags.get().get("governed", True):
+            settings = {**_query_limits(_query_tags.get().get("insight")), **(settings or {})}
+        with ch_pool.get_client() as client:
+            start_time = time()
+            try:
+                yield from client.execute_iter(query, args, settings=settings)
+            except BaseException:
+                # Stopped mid-result, e.g. as the client went away, so the connection can't be reused as is
+                client.disconnect()
+                raise
+            finally:
+                _record_query(client, query, args, time() - start_time)
+
+
+class QueryLimitExceeded(APIException):
+    status_code = 429
+    default_detail = "Too many queries are running for this project, try again in a moment."
+    default_code = "query_limit_exceeded"
+
+
+def _governor_metrics() -> statsd.Counter:
+    return statsd.Counter("%s_posthog_clickhouse_governor" % (STATSD_PREFIX,))
+
+
+def _query_limits(insight: Optional[str]) -> Dict[str, int]:
+    limits = app_settings.CLICKHOUSE_QUERY_LIMITS
+    return {**limits["default"], **limits.get(insight, {})}
+
+
+@contextmanager
+def _query_slot(team_id: int, lease: float) -> Iterator[None]:
+    """
+    Holds one of the team's and one of the cluster's query slots while the block runs, waiting for up to
+    CLICKHOUSE_QUERY_QUEUE_TIMEOUT seconds for them. Slots expire after `lease` seconds, so that the ones held by
+    workers that died are freed.
+    """
+    redis_client = redis.get_client()
+    semaphores = {
+        "team": (RUNNING_TEAM_QUERIES_KEY.format(team_id), app_settings.CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_TEAM),
+        "global": (RUNNING_QUERIES_KEY, app_settings.CLICKHOUSE_MAX_CONCURRENT_QUERIES),
+    }
+    token = uuid.uuid4().hex
+    start_time = time()
+    queued = False
+    while True:
+        full = _acquire_slots(redis_client, semaphores, token, lease)
+        if full is None:
+            break
+        if not queued:
+            _governor_metrics().increment("queued_{}".format(full))
+            queued = True
+        if time() - start_time >= app_settings.CLICKHOUSE_QUERY_QUEUE_TIMEOUT:
+            _governor_metrics().increment("rejected_{}".format(full))
+            if full == "team":
+                raise QueryLimitExceeded()
+            raise QueryLimitExceeded("Too many queries are running right now, try again in a moment.")
+        sleep(_SLOT_POLL_INTERVAL)
+
+    _governor_metrics().increment("admitted")
+    if queued:
+        statsd.Timer("%s_posthog_clickhouse_governor" % (STATSD_PREFIX,)).send("queued", time() - start_time)
+    try:
+        yield
+    finally:
+        pipeline = redis_client.pipeline(transaction=False)
+        for key, _ in semaphores.values():
+            pipeline.zrem(key, token)
+        pipeline.execute()
+
+
+def _acquire_slots(redis_client, semaphores: Dict[str, Tuple[str, int]], token: str, lease: float) -> Optional[str]:
+    """Takes a slot from every semaphore, or none of them. Returns which one was full if it couldn't."""
+    current_time = time()
+    pipeline = redis_client.pipeline(transaction=True)
+    for key, _ in semaphores.values():
+        pipeline.zremrangebyscore(key, "-inf", current_time)
+        pipeline.zadd(key, {token: current_time + lease})
+        pipeline.zcard(key)
+        pipeline.expire(key, int(max(lease, CLICKHOUSE_QUERY_SLOT_LEASE)) + 1)
+    results = pipeline.execute()
+
+    for index, (name, (_, limit)) in enumerate(semaphores.items()):
+        if results[index * 4 + 2] > limit:
+            pipeline = redis_client.pipeline(transaction=False)
+            for key, _ in semaphores.values():
+                pipeline.zrem(key, token)
+            pipeline.execute()
+            return name
+    return None
+
+
+def get_running_query_count() -> int:
+    """Number of governed queries running right now, across all workers."""
+    return redis.get_client().zcount(RUNNING_QUERIES_KEY, time(), "+inf")
+
+
+@contextmanager
+def query_tags(**tags: Any) -> Iterator[None]:
+    """
+    Tags the queries run within this block, e.g. with the insight and team they are for. Tags are reported along
+    with each query's metrics and in the slow query log.
+    """
+    token = _query_tags.set({**_query_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _query_tags.reset(token)
+
+
+def tag_queries(**tags: Any) -> None:
+    """
+    Tags the queries run from now on in the current context, e.g. once a request's project is known. Within a
+    `query_tags` block, such as the one CHQueries opens for each request, tags are reset when the block ends.
+    """
+    _query_tags.set({**_query_tags.get(), **tags})
+
+
+def get_query_tags() -> Dict[str, Any]:
+    """The tags queries run with in the current context, e.g. to carry them over into a streaming response."""
+    return dict(_query_tags.get())
+
+
+def sync_execute_batch(
+    queries: Sequence[Tuple[str, Optional[Dict]]],
+    settings=None,
+    return_exceptions: bool = False,
+    query_class: Optional[str] = None,
+) -> List[Any]:
+    """
+    Runs independent queries concurrently, each on its own `ch_pool` connection, and returns their results in the
+    same order. At most CLICKHOUSE_QUERY_CONCURRENCY queries run at once per process. With `query_class`, results
+    are cached as with `cache_sync_execute`.
+
+    With `return_exceptions`, the exception of a failed query takes the place of its result instead of being raised.
+    """
+    if len(queries) > 1:
+        executor = _get_query_executor()
+        # Pool threads don't see this thread's tags nor its stack, so hand them over
+        execute = partial(_execute_with_tags, {"call_site": _call_site()}, settings=settings, query_class=query_class)
+        outcomes = [executor.submit(copy_context().run, execute, query, args).result for query, args in queries]
+    else:
+        # Not worth a thread
+        outcomes = [partial(_execute_maybe_cached, query, args, settings, query_class) for query, args in queries]
 
-def _deserialize(result_bytes: bytes) -> List[Tuple]:
-    results = []
-    for x in json.loads(result_bytes):
-        results.append(tuple(x))
+    results: List[Any] = []
+    for outcome in outcomes:
+        try:
+            results.append(outcome())
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
     return results
 
 
-def _serialize(result: Any) -> bytes:
-    return json.dumps(result).encode("utf-8")
+def _execute_with_tags(
+    tags: Dict[str, Any], query: str, args: Optional[Dict], settings=None, query_class: Optional[str] = None
+) -> Any:
+    with query_tags(**tags):
+        return _execute_maybe_cached(query, args, settings, query_class)
+
+
+def _execute_maybe_cached(query: str, args: Optional[Dict], settings, query_class: Optional[str]) -> Any:
+    if query_class is None:
+        return sync_execute(query, args, settings=settings)
+    return cache_sync_execute(query, args, settings=settings, query_class=query_class)
+
+
+def _get_query_executor() -> ThreadPoolExecutor:
+    global _query_executor
+    if _query_executor is None:
+        with _query_executor_lock:
+            if _query_executor is None:
+                _query_executor = ThreadPoolExecutor(
+                    max_workers=app_settings.CLICKHOUSE_QUERY_CONCURRENCY, thread_name_prefix="clickhouse-query"
+                )
+    return _query_executor
+
+
+def _cached_execute(key: bytes, execute: Callable[[], Any], redis_client, ttl: int) -> Any:
+    """
+    Two-tier cache: a per-process LRU in front of Redis. Only one worker computes a given key at a time (the one
+    holding its lock in Redis). Meanwhile, others serve the previous result if it's at most
+    CLICKHOUSE_QUERY_CACHE_STALE_TTL seconds old, or wait for the new one.
+    """
+    metrics = statsd.Counter("%s_posthog_clickhouse_query_cache" % (STATSD_PREFIX,))
+
+    local = LOCAL_QUERY_CACHE.get(key)
+    if local is not None:
+        metrics.increment("hit_local")
+        return copy.copy(local[1])
+
+    cached = redis_client.get(key)
+    if cached is not None:
+        fresh_until, result = _deserialize_entry(cached)
+        if fresh_until > time():
+            metrics.increment("hit")
+            _set_local(key, fresh_until, result)
+            return result
+    lock_key, token = b"lock:" + key, uuid.uuid4().hex
+    if not redis_client.set(lock_key, token, nx=True, ex=app_settings.CLICKHOUSE_QUERY_CACHE_LOCK_TIMEOUT):
+        if cached is not None:
+            metrics.increment("hit_stale")
+            metrics.increment("stampede_avoided")
+            return result
+        waited_for = _wait_for_result(key, lock_key, redis_client)
+        if waited_for is not None:
+            metrics.increment("stampede_avoided")
+            return waited_for
+    metrics.increment("miss" if cached is None else "refresh")
+
+    try:
+        with query_tags(cache_status="miss" if cached is None else "refresh"):
+            result = execute()
+        fresh_until = time() + ttl
+        redis_client.set(
+            key, _serialize(result, fresh_until), ex=ttl + app_settings.CLICKHOUSE_QUERY_CACHE_STALE_TTL,
+        )
+        _set_local(key, fresh_until, result)
+    finally:
+        if redis_client.get(lock_key) == token.encode("utf-8"):
+            redis_client.delete(lock_key)
+    return result
+
+
+def _wait_for_result(key: bytes, lock_key: bytes, redis_client) -> Optional[Any]:
+    deadline = time() + app_settings.CLICKHOUSE_QUERY_CACHE_LOCK_TIMEOUT
+    while time() < deadline:
+        sleep(_LOCK_POLL_INTERVAL)
+        cached = redis_client.get(key)
+        if cached is not None:
+            return _deserialize_entry(cached)[1]
+        if not redis_client.exists(lock_key):
+            # Whoever was computing it failed
+            return None
+    return None
+
+
+def _set_local(key: bytes, fresh_until: float, result: Any) -> None:
+    if len(result) <= app_settings.CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_ROWS and fresh_until > time():
+        LOCAL_QUERY_CACHE.set(
+            key,
+            (fresh_until, copy.copy(result)),
+            ttl=min(app_settings.CLICKHOUSE_QUERY_CACHE_LOCAL_TTL, fresh_until - time()),
+        )
+
+
+def _deserialize_entry(result_bytes: bytes) -> Tuple[float, Any]:
+    return pickle.loads(result_bytes)
+
+
+def _deserialize(result_bytes: bytes) -> Any:
+    return _deserialize_entry(result_bytes)[1]
+
+
+def _serialize(result: Any, fresh_until: float) -> bytes:
+    # Pickle keeps datetimes, tuples, UUIDs and Decimals as they came from the driver, unlike JSON
+    return pickle.dumps((fresh_until, result), protocol=pickle.HIGHEST_PROTOCOL)
 
 
 def _key_hash(query: str, args: Any) -> bytes:
-    key = hashlib.md5(query.encode("utf-8") + json.dumps(args).encode("utf-8")).digest()
+    key = hashlib.md5(query.encode("utf-8") + json.dumps(args, sort_keys=True, default=str).encode("utf-8")).digest()
     return key
 
 
-def format_sql(sql, params, colorize=True):
+def _record_query(client: SyncClient, query: str, args: Any, execution_time: float) -> None:
+    tags = _query_tags.get()
+    insight = tags.get("insight") or "unknown"
+    # Progress is what the server reported while reading, rows and bytes before any aggregation
+    progress = getattr(getattr(client, "last_query", None), "progress", None)
+    rows_read, bytes_read = getattr(progress, "rows", 0), getattr(progress, "bytes", 0)
+
+    statsd.Timer("%s_posthog_clickhouse_query" % (STATSD_PREFIX,)).send(insight, execution_time)
+    statsd.Counter("%s_posthog_clickhouse_query_rows_read" % (STATSD_PREFIX,)).increment(insight, rows_read)
+    statsd.Counter("%s_posthog_clickhouse_query_bytes_read" % (STATSD_PREFIX,)).increment(insight, bytes_read)
+    statsd.Counter("%s_posthog_clickhouse_query_cache_status" % (STATSD_PREFIX,)).increment(
+        tags.get("cache_status", "uncached")
+    )
+
+    if execution_time * 1000 >= app_settings.CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS:
+        try:
+            _log_slow_query(
+                {
+                    "timestamp": now().isoformat(),
+                    "query": _substitute_params(query, args)[:_SLOW_QUERY_MAX_LENGTH],
+                    "execution_time": execution_time,
+                    "rows_read": rows_read,
+                    "bytes_read": bytes_read,
+                    "insight": insight,
+                    "team_id": tags.get("team_id"),
+                    "route": tags.get("route"),
+                    "call_site": tags.get("call_site") or _call_site(),
+                    "cache_status": tags.get("cache_status", "uncached"),
+                }
+            )
+        except Exception as e:
+            capture_exception(e)
+
+
+def _log_slow_query(entry: Dict[str, Any]) -> None:
+    pipeline = redis.get_client().pipeline(transaction=False)
+    pipeline.lpush(SLOW_QUERIES_KEY, json.dumps(entry, default=str))
+    pipeline.ltrim(SLOW_QUERIES_KEY, 0, app_settings.CLICKHOUSE_SLOW_QUERY_LOG_SIZE - 1)
+    pipeline.execute()
+
+
+def get_slow_queries() -> List[Dict[str, Any]]:
+    """Most recent queries which took longer than CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS, newest first."""
+    return [json.loads(entry) for entry in redis.get_client().lrange(SLOW_QUERIES_KEY, 0, -1)]
+
+
+def _call_site() -> str:
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__") in _CALL_SITE_SKIPPED_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return "{}:{}".format(frame.f_globals.get("__name__"), frame.f_code.co_name)
+
+
+def _substitute_params(sql: str, params: Any) -> str:
     substitute_params = (
         ch_client.substitute_params if isinstance(ch_client, SyncClient) else ch_client._client.substitute_params
     )
-    sql = substitute_params(sql, params or {})
+    return substitute_params(sql, params or {})
+
+
+def format_sql(sql, params, colorize=True):
+    sql = _substitute_params(sql, params)
     sql = sqlparse.format(sql, reindent_aligned=True)
     if colorize:
         try:
@@ -189,7 +585,8 @@ def save_query(sql: str, params: Dict, execution_time: float) -> None:
             0,
             {
                 "timestamp": now().isoformat(),
-                "query": format_sql(sql, params, colorize=False),
+                # Formatted when shown by DebugCHQueries, not on every query
+                "query": _substitute_params(sql, params),
                 "execution_time": execution_time,
             },
         )
@@ -0,0 +1,110 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from ee.clickhouse.client import query_tags, sync_execute
+from posthog.cache_utils import TTLCache
+from posthog.models.team import Team
+from posthog.settings import CLICKHOUSE_DATABASE
+
+MATERIALIZED_COLUMN_PREFIX = "mat_"
+# Matches the expression of both the columns added here and the ones in EVENTS_TABLE_MATERIALIZED_COLUMNS
+MATERIALIZED_PROPERTY_REGEX = re.compile(r"JSONExtractRaw\(properties, '((?:[^'\\]|\\.)*)'\)")
+PROPERTY_EXPRESSION = "trim(BOTH '\"' FROM JSONExtractRaw(properties, %(property)s))"
+
+# table -> {property key: column}
+MATERIALIZED_COLUMNS_CACHE: "TTLCache[Dict[str, str]]" = TTLCache(
+    maxsize=16, ttl=settings.CLICKHOUSE_MATERIALIZED_COLUMNS_CACHE_TTL
+)
+
+
+def get_materialized_columns(table: str = "events") -> Dict[str, str]:
+    """
+    Event properties which have a column of their own in `table`, along with its name. The column holds the same
+    value as `trim(BOTH '"' FROM JSONExtractRaw(properties, key))`, without having to parse `properties`.
+    """
+    columns = MATERIALIZED_COLUMNS_CACHE.get(table)
+    if columns is None:
+        columns = {}
+        rows = sync_execute(
+            """
+            SELECT name, default_expression FROM system.columns
+            WHERE database = %(database)s AND table = %(table)s AND default_kind = 'MATERIALIZED'
+            """,
+            {"database": CLICKHOUSE_DATABASE, "table": table},
+        )
+        for name, expression in rows:
+            match = MATERIALIZED_PROPERTY_REGEX.search(expression)
+            if match:
+                columns[re.sub(r"\\(.)", r"\1", match.group(1))] = name
+        MATERIALIZED_COLUMNS_CACHE[table] = columns
+    return columns
+
+
+def get_materialized_column(property: str, table: str = "events") -> Optional[str]:
+    if not settings.CLICKHOUSE_MATERIALIZED_COLUMNS_ENABLED:
+        return None
+    return get_materialized_columns(table).get(property)
+
+
+def materialized_column_name(property: str) -> str:
+    safe_name = re.sub(r"[^a-zA-Z0-9_]", "_", property)
+    if safe_name != property:
+        # Keep keys which only differ by special characters (e.g. $browser and _browser) apart
+        safe_name += "_" + hashlib.md5(property.encode("utf-8")).hexdigest()[:6]
+    return MATERIALIZED_COLUMN_PREFIX + safe_name
+
+
+def materialize(property: str, table: str = "events") -> str:
+    """Adds a column holding `property` to `table`. Rows inserted before then compute it when read."""
+    column = materialized_column_name(property)
+    sync_execute(
+        "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} VARCHAR MATERIALIZED {expression}".format(
+            table=table, column=column, expression=PROPERTY_EXPRESSION
+        ),
+        {"property": property},
+    )
+    MATERIALIZED_COLUMNS_CACHE.pop(table)
+    return column
+
+
+def backfill_materialized_column(property: str, column: str, backfill_days: int, table: str = "events") -> None:
+    """
+    Writes `column` to disk for rows from the last `backfill_days` days, so that reading it doesn't parse
+    `properties` anymore.
+
+    Materialized columns can't be updated, so the column is turned into a DEFAULT one for the duration of the
+    mutation, which is waited for.
+    """
+    for statement, settings_ in (
+        ("ALTER TABLE {table} MODIFY COLUMN {column} VARCHAR DEFAULT {expression}", None),
+        (
+            "ALTER TABLE {table} UPDATE {column} = {column} WHERE timestamp > now() - toIntervalDay(%(days)s)",
+            {"mutations_sync": 1},
+        ),
+        ("ALTER TABLE {table} MODIFY COLUMN {column} VARCHAR MATERIALIZED {expression}", None),
+    ):
+        with query_tags(governed=False):
+            sync_execute(
+                statement.format(table=table, column=column, expression=PROPERTY_EXPRESSION),
+                {"property": property, "days": backfill_days},
+                settings=settings_,
+            )
+
+
+def get_properties_to_materialize(count: int) -> List[str]:
+    """
+    The event properties used the most in dashboard filters and breakdowns over all teams (as counted by
+    `calculate_event_property_usage`), which don't have a column yet.
+    """
+    usage: Counter = Counter()
+    for event_properties_with_usage in Team.objects.values_list("event_properties_with_usage", flat=True):
+        for item in event_properties_with_usage or []:
+            if item.get("usage_count"):
+                usage[item["key"]] += item["usage_count"]
+
+    materialized = get_materialized_columns()
+    return [key for key, _ in usage.most_common() if key not in materialized][:count]
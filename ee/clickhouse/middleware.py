@@ -1,9 +1,23 @@
+import re
+from typing import Optional
+
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse
 from loginas.utils import is_impersonated_session
 
+from posthog.constants import INSIGHT_FUNNELS, INSIGHT_PATHS, INSIGHT_RETENTION, INSIGHT_SESSIONS, INSIGHT_TRENDS
 from posthog.ee import is_ee_enabled
 
+INSIGHT_PATH_REGEX = re.compile(r"^/api/insight/([a-z_]+)/?$")
+# InsightViewSet actions
+INSIGHT_ACTIONS = {
+    "trend": INSIGHT_TRENDS,
+    "funnel": INSIGHT_FUNNELS,
+    "path": INSIGHT_PATHS,
+    "retention": INSIGHT_RETENTION,
+    "session": INSIGHT_SESSIONS,
+}
+
 
 class CHQueries(object):
     def __init__(self, get_response):
@@ -16,17 +30,32 @@ class CHQueries(object):
         then do it now.
 
         """
+        if not is_ee_enabled():
+            # Nothing to tag, and no reason to load the session user, e.g. on /capture
+            return self.get_response(request)
+
         from ee.clickhouse import client
 
-        if (
-            is_ee_enabled()
-            and request.user.pk
-            and (request.user.is_staff or is_impersonated_session(request) or settings.DEBUG)
-        ):
+        if request.user.pk and (request.user.is_staff or is_impersonated_session(request) or settings.DEBUG):
             client._save_query_user_id = request.user.pk
 
-        response: HttpResponse = self.get_response(request)
+        # API viewsets tag queries with the project they're for once the request is authenticated, see
+        # StructuredViewSetMixin.initial. Until then, it's the session user's current project, if any
+        with client.query_tags(
+            team_id=getattr(request.user, "current_team_id", None),
+            insight=_insight_from_request(request),
+            route=request.path,
+        ):
+            response: HttpResponse = self.get_response(request)
 
         client._save_query_user_id = False
 
         return response
+
+
+def _insight_from_request(request: HttpRequest) -> Optional[str]:
+    # e.g. /api/insight/funnel/ or /api/insight/trend/
+    match = INSIGHT_PATH_REGEX.match(request.path)
+    if match and match.group(1) in INSIGHT_ACTIONS:
+        return INSIGHT_ACTIONS[match.group(1)]
+    return request.GET.get("insight")
@@ -0,0 +1,17 @@
+from django.conf import settings
+from infi.clickhouse_orm import migrations
+
+from ee.clickhouse.sql.person import (
+    BACKFILL_PERSON_DISTINCT_ID_JOIN_TABLE_SQL,
+    PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL,
+    PERSON_DISTINCT_ID_JOIN_TABLE_SQL,
+)
+
+operations = []
+
+if settings.CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE:
+    operations = [
+        migrations.RunSQL(PERSON_DISTINCT_ID_JOIN_TABLE_SQL),
+        migrations.RunSQL(PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL),
+        migrations.RunSQL(BACKFILL_PERSON_DISTINCT_ID_JOIN_TABLE_SQL),
+    ]
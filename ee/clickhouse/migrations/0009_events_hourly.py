@@ -0,0 +1,8 @@
+from infi.clickhouse_orm import migrations
+
+from ee.clickhouse.sql.events_hourly import EVENTS_HOURLY_MV_SQL, EVENTS_HOURLY_TABLE_SQL
+
+operations = [
+    migrations.RunSQL(EVENTS_HOURLY_TABLE_SQL),
+    migrations.RunSQL(EVENTS_HOURLY_MV_SQL),
+]
@@ -10,7 +10,7 @@ from posthog.models.event import Selector
 
 
 def format_action_filter(
-    action: Action, prepend: str = "action", use_loop: bool = False, filter_by_team=True
+    action: Action, prepend: str = "action", use_loop: bool = False, filter_by_team=True, allow_denormalized_props=True
 ) -> Tuple[str, Dict]:
     # get action steps
     params = {"team_id": action.team.pk} if filter_by_team else {}
@@ -42,6 +42,7 @@ def format_action_filter(
                 Filter(data={"properties": step.properties}).properties,
                 team_id=action.team.pk if filter_by_team else None,
                 prepend="action_props_{}".format(action.pk),
+                allow_denormalized_props=allow_denormalized_props,
             )
             conditions.append(prop_query.replace("AND", "", 1))
             params = {**params, **prop_params}
@@ -130,11 +131,18 @@ def filter_element(filters: Dict, prepend: str = "") -> Tuple[List[str], Dict]:
     return (conditions, params)
 
 
-def format_entity_filter(entity: Entity, prepend: str = "action", filter_by_team=True) -> Tuple[str, Dict]:
+def format_entity_filter(
+    entity: Entity, prepend: str = "action", filter_by_team=True, allow_denormalized_props=True
+) -> Tuple[str, Dict]:
     if entity.type == TREND_FILTER_TYPE_ACTIONS:
         try:
             action = Action.objects.get(pk=entity.id)
-            entity_filter, params = format_action_filter(action, prepend=prepend, filter_by_team=filter_by_team)
+            entity_filter, params = format_action_filter(
+                action,
+                prepend=prepend,
+                filter_by_team=filter_by_team,
+                allow_denormalized_props=allow_denormalized_props,
+            )
         except Action.DoesNotExist:
             raise ValueError("This action does not exist")
     else:
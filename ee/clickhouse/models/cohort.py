@@ -12,6 +12,7 @@ from ee.clickhouse.sql.person import (
     GET_PERSON_IDS_BY_FILTER,
     INSERT_PERSON_STATIC_COHORT,
     PERSON_STATIC_COHORT_TABLE,
+    get_team_person_distinct_ids,
 )
 from posthog.models import Action, Cohort, Filter, Team
 
@@ -77,7 +78,9 @@ def parse_action_timestamps(days: int) -> Tuple[str, Dict[str, str]]:
 
 def format_filter_query(cohort: Cohort) -> Tuple[str, Dict[str, Any]]:
     person_query, params = format_person_query(cohort)
-    person_id_query = CALCULATE_COHORT_PEOPLE_SQL.format(query=person_query)
+    person_id_query = CALCULATE_COHORT_PEOPLE_SQL.format(
+        query=person_query, person_distinct_ids_sql=get_team_person_distinct_ids()
+    )
     return person_id_query, params
 
 
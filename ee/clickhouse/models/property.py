@@ -1,9 +1,9 @@
 from typing import Any, Dict, List, Optional, Tuple
 
-from django.conf import settings
 from django.utils import timezone
 
 from ee.clickhouse.client import sync_execute
+from ee.clickhouse.materialized_columns import get_materialized_column
 from ee.clickhouse.models.action import filter_element
 from ee.clickhouse.models.cohort import format_filter_query
 from ee.clickhouse.models.util import is_int, is_json
@@ -20,7 +20,7 @@ def parse_prop_clauses(
     team_id: Optional[int],
     prepend: str = "global",
     table_name: str = "",
-    allow_denormalized_props: bool = False,
+    allow_denormalized_props: bool = True,
     filter_test_accounts=False,
 ) -> Tuple[str, Dict]:
     final = []
@@ -43,9 +43,7 @@ def parse_prop_clauses(
                 "AND {table_name}distinct_id IN ({clause})".format(table_name=table_name, clause=person_id_query)
             )
         elif prop.type == "person":
-            filter_query, filter_params = prop_filter_json_extract(
-                prop, idx, "{}person".format(prepend), allow_denormalized_props=allow_denormalized_props
-            )
+            filter_query, filter_params = prop_filter_json_extract(prop, idx, "{}person".format(prepend))
             final.append(
                 "AND {table_name}distinct_id IN ({filter_query})".format(
                     filter_query=GET_DISTINCT_IDS_BY_PROPERTY_SQL.format(filters=filter_query), table_name=table_name
@@ -63,6 +61,7 @@ def parse_prop_clauses(
                 prepend,
                 prop_var="{}properties".format(table_name),
                 allow_denormalized_props=allow_denormalized_props,
+                table_name=table_name,
             )
 
             final.append(f"{filter_query} AND {table_name}team_id = %(team_id)s" if team_id else filter_query)
@@ -71,14 +70,21 @@ def parse_prop_clauses(
 
 
 def prop_filter_json_extract(
-    prop: Property, idx: int, prepend: str = "", prop_var: str = "properties", allow_denormalized_props: bool = False
+    prop: Property,
+    idx: int,
+    prepend: str = "",
+    prop_var: str = "properties",
+    allow_denormalized_props: bool = False,
+    table_name: str = "",
 ) -> Tuple[str, Dict[str, Any]]:
-    # Once all queries are migrated over we can get rid of allow_denormalized_props
-    is_denormalized = prop.key.lower() in settings.CLICKHOUSE_DENORMALIZED_PROPERTIES and allow_denormalized_props
+    # allow_denormalized_props is only safe for event properties read straight from the events table, as
+    # materialized columns are neither on the person table nor in subqueries selecting from events
+    materialized_column = get_materialized_column(prop.key) if allow_denormalized_props else None
+    is_denormalized = materialized_column is not None
     json_extract = "trim(BOTH '\"' FROM JSONExtractRaw({prop_var}, %(k{prepend}_{idx})s))".format(
         idx=idx, prepend=prepend, prop_var=prop_var
     )
-    denormalized = "properties_{}".format(prop.key.lower())
+    denormalized = "{}{}".format(table_name, materialized_column)
     operator = prop.operator
     params: Dict[str, Any] = {}
     if operator == "is_not":
@@ -124,22 +130,12 @@ def prop_filter_json_extract(
         )
     elif operator == "is_set":
         params = {"k{}_{}".format(prepend, idx): prop.key, "v{}_{}".format(prepend, idx): prop.value}
-        if is_denormalized:
-            return (
-                "AND NOT isNull({left})".format(left=denormalized),
-                params,
-            )
         return (
             "AND JSONHas({prop_var}, %(k{prepend}_{idx})s)".format(idx=idx, prepend=prepend, prop_var=prop_var),
             params,
         )
     elif operator == "is_not_set":
         params = {"k{}_{}".format(prepend, idx): prop.key, "v{}_{}".format(prepend, idx): prop.value}
-        if is_denormalized:
-            return (
-                "AND isNull({left})".format(left=denormalized),
-                params,
-            )
         return (
             "AND (isNull({left}) OR NOT JSONHas({prop_var}, %(k{prepend}_{idx})s))".format(
                 idx=idx, prepend=prepend, prop_var=prop_var, left=json_extract
@@ -198,17 +194,26 @@ def box_value(value: Any, remove_spaces=False) -> List[Any]:
     return [str(value).replace(" ", "") if remove_spaces else str(value) for value in value]
 
 
-def get_property_values_for_key(key: str, team: Team, value: Optional[str] = None):
+def get_property_string_expr(key: str) -> str:
+    """Event property `key` (passed as `%(key)s`) with quotes trimmed, read from its column if it has one."""
+    return get_materialized_column(key) or "trim(BOTH '\"' FROM JSONExtractRaw(properties, %(key)s))"
+
 
+def get_property_values_for_key(key: str, team: Team, value: Optional[str] = None):
+    property_field = get_property_string_expr(key)
     parsed_date_from = "AND timestamp >= '{}'".format(relative_date_parse("-7d").strftime("%Y-%m-%d 00:00:00"))
     parsed_date_to = "AND timestamp <= '{}'".format(timezone.now().strftime("%Y-%m-%d 23:59:59"))
 
     if value:
         return sync_execute(
-            SELECT_PROP_VALUES_SQL_WITH_FILTER.format(parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to),
+            SELECT_PROP_VALUES_SQL_WITH_FILTER.format(
+                parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to, property_field=property_field
+            ),
             {"team_id": team.pk, "key": key, "value": "%{}%".format(value)},
         )
     return sync_execute(
-        SELECT_PROP_VALUES_SQL.format(parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to),
+        SELECT_PROP_VALUES_SQL.format(
+            parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to, property_field=property_field
+        ),
         {"team_id": team.pk, "key": key},
     )
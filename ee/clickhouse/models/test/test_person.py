@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import List
+
+from ee.clickhouse.client import sync_execute
+from ee.clickhouse.models.person import create_person, get_persons
+from ee.clickhouse.models.property import parse_prop_clauses
+from ee.clickhouse.sql.person import get_person_distinct_id_join
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.models.filters import Filter
+from posthog.models.utils import UUIDT
+from posthog.test.base import BaseTest
+
+
+def _create_person_distinct_id(team_id: int, distinct_id: str, person_id: str, timestamp: datetime) -> None:
+    sync_execute(
+        "INSERT INTO person_distinct_id (id, distinct_id, person_id, team_id, _timestamp, _offset) VALUES",
+        [(0, distinct_id, person_id, team_id, timestamp, 0)],
+    )
+
+
+def _create_events(team_id: int, distinct_ids: List[str]) -> None:
+    sync_execute(
+        "INSERT INTO events (uuid, event, properties, timestamp, team_id, distinct_id, elements_chain, created_at, _timestamp, _offset) VALUES",
+        [
+            (
+                UUIDT(),
+                "$pageview",
+                "{}",
+                datetime(2020, 1, 1),
+                team_id,
+                distinct_id,
+                "",
+                datetime.now(),
+                datetime.now(),
+                0,
+            )
+            for distinct_id in distinct_ids
+        ],
+    )
+
+
+class TestLatestPerson(ClickhouseTestMixin, BaseTest):
+    def test_latest_version_of_person(self):
+        uuid = str(UUIDT())
+        create_person(
+            team_id=self.team.pk, uuid=uuid, properties={"email": "old@posthog.com"}, timestamp=datetime(2020, 1, 1)
+        )
+        create_person(
+            team_id=self.team.pk, uuid=uuid, properties={"email": "new@posthog.com"}, timestamp=datetime(2020, 1, 2)
+        )
+
+        persons = get_persons(self.team.pk)
+
+        self.assertEqual(len(persons), 1)
+        self.assertEqual(persons[0]["properties"], {"email": "new@posthog.com"})
+
+    def test_person_filters_match_latest_version(self):
+        uuid = str(UUIDT())
+        create_person(
+            team_id=self.team.pk, uuid=uuid, properties={"email": "old@posthog.com"}, timestamp=datetime(2020, 1, 1)
+        )
+        create_person(
+            team_id=self.team.pk, uuid=uuid, properties={"email": "new@posthog.com"}, timestamp=datetime(2020, 1, 2)
+        )
+        _create_person_distinct_id(self.team.pk, "1", uuid, datetime(2020, 1, 1))
+
+        def _distinct_ids(email):
+            filter = Filter(data={"properties": [{"key": "email", "value": email, "type": "person"}]})
+            query, params = parse_prop_clauses(filter.properties, self.team.pk)
+            return sync_execute(
+                "SELECT distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s {}".format(query), params
+            )
+
+        self.assertEqual(_distinct_ids("new@posthog.com"), [("1",)])
+        self.assertEqual(_distinct_ids("old@posthog.com"), [])
+
+    def test_distinct_id_maps_to_latest_person(self):
+        first, second = str(UUIDT()), str(UUIDT())
+        _create_person_distinct_id(self.team.pk, "1", first, datetime(2020, 1, 1))
+        _create_person_distinct_id(self.team.pk, "1", second, datetime(2020, 1, 2))
+        _create_person_distinct_id(self.team.pk, "2", first, datetime(2020, 1, 1))
+        _create_person_distinct_id(self.team.pk, "2", first, datetime(2020, 1, 1))
+        _create_events(self.team.pk, ["1", "2"])
+
+        result = sync_execute(
+            "SELECT events.distinct_id, toString(person_id) FROM events {} WHERE team_id = %(team_id)s ORDER BY distinct_id".format(
+                get_person_distinct_id_join()
+            ),
+            {"team_id": self.team.pk},
+        )
+
+        self.assertEqual(result, [("1", second), ("2", first)])
+
+    def test_person_distinct_id_join_table(self):
+        first, second = str(UUIDT()), str(UUIDT())
+        _create_person_distinct_id(self.team.pk, "1", first, datetime(2020, 1, 1))
+        _create_person_distinct_id(self.team.pk, "1", second, datetime(2020, 1, 2))
+        _create_events(self.team.pk, ["1", "2", "3"])
+
+        def _person_ids(join_type):
+            return sync_execute(
+                "SELECT distinct_id, toString(person_id) FROM events {} WHERE team_id = %(team_id)s ORDER BY distinct_id".format(
+                    get_person_distinct_id_join(join_type=join_type)
+                ),
+                {"team_id": self.team.pk},
+            )
+
+        with self._person_distinct_id_join_table():
+            # Mapped after the table got filled
+            _create_person_distinct_id(self.team.pk, "2", first, datetime(2020, 1, 1))
+            self.assertIn("joinGet", get_person_distinct_id_join())
+            inner, left = _person_ids("INNER"), _person_ids("LEFT")
+
+        self.assertEqual(inner, [("1", second), ("2", first)])
+        self.assertEqual(inner, _person_ids("INNER"))
+        self.assertEqual(left, [("1", second), ("2", first), ("3", "00000000-0000-0000-0000-000000000000")])
+        self.assertEqual(left, _person_ids("LEFT"))
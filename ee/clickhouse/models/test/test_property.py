@@ -30,7 +30,7 @@ def _create_person(**kwargs) -> Person:
 
 class TestPropFormat(ClickhouseTestMixin, BaseTest):
     def _run_query(self, filter: Filter) -> List:
-        query, params = parse_prop_clauses(filter.properties, self.team.pk, allow_denormalized_props=True)
+        query, params = parse_prop_clauses(filter.properties, self.team.pk)
         final_query = "SELECT uuid FROM events WHERE team_id = %(team_id)s {}".format(query)
         return sync_execute(final_query, {**params, "team_id": self.team.pk})
 
@@ -97,10 +97,10 @@ class TestPropFormat(ClickhouseTestMixin, BaseTest):
 
 class TestPropDenormalized(ClickhouseTestMixin, BaseTest):
     def _run_query(self, filter: Filter) -> List:
-        query, params = parse_prop_clauses(filter.properties, self.team.pk, allow_denormalized_props=True)
+        query, params = parse_prop_clauses(filter.properties, self.team.pk)
         final_query = "SELECT uuid FROM events WHERE team_id = %(team_id)s {}".format(query)
-        # Make sure we don't accidentally use json on the properties field
-        self.assertNotIn("json", final_query.lower())
+        # Make sure we don't accidentally extract from the properties field. is_set still checks the key exists
+        self.assertNotIn("jsonextract", final_query.lower())
         return sync_execute(final_query, {**params, "team_id": self.team.pk})
 
     def test_prop_event_denormalized(self):
@@ -112,26 +112,23 @@ class TestPropDenormalized(ClickhouseTestMixin, BaseTest):
             event="$pageview", team=self.team, distinct_id="whatever", properties={"test_prop": "some_val"},
         )
 
-        with self.settings(CLICKHOUSE_DENORMALIZED_PROPERTIES=["test_prop", "something_else"]):
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val"}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_not"}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_not"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_set"}],})
-            self.assertEqual(len(self._run_query(filter)), 2)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_set"}],})
+        self.assertEqual(len(self._run_query(filter)), 2)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_not_set"}],})
-            self.assertEqual(len(self._run_query(filter)), 0)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "some_val", "operator": "is_not_set"}],})
+        self.assertEqual(len(self._run_query(filter)), 0)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": "_other_", "operator": "icontains"}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "_other_", "operator": "icontains"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
-            filter = Filter(
-                data={"properties": [{"key": "test_prop", "value": "_other_", "operator": "not_icontains"}],}
-            )
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": "_other_", "operator": "not_icontains"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
     def test_prop_event_denormalized_ints(self):
         _create_event(
@@ -142,15 +139,14 @@ class TestPropDenormalized(ClickhouseTestMixin, BaseTest):
             event="$pageview", team=self.team, distinct_id="whatever", properties={"test_prop": 2},
         )
 
-        with self.settings(CLICKHOUSE_DENORMALIZED_PROPERTIES=["test_prop", "something_else"]):
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": 1, "operator": "gt"}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": 1, "operator": "gt"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": 1, "operator": "lt"}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": 1, "operator": "lt"}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
-            filter = Filter(data={"properties": [{"key": "test_prop", "value": 0}],})
-            self.assertEqual(len(self._run_query(filter)), 1)
+        filter = Filter(data={"properties": [{"key": "test_prop", "value": 0}],})
+        self.assertEqual(len(self._run_query(filter)), 1)
 
 
 @pytest.fixture
@@ -1,6 +1,6 @@
 import datetime
 import json
-from typing import Dict, Optional, Sequence
+from typing import Dict, Optional, Sequence, Tuple
 from uuid import UUID
 
 import statsd
@@ -66,7 +66,7 @@ def _capture_ee(
     event = sanitize_event_name(event)
     store_names_and_properties(team=team, event=event, properties=properties)
 
-    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)]):
+    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)], use_cache=False):
         # Catch race condition where in between getting and creating,
         # another request already created this user
         try:
@@ -189,18 +189,40 @@ def log_event(
     *,
     topics: Sequence[str],
 ) -> None:
+    log_events([(distinct_id, data, event_uuid)], ip, site_url, team_id, now, sent_at, topics=topics)
+
+
+def log_events(
+    events: Sequence[Tuple[str, dict, UUIDT]],
+    ip: Optional[str],
+    site_url: str,
+    team_id: int,
+    now: datetime.datetime,
+    sent_at: Optional[datetime.datetime],
+    *,
+    topics: Sequence[str],
+) -> None:
+    """
+    Logs the (distinct_id, data, event_uuid) events of one request to Kafka. The messages are built once, with the
+    request's data, and each topic gets all of them in a single produce_batch call.
+    """
     if settings.DEBUG:
-        print(f'Logging event {data["event"]} to Kafka topics {" and ".join(topics)}')
+        print(f'Logging {len(events)} events to Kafka topics {" and ".join(topics)}')
+    now_isoformat = now.isoformat()
+    sent_at_isoformat = sent_at.isoformat() if sent_at else ""
+    messages = [
+        {
+            "uuid": str(event_uuid),
+            "distinct_id": distinct_id,
+            "ip": ip,
+            "site_url": site_url,
+            "data": json.dumps(data),
+            "team_id": team_id,
+            "now": now_isoformat,
+            "sent_at": sent_at_isoformat,
+        }
+        for distinct_id, data, event_uuid in events
+    ]
     producer = KafkaProducer()
-    data = {
-        "uuid": str(event_uuid),
-        "distinct_id": distinct_id,
-        "ip": ip,
-        "site_url": site_url,
-        "data": json.dumps(data),
-        "team_id": team_id,
-        "now": now.isoformat(),
-        "sent_at": sent_at.isoformat() if sent_at else "",
-    }
     for topic in topics:
-        producer.produce(topic=topic, data=data)
+        producer.produce_batch(topic=topic, data=messages)
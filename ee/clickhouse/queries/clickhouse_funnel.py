@@ -6,12 +6,13 @@ from typing import Any, Dict, List, Match, Tuple
 import pytz
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import cache_sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.util import get_trunc_func_ch, parse_timestamps
+from ee.clickhouse.queries.util import get_sampling_clauses, get_trunc_func_ch, parse_timestamps, scale_sampled
 from ee.clickhouse.sql.funnels.funnel import FUNNEL_SQL
-from posthog.constants import TREND_FILTER_TYPE_ACTIONS, TRENDS_LINEAR
+from ee.clickhouse.sql.person import get_person_distinct_id_join
+from posthog.constants import INSIGHT_FUNNELS, TREND_FILTER_TYPE_ACTIONS, TRENDS_LINEAR
 from posthog.models.action import Action
 from posthog.models.entity import Entity
 from posthog.models.filters import Filter
@@ -34,9 +35,7 @@ class ClickhouseFunnel(Funnel):
         }
 
     def _build_filters(self, entity: Entity, index: int) -> str:
-        prop_filters, prop_filter_params = parse_prop_clauses(
-            entity.properties, self._team.pk, prepend=str(index), allow_denormalized_props=True
-        )
+        prop_filters, prop_filter_params = parse_prop_clauses(entity.properties, self._team.pk, prepend=str(index))
         self.params.update(prop_filter_params)
         if entity.properties:
             return prop_filters
@@ -59,12 +58,17 @@ class ClickhouseFunnel(Funnel):
             content_sql = "event = '{event}' {filters}".format(event=entity.id, filters=filters)
         return content_sql
 
+    def _sample_filter(self) -> str:
+        # Funnels follow each person from step to step, so persons are sampled rather than events
+        _, sample_filter, sample_params = get_sampling_clauses(self._filter, table="events.", by_person=True)
+        self.params.update(sample_params)
+        return sample_filter
+
     def _exec_query(self) -> List[Tuple]:
         prop_filters, prop_filter_params = parse_prop_clauses(
             self._filter.properties,
             self._team.pk,
             prepend="global",
-            allow_denormalized_props=True,
             filter_test_accounts=self._filter.filter_test_accounts,
         )
 
@@ -84,15 +88,16 @@ class ClickhouseFunnel(Funnel):
         query = FUNNEL_SQL.format(
             team_id=self._team.id,
             steps=", ".join(steps),
-            filters=prop_filters.replace("uuid IN", "events.uuid IN", 1),
+            filters=prop_filters.replace("uuid IN", "events.uuid IN", 1) + self._sample_filter(),
             parsed_date_from=parsed_date_from,
             parsed_date_to=parsed_date_to,
             top_level_groupby="",
             extra_select="",
             extra_groupby="",
             within_time="6048000000000000",
+            person_join=get_person_distinct_id_join(),
         )
-        return sync_execute(query, self.params)
+        return cache_sync_execute(query, self.params, query_class=INSIGHT_FUNNELS)
 
     def _get_trends(self) -> List[Dict[str, Any]]:
         serialized: Dict[str, Any] = {"count": 0, "data": [], "days": [], "labels": []}
@@ -100,7 +105,6 @@ class ClickhouseFunnel(Funnel):
             self._filter.properties,
             self._team.pk,
             prepend="global",
-            allow_denormalized_props=True,
             filter_test_accounts=self._filter.filter_test_accounts,
         )
         parsed_date_from, parsed_date_to, _ = parse_timestamps(
@@ -111,15 +115,16 @@ class ClickhouseFunnel(Funnel):
         funnel_query = FUNNEL_SQL.format(
             team_id=self._team.id,
             steps=", ".join(steps),
-            filters=prop_filters.replace("uuid IN", "events.uuid IN", 1),
+            filters=prop_filters.replace("uuid IN", "events.uuid IN", 1) + self._sample_filter(),
             parsed_date_from=parsed_date_from,
             parsed_date_to=parsed_date_to,
             top_level_groupby=", date",
             extra_select="{}(timestamp) as date,".format(get_trunc_func_ch(self._filter.interval)),
             extra_groupby=",{}(timestamp)".format(get_trunc_func_ch(self._filter.interval)),
             within_time="86400000000",
+            person_join=get_person_distinct_id_join(),
         )
-        results = sync_execute(funnel_query, self.params)
+        results = cache_sync_execute(funnel_query, self.params, query_class=INSIGHT_FUNNELS)
         parsed_results = []
 
         for result in results:
@@ -189,6 +194,8 @@ class ClickhouseFunnel(Funnel):
             if len(result_step) > 0:
                 total_people += result_step[0][1]
                 relevant_people += result_step[0][2]
-            steps.append(self._serialize_step(step, total_people, relevant_people[0:100]))
+            steps.append(
+                self._serialize_step(step, round(scale_sampled(total_people, self._filter)), relevant_people[0:100])
+            )
 
         return steps[::-1]  #  reverse
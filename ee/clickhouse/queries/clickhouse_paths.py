@@ -2,12 +2,13 @@ from typing import Dict, List, Optional
 
 from django.utils import timezone
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import cache_sync_execute
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.util import parse_timestamps
 from ee.clickhouse.sql.events import EXTRACT_TAG_REGEX, EXTRACT_TEXT_REGEX
 from ee.clickhouse.sql.paths.path import PATHS_QUERY_FINAL
-from posthog.constants import AUTOCAPTURE_EVENT, CUSTOM_EVENT, SCREEN_EVENT
+from ee.clickhouse.sql.person import get_person_distinct_id_join
+from posthog.constants import AUTOCAPTURE_EVENT, CUSTOM_EVENT, INSIGHT_PATHS, SCREEN_EVENT
 from posthog.models.filters import Filter
 from posthog.models.filters.path_filter import PathFilter
 from posthog.models.team import Team
@@ -73,6 +74,7 @@ class ClickhousePaths(Paths):
             excess_row_filter=excess_row_filter,
             select_elements_chain=", events.elements_chain as elements_chain" if event == AUTOCAPTURE_EVENT else "",
             group_by_elements_chain=", events.elements_chain" if event == AUTOCAPTURE_EVENT else "",
+            person_join=get_person_distinct_id_join(),
         )
 
         params: Dict = {
@@ -83,7 +85,7 @@ class ClickhousePaths(Paths):
         }
         params = {**params, **prop_filter_params}
 
-        rows = sync_execute(paths_query, params)
+        rows = cache_sync_execute(paths_query, params, query_class=INSIGHT_PATHS)
 
         resp: List[Dict[str, str]] = []
         for row in rows:
@@ -2,11 +2,12 @@ from typing import Any, Dict, Tuple
 
 from django.db.models.query import Prefetch
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import cache_sync_execute, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.person import ClickhousePersonSerializer, get_persons_by_uuids
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.util import get_trunc_func_ch
+from ee.clickhouse.queries.util import get_sampling_clauses, get_trunc_func_ch, scale_sampled
+from ee.clickhouse.sql.person import get_person_distinct_id_join
 from ee.clickhouse.sql.retention.people_in_period import (
     DEFAULT_REFERENCE_EVENT_PEOPLE_PER_PERIOD_SQL,
     DEFAULT_REFERENCE_EVENT_UNIQUE_PEOPLE_PER_PERIOD_SQL,
@@ -21,7 +22,13 @@ from ee.clickhouse.sql.retention.retention import (
     RETENTION_PEOPLE_SQL,
     RETENTION_SQL,
 )
-from posthog.constants import RETENTION_FIRST_TIME, TREND_FILTER_TYPE_ACTIONS, TREND_FILTER_TYPE_EVENTS, TRENDS_LINEAR
+from posthog.constants import (
+    INSIGHT_RETENTION,
+    RETENTION_FIRST_TIME,
+    TREND_FILTER_TYPE_ACTIONS,
+    TREND_FILTER_TYPE_EVENTS,
+    TRENDS_LINEAR,
+)
 from posthog.models.action import Action
 from posthog.models.entity import Entity
 from posthog.models.filters import Filter, RetentionFilter
@@ -36,6 +43,10 @@ class ClickhouseRetention(Retention):
         prop_filters, prop_filter_params = parse_prop_clauses(
             filter.properties, team.pk, filter_test_accounts=filter.filter_test_accounts
         )
+        # Retention follows each person over time, so persons are sampled rather than events
+        _, sample_filter, sample_params = get_sampling_clauses(filter, table="e.", by_person=True)
+        prop_filters += sample_filter
+        prop_filter_params = {**prop_filter_params, **sample_params}
         target_entity = filter.target_entity
         returning_entity = filter.returning_entity
         is_first_time_retention = filter.retention_type == RETENTION_FIRST_TIME
@@ -53,7 +64,10 @@ class ClickhouseRetention(Retention):
         returning_query_formatted = "AND {returning_query}".format(returning_query=returning_query)
 
         reference_event_sql = (REFERENCE_EVENT_UNIQUE_SQL if is_first_time_retention else REFERENCE_EVENT_SQL).format(
-            target_query=target_query_formatted, filters=prop_filters, trunc_func=trunc_func,
+            target_query=target_query_formatted,
+            filters=prop_filters,
+            trunc_func=trunc_func,
+            person_join=get_person_distinct_id_join("e"),
         )
 
         target_condition, _ = self._get_condition(target_entity, table="reference_event")
@@ -61,7 +75,7 @@ class ClickhouseRetention(Retention):
             target_condition = target_condition.replace("reference_event.uuid", "reference_event.min_uuid")
             target_condition = target_condition.replace("reference_event.event", "reference_event.min_event")
         returning_condition, _ = self._get_condition(returning_entity, table="event", prepend="returning")
-        result = sync_execute(
+        result = cache_sync_execute(
             RETENTION_SQL.format(
                 target_query=target_query_formatted,
                 returning_query=returning_query_formatted,
@@ -71,6 +85,7 @@ class ClickhouseRetention(Retention):
                 reference_event_sql=reference_event_sql,
                 target_condition=target_condition,
                 returning_condition=returning_condition,
+                person_join=get_person_distinct_id_join("e"),
             ),
             {
                 "team_id": team.pk,
@@ -91,9 +106,10 @@ class ClickhouseRetention(Retention):
                 **returning_params,
                 "period": period,
             },
+            query_class=INSIGHT_RETENTION,
         )
 
-        initial_interval_result = sync_execute(
+        initial_interval_result = cache_sync_execute(
             INITIAL_INTERVAL_SQL.format(reference_event_sql=reference_event_sql, trunc_func=trunc_func,),
             {
                 "team_id": team.pk,
@@ -114,14 +130,17 @@ class ClickhouseRetention(Retention):
                 **returning_params,
                 "period": period,
             },
+            query_class=INSIGHT_RETENTION,
         )
 
         result_dict = {}
         for initial_res in initial_interval_result:
-            result_dict.update({(initial_res[0], 0): {"count": initial_res[1], "people": []}})
+            result_dict.update(
+                {(initial_res[0], 0): {"count": round(scale_sampled(initial_res[1], filter)), "people": []}}
+            )
 
         for res in result:
-            result_dict.update({(res[0], res[1]): {"count": res[2], "people": []}})
+            result_dict.update({(res[0], res[1]): {"count": round(scale_sampled(res[2], filter)), "people": []}})
 
         return result_dict
 
@@ -151,7 +170,10 @@ class ClickhouseRetention(Retention):
         return_query_formatted = "AND {return_query}".format(return_query=return_query)
 
         reference_event_query = (REFERENCE_EVENT_UNIQUE_SQL if is_first_time_retention else REFERENCE_EVENT_SQL).format(
-            target_query=target_query_formatted, filters=prop_filters, trunc_func=trunc_func,
+            target_query=target_query_formatted,
+            filters=prop_filters,
+            trunc_func=trunc_func,
+            person_join=get_person_distinct_id_join("e"),
         )
         reference_date_from = filter.date_from
         reference_date_to = filter.date_from + filter.period_increment
@@ -160,7 +182,10 @@ class ClickhouseRetention(Retention):
 
         result = sync_execute(
             RETENTION_PEOPLE_SQL.format(
-                reference_event_query=reference_event_query, target_query=return_query_formatted, filters=prop_filters
+                reference_event_query=reference_event_query,
+                target_query=return_query_formatted,
+                filters=prop_filters,
+                person_join=get_person_distinct_id_join("e"),
             ),
             {
                 "team_id": team.pk,
@@ -203,12 +228,22 @@ class ClickhouseRetention(Retention):
             REFERENCE_EVENT_UNIQUE_PEOPLE_PER_PERIOD_SQL
             if is_first_time_retention
             else REFERENCE_EVENT_PEOPLE_PER_PERIOD_SQL
-        ).format(target_query=target_query_formatted, filters=prop_filters, trunc_func=trunc_func,)
+        ).format(
+            target_query=target_query_formatted,
+            filters=prop_filters,
+            trunc_func=trunc_func,
+            person_join=get_person_distinct_id_join("e"),
+        )
         default_event_query = (
             DEFAULT_REFERENCE_EVENT_UNIQUE_PEOPLE_PER_PERIOD_SQL
             if is_first_time_retention
             else DEFAULT_REFERENCE_EVENT_PEOPLE_PER_PERIOD_SQL
-        ).format(target_query=target_query_formatted, filters=prop_filters, trunc_func=trunc_func,)
+        ).format(
+            target_query=target_query_formatted,
+            filters=prop_filters,
+            trunc_func=trunc_func,
+            person_join=get_person_distinct_id_join("e"),
+        )
 
         date_from = filter.date_from + filter.selected_interval * filter.period_increment
         date_to = filter.date_to
@@ -222,6 +257,7 @@ class ClickhouseRetention(Retention):
                 first_event_sql=first_event_sql,
                 first_event_default_sql=default_event_query,
                 trunc_func=trunc_func,
+                person_join=get_person_distinct_id_join("e"),
             ),
             {
                 "team_id": team.pk,
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
 from django.db.models.expressions import F
@@ -7,7 +7,7 @@ from django.utils import timezone
 from rest_framework.utils.serializer_helpers import ReturnDict
 from sentry_sdk.api import capture_exception
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import sync_execute, sync_execute_batch
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.person import ClickhousePersonSerializer
 from ee.clickhouse.models.property import parse_prop_clauses
@@ -17,6 +17,7 @@ from ee.clickhouse.sql.person import (
     INSERT_COHORT_ALL_PEOPLE_SQL,
     PEOPLE_SQL,
     PERSON_STATIC_COHORT_TABLE,
+    get_person_distinct_id_join,
 )
 from ee.clickhouse.sql.stickiness.stickiness import STICKINESS_SQL
 from ee.clickhouse.sql.stickiness.stickiness_actions import STICKINESS_ACTIONS_SQL
@@ -27,12 +28,20 @@ from posthog.models.cohort import Cohort
 from posthog.models.entity import Entity
 from posthog.models.filters.stickiness_filter import StickinessFilter
 from posthog.models.team import Team
+from posthog.queries.base import convert_to_comparison, determine_compared_filter
 from posthog.queries.stickiness import Stickiness
 
 
 class ClickhouseStickiness(Stickiness):
     def stickiness(self, entity: Entity, filter: StickinessFilter, team_id: int) -> Dict[str, Any]:
-
+        query = self._stickiness_query(entity, filter, team_id)
+        if query is None:
+            return {}
+        return self.process_result(sync_execute(*query), filter)
+
+    def _stickiness_query(
+        self, entity: Entity, filter: StickinessFilter, team_id: int
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
         parsed_date_from, parsed_date_to, _ = parse_timestamps(filter=filter, team_id=team_id)
         prop_filters, prop_filter_params = parse_prop_clauses(filter.properties, team_id)
         trunc_func = get_trunc_func_ch(filter.interval)
@@ -43,7 +52,7 @@ class ClickhouseStickiness(Stickiness):
             action = Action.objects.get(pk=entity.id)
             action_query, action_params = format_action_filter(action)
             if action_query == "":
-                return {}
+                return None
 
             params = {**params, **action_params}
             content_sql = STICKINESS_ACTIONS_SQL.format(
@@ -53,6 +62,7 @@ class ClickhouseStickiness(Stickiness):
                 parsed_date_to=parsed_date_to,
                 filters=prop_filters,
                 trunc_func=trunc_func,
+                person_join=get_person_distinct_id_join(join_type="LEFT"),
             )
         else:
             content_sql = STICKINESS_SQL.format(
@@ -62,10 +72,39 @@ class ClickhouseStickiness(Stickiness):
                 parsed_date_to=parsed_date_to,
                 filters=prop_filters,
                 trunc_func=trunc_func,
+                person_join=get_person_distinct_id_join(join_type="LEFT"),
             )
 
-        counts = sync_execute(content_sql, params)
-        return self.process_result(counts, filter)
+        return content_sql, params
+
+    def run(self, filter: StickinessFilter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
+        for entity in filter.entities:
+            if entity.type == TREND_FILTER_TYPE_ACTIONS:
+                entity.name = Action.objects.only("name").get(team=team, pk=entity.id).name
+
+        # Same as handle_compare for each entity, with all queries (compared ones included) run at once
+        filters = [filter]
+        if filter.compare:
+            filters.append(determine_compared_filter(filter))
+        queries = [(query_filter, entity) for query_filter in filters for entity in filter.entities]
+        sql_for_queries = [self._stickiness_query(entity, query_filter, team.pk) for query_filter, entity in queries]
+        counts = iter(sync_execute_batch([query for query in sql_for_queries if query is not None]))
+        stickiness = [
+            self._serialize_stickiness(
+                entity, self.process_result(next(counts), query_filter) if query is not None else {}
+            )
+            for (query_filter, entity), query in zip(queries, sql_for_queries)
+        ]
+
+        response = []
+        entity_count = len(filter.entities)
+        for index in range(entity_count):
+            if filter.compare:
+                response.extend(convert_to_comparison(stickiness[index], filter, "current"))
+                response.extend(convert_to_comparison(stickiness[entity_count + index], filters[1], "previous"))
+            else:
+                response.extend(stickiness[index])
+        return response
 
     def _retrieve_people(self, target_entity: Entity, filter: StickinessFilter, team: Team) -> ReturnDict:
         return retrieve_stickiness_people(target_entity, filter, team)
@@ -107,6 +146,7 @@ def _process_content_sql(target_entity: Entity, filter: StickinessFilter, team:
         parsed_date_to=parsed_date_to,
         filters=prop_filters,
         trunc_func=trunc_func,
+        person_join=get_person_distinct_id_join(join_type="LEFT"),
     )
     return content_sql, params
 
@@ -5,7 +5,7 @@ from django.utils import timezone
 
 from ee.clickhouse.client import sync_execute
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.util import get_time_diff, get_trunc_func_ch, parse_timestamps
+from ee.clickhouse.queries.util import get_sampling_clauses, get_time_diff, get_trunc_func_ch, parse_timestamps
 from ee.clickhouse.sql.events import NULL_SQL
 from ee.clickhouse.sql.sessions.average_all import AVERAGE_SQL
 from ee.clickhouse.sql.sessions.average_per_period import AVERAGE_PER_PERIOD_SQL
@@ -23,6 +23,9 @@ class ClickhouseSessionsAvg:
         filters, params = parse_prop_clauses(
             filter.properties, team.pk, filter_test_accounts=filter.filter_test_accounts
         )
+        # Sessions are made of each distinct id's consecutive events, so persons are sampled rather than events.
+        # Averages need no scaling
+        _, sample_filter, sample_params = get_sampling_clauses(filter, table="events.", by_person=True)
 
         interval_notation = get_trunc_func_ch(filter.interval)
         num_intervals, seconds_in_interval, _ = get_time_diff(
@@ -30,7 +33,11 @@ class ClickhouseSessionsAvg:
         )
 
         avg_query = SESSIONS_NO_EVENTS_SQL.format(
-            team_id=team.pk, date_from=parsed_date_from, date_to=parsed_date_to, filters=filters, sessions_limit="",
+            team_id=team.pk,
+            date_from=parsed_date_from,
+            date_to=parsed_date_to,
+            filters=filters + sample_filter,
+            sessions_limit="",
         )
         per_period_query = AVERAGE_PER_PERIOD_SQL.format(sessions=avg_query, interval=interval_notation)
 
@@ -43,7 +50,7 @@ class ClickhouseSessionsAvg:
 
         final_query = AVERAGE_SQL.format(sessions=per_period_query, null_sql=null_sql)
 
-        params = {**params, "team_id": team.pk}
+        params = {**params, **sample_params, "team_id": team.pk}
         response = sync_execute(final_query, params)
         values = self.clean_values(filter, response)
         time_series_data = append_data(values, interval=filter.interval, math=None)
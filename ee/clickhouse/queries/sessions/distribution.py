@@ -1,6 +1,6 @@
 from ee.clickhouse.client import sync_execute
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.util import parse_timestamps
+from ee.clickhouse.queries.util import get_sampling_clauses, parse_timestamps, scale_sampled
 from ee.clickhouse.sql.sessions.distribution import DIST_SQL
 from posthog.models import Filter, Team
 
@@ -14,18 +14,23 @@ class ClickhouseSessionsDist:
         filters, params = parse_prop_clauses(
             filter.properties, team.pk, filter_test_accounts=filter.filter_test_accounts
         )
+        # Sessions are made of each distinct id's consecutive events, so persons are sampled rather than events
+        _, sample_filter, sample_params = get_sampling_clauses(filter, table="events.", by_person=True)
         dist_query = DIST_SQL.format(
             team_id=team.pk,
             date_from=parsed_date_from,
             date_to=parsed_date_to,
-            filters=filters if filter.properties else "",
+            filters=(filters if filter.properties else "") + sample_filter,
             sessions_limit="",
         )
 
-        params = {**params, "team_id": team.pk}
+        params = {**params, **sample_params, "team_id": team.pk}
 
         result = sync_execute(dist_query, params)
 
-        res = [{"label": DIST_LABELS[index], "count": result[0][index]} for index in range(len(DIST_LABELS))]
+        res = [
+            {"label": DIST_LABELS[index], "count": round(scale_sampled(result[0][index], filter))}
+            for index in range(len(DIST_LABELS))
+        ]
 
         return res
@@ -171,9 +171,14 @@ def format_action_filters(filter: SessionsFilter) -> ActionFiltersSQL:
 
 
 def format_action_filter_aggregate(entity: Entity, prepend: str):
-    filter_sql, params = format_entity_filter(entity, prepend=prepend, filter_by_team=False)
+    # These filter a subquery rather than the events table, so materialized columns aren't available
+    filter_sql, params = format_entity_filter(
+        entity, prepend=prepend, filter_by_team=False, allow_denormalized_props=False
+    )
     if entity.properties:
-        filters, filter_params = parse_prop_clauses(entity.properties, prepend=prepend, team_id=None)
+        filters, filter_params = parse_prop_clauses(
+            entity.properties, prepend=prepend, team_id=None, allow_denormalized_props=False
+        )
         filter_sql += f" {filters}"
         params = {**params, **filter_params}
 
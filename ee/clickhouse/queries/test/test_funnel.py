@@ -18,7 +18,9 @@ def _create_event(**kwargs):
 
 
 class TestFunnel(ClickhouseTestMixin, funnel_test_factory(ClickhouseFunnel, _create_event, _create_person)):  # type: ignore
-    pass
+    def test_funnel_events_with_person_distinct_id_join_table(self):
+        with self._person_distinct_id_join_table():
+            self.test_funnel_events()
 
 
 class TestFunnelTrends(ClickhouseTestMixin, funnel_trends_test_factory(ClickhouseFunnel, _create_event, _create_person)):  # type: ignore
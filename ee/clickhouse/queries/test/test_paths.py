@@ -13,4 +13,6 @@ def _create_event(**kwargs):
 
 
 class TestClickhousePaths(ClickhouseTestMixin, paths_test_factory(ClickhousePaths, _create_event, Person.objects.create)):  # type: ignore
-    pass
+    def test_current_url_paths_with_person_distinct_id_join_table(self):
+        with self._person_distinct_id_join_table():
+            self.test_current_url_paths_and_logic()
@@ -1,7 +1,9 @@
+from unittest.mock import patch
 from uuid import uuid4
 
 from freezegun import freeze_time
 
+from ee.clickhouse.client import LOCAL_QUERY_CACHE, _execute
 from ee.clickhouse.models.event import create_event
 from ee.clickhouse.queries.trends.clickhouse_trends import ClickhouseTrends
 from ee.clickhouse.util import ClickhouseTestMixin
@@ -304,3 +306,20 @@ class TestClickhouseTrends(ClickhouseTestMixin, trend_test_factory(ClickhouseTre
             self.team,
         )
         self.assertEqual(action_response[0]["count"], 0)
+
+    def test_results_are_cached(self):
+        LOCAL_QUERY_CACHE.clear()
+        _create_event(team=self.team, event="sign up", distinct_id="blabla", timestamp="2020-01-02T12:00:00Z")
+        filter = Filter(data={"events": [{"id": "sign up"}], "date_from": "2020-01-01", "date_to": "2020-01-04"})
+
+        with self.settings(CLICKHOUSE_QUERY_CACHE_ENABLED=True), patch(
+            "ee.clickhouse.client._execute", wraps=_execute
+        ) as execute:
+            response = ClickhouseTrends().run(filter, self.team)
+            # Another event would be counted if the query ran again
+            _create_event(team=self.team, event="sign up", distinct_id="blabla", timestamp="2020-01-03T12:00:00Z")
+            cached_response = ClickhouseTrends().run(filter, self.team)
+
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(response[0]["count"], 1)
+        self.assertEqual(cached_response, response)
@@ -3,13 +3,20 @@ from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from django.db.models.manager import BaseManager
 
 from ee.clickhouse.client import sync_execute
+from ee.clickhouse.materialized_columns import get_materialized_column
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.cohort import format_filter_query
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.trends.util import parse_response, process_math
-from ee.clickhouse.queries.util import date_from_clause, get_time_diff, get_trunc_func_ch, parse_timestamps
-from ee.clickhouse.sql.events import EVENT_JOIN_PERSON_SQL, NULL_BREAKDOWN_SQL, NULL_SQL
-from ee.clickhouse.sql.person import GET_LATEST_PERSON_SQL
+from ee.clickhouse.queries.trends.util import get_sampling_scale, parse_response, process_math
+from ee.clickhouse.queries.util import (
+    date_from_clause,
+    get_sampling_clauses,
+    get_time_diff,
+    get_trunc_func_ch,
+    parse_timestamps,
+)
+from ee.clickhouse.sql.events import NULL_BREAKDOWN_SQL, NULL_SQL
+from ee.clickhouse.sql.person import GET_LATEST_PERSON_SQL, get_person_distinct_id_join
 from ee.clickhouse.sql.trends.breakdown import (
     BREAKDOWN_AGGREGATE_DEFAULT_SQL,
     BREAKDOWN_AGGREGATE_QUERY_SQL,
@@ -44,9 +51,12 @@ class ClickhouseTrendsBreakdown:
             props_to_filter, team_id, table_name="e", filter_test_accounts=filter.filter_test_accounts
         )
         aggregate_operation, _, math_params = process_math(entity)
+        sample_clause, sample_filter, sample_params = get_sampling_clauses(
+            filter, table="e.", by_person=entity.math == "dau"
+        )
 
         if entity.math == "dau" or filter.breakdown_type == "person":
-            join_condition = EVENT_JOIN_PERSON_SQL
+            join_condition = get_person_distinct_id_join("e")
         else:
             join_condition = ""
 
@@ -71,6 +81,7 @@ class ClickhouseTrendsBreakdown:
             "event": entity.id,
             "key": filter.breakdown,
             **date_params,
+            **sample_params,
         }
 
         breakdown_filter_params = {
@@ -78,7 +89,7 @@ class ClickhouseTrendsBreakdown:
             "parsed_date_to": parsed_date_to,
             "actions_query": "AND {}".format(action_query) if action_query else "",
             "event_filter": "AND event = %(event)s" if not action_query else "",
-            "filters": prop_filters if props_to_filter else "",
+            "filters": (prop_filters if props_to_filter else "") + sample_filter,
         }
         breakdown_query = self._get_breakdown_query(filter)
 
@@ -107,6 +118,7 @@ class ClickhouseTrendsBreakdown:
             breakdown_filter = breakdown_filter.format(**breakdown_filter_params)
             content_sql = breakdown_query.format(
                 breakdown_filter=breakdown_filter,
+                sample_clause=sample_clause,
                 event_join=join_condition,
                 aggregate_operation=aggregate_operation,
                 breakdown_value=breakdown_value,
@@ -126,6 +138,7 @@ class ClickhouseTrendsBreakdown:
             breakdown_query = breakdown_query.format(
                 null_sql=null_sql,
                 breakdown_filter=breakdown_filter,
+                sample_clause=sample_clause,
                 event_join=join_condition,
                 aggregate_operation=aggregate_operation,
                 interval_annotation=interval_annotation,
@@ -155,6 +168,7 @@ class ClickhouseTrendsBreakdown:
             parsed_date_from=parsed_date_from,
             parsed_date_to=parsed_date_to,
             latest_person_sql=GET_LATEST_PERSON_SQL.format(query=""),
+            person_join=get_person_distinct_id_join("e"),
         )
         top_elements_array = self._get_top_elements(elements_query, filter, team_id)
         params = {
@@ -169,8 +183,11 @@ class ClickhouseTrendsBreakdown:
 
     def _breakdown_prop_params(self, filter: Filter, team_id: int):
         parsed_date_from, parsed_date_to, _ = parse_timestamps(filter=filter, team_id=team_id)
+        # Materialized columns hold the value with quotes trimmed. Labels are the same either way, as they're trimmed
+        materialized_column = get_materialized_column(filter.breakdown)
+        value_expression = materialized_column or "JSONExtractRaw(properties, %(key)s)"
         elements_query = TOP_ELEMENTS_ARRAY_OF_KEY_SQL.format(
-            parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to
+            parsed_date_from=parsed_date_from, parsed_date_to=parsed_date_to, value_expression=value_expression
         )
 
         top_elements_array = self._get_top_elements(elements_query, filter, team_id)
@@ -179,14 +196,14 @@ class ClickhouseTrendsBreakdown:
         }
         breakdown_filter = BREAKDOWN_PROP_JOIN_SQL
 
-        return params, breakdown_filter, {}, "JSONExtractRaw(properties, %(key)s)"
+        return params, breakdown_filter, {"breakdown_value": value_expression}, value_expression
 
     def _parse_single_aggregate_result(self, filter: Filter, entity: Entity) -> Callable:
         def _parse(result: List) -> List:
             parsed_results = []
             for idx, stats in enumerate(result):
                 additional_values = self._breakdown_result_descriptors(stats[1], filter, entity)
-                parsed_result = {"aggregated_value": stats[0], **additional_values}
+                parsed_result = {"aggregated_value": stats[0] * get_sampling_scale(filter, entity), **additional_values}
                 parsed_results.append(parsed_result)
 
             return parsed_results
@@ -198,7 +215,7 @@ class ClickhouseTrendsBreakdown:
             parsed_results = []
             for idx, stats in enumerate(result):
                 additional_values = self._breakdown_result_descriptors(stats[2], filter, entity)
-                parsed_result = parse_response(stats, filter, additional_values)
+                parsed_result = parse_response(stats, filter, additional_values, get_sampling_scale(filter, entity))
                 parsed_results.append(parsed_result)
 
             return sorted(parsed_results, key=lambda x: 0 if x.get("breakdown_value") != "all" else 1)
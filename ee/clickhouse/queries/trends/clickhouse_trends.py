@@ -5,18 +5,18 @@ from django.db.models.query import Prefetch
 from django.utils import timezone
 from sentry_sdk.api import capture_exception
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import QueryLimitExceeded, sync_execute_batch
 from ee.clickhouse.queries.trends.breakdown import ClickhouseTrendsBreakdown
 from ee.clickhouse.queries.trends.formula import ClickhouseTrendsFormula
 from ee.clickhouse.queries.trends.lifecycle import ClickhouseLifecycle
 from ee.clickhouse.queries.trends.normal import ClickhouseTrendsNormal
-from posthog.constants import TREND_FILTER_TYPE_ACTIONS, TRENDS_CUMULATIVE, TRENDS_LIFECYCLE
+from posthog.constants import INSIGHT_TRENDS, TREND_FILTER_TYPE_ACTIONS, TRENDS_CUMULATIVE, TRENDS_LIFECYCLE
 from posthog.models.action import Action
 from posthog.models.action_step import ActionStep
 from posthog.models.entity import Entity
 from posthog.models.filters import Filter
 from posthog.models.team import Team
-from posthog.queries.base import handle_compare
+from posthog.queries.base import convert_to_comparison, determine_compared_filter, handle_compare
 from posthog.queries.trends import Trends
 from posthog.utils import relative_date_parse
 
@@ -45,21 +45,30 @@ class ClickhouseTrends(
         return sql, params, parse_function
 
     def _run_query(self, filter: Filter, entity: Entity, team_id: int) -> List[Dict[str, Any]]:
-        sql, params, parse_function = self._get_sql_for_entity(filter, entity, team_id)
-        try:
-            result = sync_execute(sql, params)
-        except Exception as e:
-            capture_exception(e)
-            if settings.TEST or settings.DEBUG:
-                raise e
-            result = []
-        result = parse_function(result)
-        serialized_data = self._format_serialized(entity, result)
-
-        if filter.display == TRENDS_CUMULATIVE:
-            serialized_data = self._handle_cumulative(serialized_data)
-
-        return serialized_data
+        return self._run_queries([(filter, entity)], team_id)[0]
+
+    def _run_queries(self, queries: List[Tuple[Filter, Entity]], team_id: int) -> List[List[Dict[str, Any]]]:
+        """Runs the query for each (filter, entity) concurrently, and returns their serialized results in order."""
+        sql_for_queries = [self._get_sql_for_entity(filter, entity, team_id) for filter, entity in queries]
+        results = sync_execute_batch(
+            [(sql, params) for sql, params, _ in sql_for_queries], return_exceptions=True, query_class=INSIGHT_TRENDS
+        )
+
+        serialized = []
+        for (filter, entity), (_, _, parse_function), result in zip(queries, sql_for_queries, results):
+            if isinstance(result, QueryLimitExceeded):
+                raise result
+            if isinstance(result, Exception):
+                capture_exception(result)
+                if settings.TEST or settings.DEBUG:
+                    raise result
+                result = []
+            serialized_data = self._format_serialized(entity, parse_function(result))
+
+            if filter.display == TRENDS_CUMULATIVE:
+                serialized_data = self._handle_cumulative(serialized_data)
+            serialized.append(serialized_data)
+        return serialized
 
     def run(self, filter: Filter, team: Team, *args, **kwargs) -> List[Dict[str, Any]]:
         actions = Action.objects.filter(team_id=team.pk).order_by("-id")
@@ -72,14 +81,28 @@ class ClickhouseTrends(
         if filter.formula:
             return handle_compare(filter, self._run_formula_query, team)
 
-        result = []
+        entities = []
         for entity in filter.entities:
             if entity.type == TREND_FILTER_TYPE_ACTIONS:
                 try:
                     entity.name = actions.get(id=entity.id).name
                 except Action.DoesNotExist:
                     continue
-            entities_list = handle_compare(filter, self._run_query, team, entity=entity)
-            result.extend(entities_list)
+            entities.append(entity)
+
+        # Same as handle_compare for each entity, with all queries (compared ones included) run at once
+        queries = [(filter, entity) for entity in entities]
+        if filter.compare:
+            compared_filter = determine_compared_filter(filter)
+            queries += [(compared_filter, entity) for entity in entities]
+        results = self._run_queries(queries, team.pk)
+
+        result = []
+        for index in range(len(entities)):
+            if filter.compare:
+                result.extend(convert_to_comparison(results[index], filter, "current"))
+                result.extend(convert_to_comparison(results[len(entities) + index], compared_filter, "previous"))
+            else:
+                result.extend(results[index])
 
         return result
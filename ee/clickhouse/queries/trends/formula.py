@@ -3,7 +3,7 @@ from itertools import accumulate
 from typing import Any, Dict, List
 
 from ee.clickhouse.client import sync_execute
-from ee.clickhouse.queries.trends.util import parse_response
+from ee.clickhouse.queries.trends.util import get_sampling_scale, parse_response
 from posthog.constants import TRENDS_CUMULATIVE, TRENDS_DISPLAY_BY_VALUE
 from posthog.models.cohort import Cohort
 from posthog.models.filters.filter import Filter
@@ -19,6 +19,14 @@ class ClickhouseTrendsFormula:
             return item[2]
         return "Formula ({})".format(filter.formula)
 
+    def _formula_select(self, letter: str, is_aggregate: bool, scale: float) -> str:
+        if is_aggregate:
+            # Need to wrap aggregates in arrays so we can still use arrayMap
+            return "[sub_{}.data{}]".format(letter, " * {}".format(scale) if scale != 1 else "")
+        if scale != 1:
+            return "arrayMap(x -> x * {}, sub_{}.data)".format(scale, letter)
+        return "sub_{}.data".format(letter)
+
     def _run_formula_query(self, filter: Filter, team_id: int):
         letters = [chr(65 + i) for i in range(0, len(filter.entities))]
         queries = []
@@ -36,6 +44,8 @@ class ClickhouseTrendsFormula:
             else ", trim(BOTH '\"' FROM sub_A.breakdown_value)"
         )
         is_aggregate = filter.display in TRENDS_DISPLAY_BY_VALUE
+        # Sampled counts get scaled back up before the formula sees them
+        scales = [get_sampling_scale(filter, entity) for entity in filter.entities]
 
         sql = """SELECT
             {date_select}
@@ -47,12 +57,8 @@ class ClickhouseTrendsFormula:
             date_select="'' as date," if is_aggregate else "sub_A.date,",
             letters_select=", ".join(letters),
             formula=filter.formula,  # formula is properly escaped in the filter
-            # Need to wrap aggregates in arrays so we can still use arrayMap
             selects=", ".join(
-                [
-                    ("[sub_{}.data]" if is_aggregate else "sub_{}.data").format(letters[i])
-                    for i in range(0, len(filter.entities))
-                ]
+                [self._formula_select(letters[i], is_aggregate, scales[i]) for i in range(0, len(filter.entities))]
             ),
             breakdown_value=breakdown_value if filter.breakdown else "",
             first_query=queries[0],
@@ -10,6 +10,7 @@ from ee.clickhouse.models.person import get_persons_by_distinct_ids, get_persons
 from ee.clickhouse.models.property import parse_prop_clauses
 from ee.clickhouse.queries.trends.util import parse_response
 from ee.clickhouse.queries.util import get_earliest_timestamp, get_time_diff, get_trunc_func_ch, parse_timestamps
+from ee.clickhouse.sql.person import get_person_distinct_id_join
 from ee.clickhouse.sql.trends.lifecycle import LIFECYCLE_PEOPLE_SQL, LIFECYCLE_SQL
 from posthog.constants import TREND_FILTER_TYPE_ACTIONS
 from posthog.models.action import Action
@@ -70,6 +71,7 @@ class ClickhouseLifecycle(LifecycleTrend):
                 event_query=event_query,
                 filters=prop_filters,
                 sub_interval=sub_interval_string,
+                person_join=get_person_distinct_id_join(),
             ),
             {
                 "team_id": team_id,
@@ -140,6 +142,7 @@ class ClickhouseLifecycle(LifecycleTrend):
                 event_query=event_query,
                 filters=prop_filters,
                 sub_interval=sub_interval_string,
+                person_join=get_person_distinct_id_join(),
             ),
             {
                 "team_id": team_id,
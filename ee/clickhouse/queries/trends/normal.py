@@ -5,10 +5,12 @@ from django.utils import timezone
 from ee.clickhouse.client import format_sql, sync_execute
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.property import parse_prop_clauses
-from ee.clickhouse.queries.trends.util import parse_response, process_math
+from ee.clickhouse.queries.trends.rollup import get_rollup_aggregate_operation
+from ee.clickhouse.queries.trends.util import get_sampling_scale, parse_response, process_math
 from ee.clickhouse.queries.util import (
     date_from_clause,
     get_earliest_timestamp,
+    get_sampling_clauses,
     get_time_diff,
     get_trunc_func_ch,
     parse_timestamps,
@@ -18,7 +20,9 @@ from ee.clickhouse.sql.trends.aggregate import AGGREGATE_SQL
 from ee.clickhouse.sql.trends.volume import (
     VOLUME__TOTAL_AGGREGATE_ACTIONS_SQL,
     VOLUME_ACTIONS_SQL,
+    VOLUME_ROLLUP_SQL,
     VOLUME_SQL,
+    VOLUME_TOTAL_AGGREGATE_ROLLUP_SQL,
     VOLUME_TOTAL_AGGREGATE_SQL,
 )
 from posthog.constants import TREND_FILTER_TYPE_ACTIONS, TRENDS_DISPLAY_BY_VALUE
@@ -41,17 +45,26 @@ class ClickhouseTrendsNormal:
             props_to_filter, team_id, filter_test_accounts=filter.filter_test_accounts
         )
 
+        # Unique persons can't be estimated from a share of events, only from a share of persons
+        sample_clause, sample_filter, sample_params = get_sampling_clauses(
+            filter, table="events.", by_person=entity.math == "dau"
+        )
+
         aggregate_operation, join_condition, math_params = process_math(entity)
+        rollup_aggregate_operation = get_rollup_aggregate_operation(entity, filter, round_interval, date_params)
+        if rollup_aggregate_operation:
+            aggregate_operation, join_condition, math_params = rollup_aggregate_operation, "", {}
 
         params: Dict = {"team_id": team_id}
-        params = {**params, **prop_filter_params, **math_params, **date_params}
+        params = {**params, **prop_filter_params, **math_params, **date_params, **sample_params}
         content_sql_params = {
             "interval": interval_annotation,
             "parsed_date_from": date_from_clause(interval_annotation, round_interval),
             "parsed_date_to": parsed_date_to,
             "timestamp": "timestamp",
             "team_id": team_id,
-            "filters": prop_filters,
+            "filters": prop_filters + sample_filter,
+            "sample_clause": sample_clause,
             "event_join": join_condition,
             "aggregate_operation": aggregate_operation,
         }
@@ -61,16 +74,30 @@ class ClickhouseTrendsNormal:
         content_sql_params = {**content_sql_params, **entity_format_params}
 
         if filter.display in TRENDS_DISPLAY_BY_VALUE:
-            agg_query = self._determine_single_aggregate_query(filter, entity)
+            agg_query = (
+                VOLUME_TOTAL_AGGREGATE_ROLLUP_SQL
+                if rollup_aggregate_operation
+                else self._determine_single_aggregate_query(filter, entity)
+            )
             content_sql = agg_query.format(**content_sql_params)
 
             return (
                 content_sql,
                 params,
-                lambda result: [{"aggregated_value": result[0][0] if result and len(result) else 0}],
+                lambda result: [
+                    {
+                        "aggregated_value": result[0][0] * get_sampling_scale(filter, entity)
+                        if result and len(result)
+                        else 0
+                    }
+                ],
             )
         else:
-            content_sql = self._determine_trend_aggregate_query(filter, entity)
+            content_sql = (
+                VOLUME_ROLLUP_SQL
+                if rollup_aggregate_operation
+                else self._determine_trend_aggregate_query(filter, entity)
+            )
             content_sql = content_sql.format(**content_sql_params)
 
             null_sql = NULL_SQL.format(
@@ -80,13 +107,13 @@ class ClickhouseTrendsNormal:
                 date_to=filter.date_to.strftime("%Y-%m-%d %H:%M:%S"),
             )
             final_query = AGGREGATE_SQL.format(null_sql=null_sql, content_sql=content_sql)
-            return final_query, params, self._parse_normal_result(filter)
+            return final_query, params, self._parse_normal_result(filter, entity)
 
-    def _parse_normal_result(self, filter: Filter) -> Callable:
+    def _parse_normal_result(self, filter: Filter, entity: Entity) -> Callable:
         def _parse(result: List) -> List:
             parsed_results = []
             for _, stats in enumerate(result):
-                parsed_result = parse_response(stats, filter)
+                parsed_result = parse_response(stats, filter, scale=get_sampling_scale(filter, entity))
                 parsed_results.append(parsed_result)
 
             return parsed_results
@@ -0,0 +1,45 @@
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from posthog.constants import TREND_FILTER_TYPE_EVENTS
+from posthog.models.entity import Entity
+from posthog.models.filters import Filter
+
+ROLLUP_MATH_FUNCTIONS = {
+    "total": "sum(count)",
+    # Unique distinct ids rather than persons, so only with CLICKHOUSE_TRENDS_ROLLUP_DAU
+    "dau": "uniqMerge(distinct_ids)",
+}
+
+
+def get_rollup_aggregate_operation(
+    entity: Entity, filter: Filter, round_interval: bool, date_params: Dict
+) -> Optional[str]:
+    """
+    Aggregate counting `entity` from the events_hourly rollup, or None if the query needs to read raw events.
+
+    The rollup only knows about each event's team, name and hour, so neither properties nor actions can be filtered
+    on, and the date range has to start and end on the hour.
+    """
+    if not settings.CLICKHOUSE_TRENDS_ROLLUP_ENABLED:
+        return None
+    if filter.sampling_factor:
+        return None
+    if entity.type != TREND_FILTER_TYPE_EVENTS or entity.properties or filter.properties or filter.filter_test_accounts:
+        return None
+
+    math = entity.math or "total"
+    if math not in ROLLUP_MATH_FUNCTIONS or (math == "dau" and not settings.CLICKHOUSE_TRENDS_ROLLUP_DAU):
+        return None
+
+    if filter.interval and filter.interval.lower() == "minute":
+        return None
+    # Rounded starts get truncated to the interval, which is at least an hour
+    if not round_interval and not date_params.get("date_from", "").endswith(":00:00"):
+        return None
+    # The hour date_to falls in is counted in full, which only matters if it isn't the current one
+    if filter._date_to and not date_params["date_to"].endswith(":59:59"):
+        return None
+
+    return ROLLUP_MATH_FUNCTIONS[math]
@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+from django.test import override_settings
+from freezegun import freeze_time
+
+from ee.clickhouse.models.event import create_event
+from ee.clickhouse.queries.trends.clickhouse_trends import ClickhouseTrends
+from ee.clickhouse.queries.trends.rollup import get_rollup_aggregate_operation
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.constants import TRENDS_TABLE
+from posthog.models import Person
+from posthog.models.filters.filter import Filter
+from posthog.test.base import APIBaseTest
+
+DATE_PARAMS = {"date_from": "2020-01-01 00:00:00", "date_to": "2020-01-07 23:59:59"}
+
+
+def _create_event(**kwargs):
+    kwargs.update({"event_uuid": uuid4()})
+    create_event(**kwargs)
+
+
+def _filter(**kwargs) -> Filter:
+    return Filter(data={"date_from": "2020-01-01", "date_to": "2020-01-07", "events": [{"id": "$pageview", **kwargs}]})
+
+
+@override_settings(CLICKHOUSE_TRENDS_ROLLUP_ENABLED=True)
+class TestRollup(ClickhouseTestMixin, APIBaseTest):
+    def test_eligible_filters(self):
+        filter = _filter()
+        self.assertEqual(get_rollup_aggregate_operation(filter.entities[0], filter, True, DATE_PARAMS), "sum(count)")
+
+        filter = _filter(math="dau")
+        self.assertIsNone(get_rollup_aggregate_operation(filter.entities[0], filter, True, DATE_PARAMS))
+        with override_settings(CLICKHOUSE_TRENDS_ROLLUP_DAU=True):
+            self.assertEqual(
+                get_rollup_aggregate_operation(filter.entities[0], filter, True, DATE_PARAMS),
+                "uniqMerge(distinct_ids)",
+            )
+
+    def test_ineligible_filters(self):
+        for filter in [
+            _filter(properties=[{"key": "$browser", "value": "Chrome"}]),
+            _filter(math="sum", math_property="$value"),
+            Filter(data={"interval": "minute", "events": [{"id": "$pageview"}]}),
+            Filter(data={"events": [{"id": "$pageview"}], "filter_test_accounts": True}),
+        ]:
+            self.assertIsNone(get_rollup_aggregate_operation(filter.entities[0], filter, True, DATE_PARAMS))
+
+        filter = _filter()
+        self.assertIsNone(
+            get_rollup_aggregate_operation(
+                filter.entities[0], filter, False, {**DATE_PARAMS, "date_from": "2020-01-01 10:30:00"}
+            )
+        )
+        with override_settings(CLICKHOUSE_TRENDS_ROLLUP_ENABLED=False):
+            self.assertIsNone(get_rollup_aggregate_operation(filter.entities[0], filter, True, DATE_PARAMS))
+
+    def test_rollup_matches_events(self):
+        # One person per distinct id, for the rollup's unique distinct ids to match DAU
+        Person.objects.create(team_id=self.team.pk, distinct_ids=["1"])
+        Person.objects.create(team_id=self.team.pk, distinct_ids=["2"])
+        for timestamp, distinct_id in [
+            ("2020-01-02T10:01:01Z", "1"),
+            ("2020-01-02T10:59:01Z", "2"),
+            ("2020-01-03T23:59:59Z", "1"),
+            ("2020-01-08T00:00:01Z", "1"),
+        ]:
+            with freeze_time(timestamp):
+                _create_event(team=self.team, event="$pageview", distinct_id=distinct_id)
+        _create_event(team=self.team, event="$pageleave", distinct_id="1", timestamp="2020-01-02T10:01:01Z")
+
+        for filter in [_filter(), _filter(math="dau"), Filter(data={**_filter().to_dict(), "display": TRENDS_TABLE})]:
+            with override_settings(CLICKHOUSE_TRENDS_ROLLUP_DAU=True):
+                rollup_result = ClickhouseTrends().run(filter, self.team)
+            with override_settings(CLICKHOUSE_TRENDS_ROLLUP_ENABLED=False):
+                events_result = ClickhouseTrends().run(filter, self.team)
+
+            self.assertEqual(rollup_result, events_result)
@@ -0,0 +1,56 @@
+from uuid import uuid4
+
+from freezegun import freeze_time
+
+from ee.clickhouse.models.event import create_event
+from ee.clickhouse.queries.trends.clickhouse_trends import ClickhouseTrends
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.models import Person
+from posthog.models.filters.filter import Filter
+from posthog.test.base import APIBaseTest
+
+
+def _create_event(**kwargs):
+    kwargs.update({"event_uuid": uuid4()})
+    create_event(**kwargs)
+
+
+class TestSampling(ClickhouseTestMixin, APIBaseTest):
+    def setUp(self):
+        super().setUp()
+        for distinct_id in ["1", "2"]:
+            Person.objects.create(team_id=self.team.pk, distinct_ids=[distinct_id])
+            with freeze_time("2020-01-02T10:00:00Z"):
+                _create_event(team=self.team, event="$pageview", distinct_id=distinct_id)
+                _create_event(team=self.team, event="$pageview", distinct_id=distinct_id)
+
+    def _filter(self, **kwargs) -> Filter:
+        return Filter(
+            data={"date_from": "2020-01-01", "date_to": "2020-01-03", "events": [{"id": "$pageview"}], **kwargs}
+        )
+
+    def test_sample_clause(self):
+        sql, params, _ = ClickhouseTrends()._normal_query(
+            self._filter(sampling_factor=0.5).entities[0], self._filter(sampling_factor=0.5), self.team.pk
+        )
+        self.assertIn("SAMPLE 0.5", sql)
+        self.assertNotIn("sampling_threshold", params)
+
+        filter = self._filter(sampling_factor=0.5, sampling_by="person")
+        sql, params, _ = ClickhouseTrends()._normal_query(filter.entities[0], filter, self.team.pk)
+        self.assertNotIn("SAMPLE", sql)
+        self.assertEqual(params["sampling_threshold"], 5000)
+
+    def test_dau_samples_persons(self):
+        filter = Filter(
+            data={**self._filter(sampling_factor=0.5).to_dict(), "events": [{"id": "$pageview", "math": "dau"}]}
+        )
+        sql, params, _ = ClickhouseTrends()._normal_query(filter.entities[0], filter, self.team.pk)
+        self.assertNotIn("SAMPLE", sql)
+        self.assertIn("sampling_threshold", params)
+
+    def test_sampled_results_are_scaled(self):
+        # Keeps close to every event and person, for the estimate to be exact
+        for sampling_by in ["event", "person"]:
+            result = ClickhouseTrends().run(self._filter(sampling_factor=0.9999, sampling_by=sampling_by), self.team)
+            self.assertAlmostEqual(result[0]["count"], 4 / 0.9999)
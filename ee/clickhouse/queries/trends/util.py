@@ -1,7 +1,8 @@
 from datetime import timedelta
 from typing import Any, Dict, Optional, Tuple
 
-from ee.clickhouse.sql.events import EVENT_JOIN_PERSON_SQL
+from ee.clickhouse.materialized_columns import get_materialized_column
+from ee.clickhouse.sql.person import get_person_distinct_id_join
 from posthog.models.entity import Entity
 from posthog.models.filters import Filter
 
@@ -16,24 +17,36 @@ MATH_FUNCTIONS = {
     "p99": "quantile(0.99)",
 }
 
+# Aggregates that grow with the share of events counted, so are scaled back up when sampling
+SAMPLING_SCALED_MATH = [None, "total", "dau", "sum"]
+
 
 def process_math(entity: Entity) -> Tuple[str, str, Dict[str, Optional[str]]]:
     aggregate_operation = "count(*)"
     params = {}
     join_condition = ""
-    value = "toFloat64OrNull(JSONExtractRaw(properties, '{}'))".format(entity.math_property)
     if entity.math == "dau":
-        join_condition = EVENT_JOIN_PERSON_SQL
+        join_condition = get_person_distinct_id_join()
         aggregate_operation = "count(DISTINCT person_id)"
     elif entity.math in MATH_FUNCTIONS:
+        materialized_column = entity.math_property and get_materialized_column(entity.math_property)
+        value = "toFloat64OrNull({})".format(
+            materialized_column or "JSONExtractRaw(properties, '{}')".format(entity.math_property)
+        )
         aggregate_operation = f"{MATH_FUNCTIONS[entity.math]}({value})"
         params = {"join_property_key": entity.math_property}
 
     return aggregate_operation, join_condition, params
 
 
-def parse_response(stats: Dict, filter: Filter, additional_values: Dict = {}) -> Dict[str, Any]:
-    counts = stats[1]
+def get_sampling_scale(filter: Filter, entity: Entity) -> float:
+    if not filter.sampling_factor or entity.math not in SAMPLING_SCALED_MATH:
+        return 1
+    return 1 / filter.sampling_factor
+
+
+def parse_response(stats: Dict, filter: Filter, additional_values: Dict = {}, scale: float = 1) -> Dict[str, Any]:
+    counts = [count * scale for count in stats[1]] if scale != 1 else stats[1]
     dates = [
         item.strftime(
             "%Y-%m-%d{}".format(", %H:%M" if filter.interval == "hour" or filter.interval == "minute" else "")
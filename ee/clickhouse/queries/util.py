@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple, TypeVar, Union
 
 from django.utils import timezone
 
 from ee.clickhouse.client import sync_execute
 from ee.clickhouse.sql.events import GET_EARLIEST_TIMESTAMP_SQL
+from ee.clickhouse.sql.person import get_team_person_distinct_ids
+from posthog.constants import SAMPLING_BY_PERSON
 from posthog.models.event import DEFAULT_EARLIEST_TIME_DELTA
+from posthog.models.filters.mixins.common import SamplingMixin
 from posthog.queries.base import TIME_IN_SECONDS
 from posthog.types import FilterType
 
@@ -96,3 +99,40 @@ def date_from_clause(interval_annotation: str, round_interval: bool) -> str:
         return "AND {interval}(timestamp) >= {interval}(toDateTime(%(date_from)s))".format(interval=interval_annotation)
     else:
         return "AND timestamp >= %(date_from)s"
+
+
+# Persons are sampled by hash, in steps of 1 / SAMPLING_PRECISION
+SAMPLING_PRECISION = 10000
+
+PERSON_SAMPLE_FILTER = """
+AND {table}distinct_id IN (
+    SELECT distinct_id FROM ({person_distinct_ids_sql}) WHERE cityHash64(person_id) % {precision} < %(sampling_threshold)s
+)
+"""
+
+
+def get_sampling_clauses(filter: SamplingMixin, table: str = "", by_person: bool = False) -> Tuple[str, str, Dict]:
+    """
+    Returns the SAMPLE clause to put after the events table, the condition to add to the query's filters, and their
+    params, for the share of data the filter asks for. Either or both are empty when the filter doesn't sample.
+
+    `by_person` samples persons whatever the filter asks for, for queries that follow persons across events.
+    """
+    if not filter.sampling_factor:
+        return "", "", {}
+    if by_person or filter.sampling_by == SAMPLING_BY_PERSON:
+        person_filter = PERSON_SAMPLE_FILTER.format(
+            table=table, person_distinct_ids_sql=get_team_person_distinct_ids(), precision=SAMPLING_PRECISION
+        )
+        return "", person_filter, {"sampling_threshold": round(filter.sampling_factor * SAMPLING_PRECISION)}
+    return "SAMPLE {}".format(filter.sampling_factor), "", {}
+
+
+Number = TypeVar("Number", int, float)
+
+
+def scale_sampled(value: Number, filter: SamplingMixin) -> Union[Number, float]:
+    """Scales a count from sampled data back up to an estimate for all of it"""
+    if not filter.sampling_factor:
+        return value
+    return value / filter.sampling_factor
@@ -0,0 +1,74 @@
+from .clickhouse import STORAGE_POLICY, aggregating_table_engine
+
+# Number of events and unique distinct ids per team, event and hour, kept up to date by a materialized view on events.
+# Trends that only count events by name read this instead of events, see ee.clickhouse.queries.trends.rollup
+
+EVENTS_HOURLY_TABLE = "events_hourly"
+
+DROP_EVENTS_HOURLY_TABLE_SQL = """
+DROP TABLE {table_name}
+""".format(
+    table_name=EVENTS_HOURLY_TABLE
+)
+
+DROP_EVENTS_HOURLY_MV_SQL = """
+DROP TABLE {table_name}_mv
+""".format(
+    table_name=EVENTS_HOURLY_TABLE
+)
+
+EVENTS_HOURLY_TABLE_SQL = """
+CREATE TABLE {table_name}
+(
+    team_id Int64,
+    event VARCHAR,
+    hour DateTime,
+    count SimpleAggregateFunction(sum, UInt64),
+    distinct_ids AggregateFunction(uniq, VARCHAR)
+) ENGINE = {engine}
+PARTITION BY toYYYYMM(hour)
+ORDER BY (team_id, event, hour)
+{storage_policy}
+""".format(
+    table_name=EVENTS_HOURLY_TABLE, engine=aggregating_table_engine(EVENTS_HOURLY_TABLE), storage_policy=STORAGE_POLICY,
+)
+
+EVENTS_HOURLY_SELECT_SQL = """
+SELECT
+team_id,
+event,
+toStartOfHour(timestamp) AS hour,
+count() AS count,
+uniqState(distinct_id) AS distinct_ids
+FROM events
+"""
+
+EVENTS_HOURLY_MV_SQL = (
+    """
+CREATE MATERIALIZED VIEW {table_name}_mv
+TO {table_name}
+AS """.format(
+        table_name=EVENTS_HOURLY_TABLE
+    )
+    + EVENTS_HOURLY_SELECT_SQL
+    + "GROUP BY team_id, event, hour"
+)
+
+# Only events that got in before the materialized view existed, the view has all the others
+BACKFILL_EVENTS_HOURLY_SQL = (
+    """
+INSERT INTO {table_name}
+""".format(
+        table_name=EVENTS_HOURLY_TABLE
+    )
+    + EVENTS_HOURLY_SELECT_SQL
+    + """WHERE _timestamp < %(before)s
+GROUP BY team_id, event, hour
+"""
+)
+
+GET_EVENTS_HOURLY_MV_CREATED_AT_SQL = """
+SELECT metadata_modification_time FROM system.tables WHERE database = %(database)s AND name = '{table_name}_mv'
+""".format(
+    table_name=EVENTS_HOURLY_TABLE
+)
@@ -1,3 +1,5 @@
+from django.conf import settings
+
 from ee.kafka_client.topics import KAFKA_PERSON, KAFKA_PERSON_UNIQUE_ID
 
 from .clickhouse import KAFKA_COLUMNS, STORAGE_POLICY, kafka_engine, table_engine
@@ -57,10 +59,22 @@ FROM kafka_{table_name}
     table_name=PERSONS_TABLE
 )
 
+# Each version of a person is a row of its own until the table's parts get merged. The latest version of each person
+# wins, in a single pass over the team's persons. The inner aliases differ from the column names, as ClickHouse would
+# otherwise substitute max(created_at) into the other aggregates
 GET_LATEST_PERSON_SQL = """
-SELECT * FROM person JOIN (
-    SELECT id, max(created_at) as created_at FROM person WHERE team_id = %(team_id)s GROUP BY id
-) as person_max ON person.id = person_max.id AND person.created_at = person_max.created_at
+SELECT id, latest_created_at AS created_at, team_id, latest_properties AS properties, latest_is_identified AS is_identified
+FROM (
+    SELECT
+        id,
+        team_id,
+        max(created_at) AS latest_created_at,
+        argMax(properties, created_at) AS latest_properties,
+        argMax(is_identified, created_at) AS latest_is_identified
+    FROM person
+    WHERE team_id = %(team_id)s
+    GROUP BY team_id, id
+)
 WHERE team_id = %(team_id)s
 {query}
 """
@@ -81,6 +95,89 @@ SELECT * FROM ({latest_person_sql}) person WHERE team_id = %(team_id)s
 
 PERSONS_DISTINCT_ID_TABLE = "person_distinct_id"
 
+# The person each of a team's distinct ids currently belongs to, one row per distinct id. Join events onto this rather
+# than the raw table, which keeps every version of the mapping until its parts get merged
+GET_TEAM_PERSON_DISTINCT_IDS = """
+SELECT distinct_id, argMax(person_id, _timestamp) AS person_id
+FROM person_distinct_id
+WHERE team_id = %(team_id)s
+GROUP BY distinct_id
+"""
+
+# The same mapping for all teams, held in memory by ClickHouse (see CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE). A
+# materialized view adds every row written to person_distinct_id, whether by the Kafka materialized view or directly,
+# and the last row inserted for a distinct id wins
+PERSON_DISTINCT_ID_JOIN_TABLE = "person_distinct_id_join"
+
+PERSON_DISTINCT_ID_JOIN_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table_name}
+(
+    team_id Int64,
+    distinct_id VARCHAR,
+    person_id UUID
+) ENGINE = Join(ANY, LEFT, team_id, distinct_id)
+SETTINGS join_any_take_last_row = 1
+""".format(
+    table_name=PERSON_DISTINCT_ID_JOIN_TABLE
+)
+
+PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS {table_name}_mv
+TO {table_name}
+AS SELECT team_id, distinct_id, person_id
+FROM person_distinct_id
+""".format(
+    table_name=PERSON_DISTINCT_ID_JOIN_TABLE
+)
+
+# Mappings written before the materialized view existed
+BACKFILL_PERSON_DISTINCT_ID_JOIN_TABLE_SQL = """
+INSERT INTO {table_name}
+SELECT team_id, distinct_id, argMax(person_id, _timestamp)
+FROM person_distinct_id
+GROUP BY team_id, distinct_id
+""".format(
+    table_name=PERSON_DISTINCT_ID_JOIN_TABLE
+)
+
+DROP_PERSON_DISTINCT_ID_JOIN_TABLE_SQL = """
+DROP TABLE {table_name}
+""".format(
+    table_name=PERSON_DISTINCT_ID_JOIN_TABLE
+)
+
+DROP_PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL = """
+DROP TABLE {table_name}_mv
+""".format(
+    table_name=PERSON_DISTINCT_ID_JOIN_TABLE
+)
+
+
+def get_person_distinct_id_join(events_alias: str = "events", join_type: str = "INNER") -> str:
+    """
+    Join clause giving each row of `events_alias` the `person_id` its distinct id belongs to. Queries refer to it as
+    an unqualified `person_id`, whether it comes from GET_TEAM_PERSON_DISTINCT_IDS or from the join table. Call it
+    when building the query, as CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE can change at runtime.
+
+    With join_type "INNER" events of unknown distinct ids are left out, with "LEFT" they get a zero person_id.
+    """
+    if settings.CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE:
+        key = f"{events_alias}.team_id, {events_alias}.distinct_id"
+        person_ids = f"[joinGet('{PERSON_DISTINCT_ID_JOIN_TABLE}', 'person_id', {key})]"
+        if join_type == "INNER":
+            # joinGet gives unknown distinct ids the zero UUID
+            person_ids = f"arrayFilter(id -> id != toUUID('00000000-0000-0000-0000-000000000000'), {person_ids})"
+        return f"ARRAY JOIN {person_ids} AS person_id"
+    return f"{join_type} JOIN ({GET_TEAM_PERSON_DISTINCT_IDS}) AS pdi ON {events_alias}.distinct_id = pdi.distinct_id"
+
+
+def get_team_person_distinct_ids() -> str:
+    """Subquery of the team's distinct ids and the `person_id` each belongs to, for queries starting from persons."""
+    if settings.CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE:
+        return f"SELECT distinct_id, person_id FROM {PERSON_DISTINCT_ID_JOIN_TABLE} WHERE team_id = %(team_id)s"
+    return GET_TEAM_PERSON_DISTINCT_IDS
+
+
 PERSONS_DISTINCT_ID_TABLE_BASE_SQL = """
 CREATE TABLE {table_name} 
 (
@@ -178,30 +275,26 @@ SELECT * FROM person_distinct_id WHERE team_id = %(team_id)s AND person_id = %(p
 GET_PERSON_IDS_BY_FILTER = """
 SELECT DISTINCT p.id
 FROM ({latest_person_sql}) AS p
-INNER JOIN (
-    SELECT person_id, distinct_id
-    FROM person_distinct_id
-    WHERE team_id = %(team_id)s
-) AS pid ON p.id = pid.person_id
+INNER JOIN ({person_distinct_ids_sql}) AS pid ON p.id = pid.person_id
 WHERE team_id = %(team_id)s
   {distinct_query}
 """.format(
-    latest_person_sql=GET_LATEST_PERSON_SQL, distinct_query="{distinct_query}"
+    latest_person_sql=GET_LATEST_PERSON_SQL,
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    distinct_query="{distinct_query}",
 )
 
 GET_PERSON_BY_DISTINCT_ID = """
 SELECT p.id
 FROM ({latest_person_sql}) AS p
-INNER JOIN (
-    SELECT person_id, distinct_id
-    FROM person_distinct_id
-    WHERE team_id = %(team_id)s
-) AS pid ON p.id = pid.person_id
+INNER JOIN ({person_distinct_ids_sql}) AS pid ON p.id = pid.person_id
 WHERE team_id = %(team_id)s
   AND pid.distinct_id = %(distinct_id)s
   {distinct_query}
 """.format(
-    latest_person_sql=GET_LATEST_PERSON_SQL, distinct_query="{distinct_query}"
+    latest_person_sql=GET_LATEST_PERSON_SQL,
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    distinct_query="{distinct_query}",
 )
 
 GET_PERSONS_BY_DISTINCT_IDS = """
@@ -213,9 +306,9 @@ SELECT
     p.is_identified,
     groupArray(pid.distinct_id) as distinct_ids
 FROM 
-    person as p 
+    ({latest_person_sql}) as p 
 INNER JOIN 
-    person_distinct_id as pid on p.id = pid.person_id 
+    ({person_distinct_ids_sql}) as pid on p.id = pid.person_id 
 WHERE 
     team_id = %(team_id)s 
     AND distinct_id IN (%(distinct_ids)s)
@@ -225,7 +318,9 @@ GROUP BY
     p.team_id,
     p.properties,
     p.is_identified
-"""
+""".format(
+    latest_person_sql=GET_LATEST_PERSON_SQL.format(query=""), person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS
+)
 
 PERSON_DISTINCT_ID_EXISTS_SQL = """
 SELECT count(*) FROM person_distinct_id
@@ -279,52 +374,72 @@ PEOPLE_THROUGH_DISTINCT_SQL = """
 SELECT id, created_at, team_id, properties, is_identified, groupArray(distinct_id) FROM (
     {latest_person_sql}
 ) as person INNER JOIN (
-    SELECT DISTINCT person_id, distinct_id FROM person_distinct_id WHERE distinct_id IN ({content_sql}) AND team_id = %(team_id)s
+    SELECT person_id, distinct_id FROM ({person_distinct_ids_sql}) WHERE distinct_id IN ({content_sql})
 ) as pdi ON person.id = pdi.person_id
 WHERE team_id = %(team_id)s
 GROUP BY id, created_at, team_id, properties, is_identified
 LIMIT 200 OFFSET %(offset)s
-"""
+""".format(
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    latest_person_sql="{latest_person_sql}",
+    content_sql="{content_sql}",
+)
 
 INSERT_COHORT_ALL_PEOPLE_THROUGH_DISTINCT_SQL = """
 INSERT INTO {cohort_table} SELECT generateUUIDv4(), id, %(cohort_id)s, %(team_id)s, %(_timestamp)s, 0 FROM (
     SELECT id FROM (
         {latest_person_sql}
     ) as person INNER JOIN (
-        SELECT DISTINCT person_id, distinct_id FROM person_distinct_id WHERE distinct_id IN ({content_sql}) AND team_id = %(team_id)s
+        SELECT person_id, distinct_id FROM ({person_distinct_ids_sql}) WHERE distinct_id IN ({content_sql})
     ) as pdi ON person.id = pdi.person_id
     WHERE team_id = %(team_id)s
     GROUP BY id
 )
-"""
+""".format(
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    latest_person_sql="{latest_person_sql}",
+    content_sql="{content_sql}",
+    cohort_table="{cohort_table}",
+)
 
 PEOPLE_SQL = """
 SELECT id, created_at, team_id, properties, is_identified, groupArray(distinct_id) FROM (
     {latest_person_sql}
 ) as person INNER JOIN (
-    SELECT DISTINCT person_id, distinct_id FROM person_distinct_id WHERE person_id IN ({content_sql}) AND team_id = %(team_id)s
+    SELECT person_id, distinct_id FROM ({person_distinct_ids_sql}) WHERE person_id IN ({content_sql})
 ) as pdi ON person.id = pdi.person_id 
 GROUP BY id, created_at, team_id, properties, is_identified
 LIMIT 100 OFFSET %(offset)s 
-"""
+""".format(
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    latest_person_sql="{latest_person_sql}",
+    content_sql="{content_sql}",
+)
 
 INSERT_COHORT_ALL_PEOPLE_SQL = """
 INSERT INTO {cohort_table} SELECT generateUUIDv4(), id, %(cohort_id)s, %(team_id)s, %(_timestamp)s, 0 FROM (
     SELECT id FROM (
         {latest_person_sql}
     ) as person INNER JOIN (
-        SELECT DISTINCT person_id, distinct_id FROM person_distinct_id WHERE person_id IN ({content_sql}) AND team_id = %(team_id)s
+        SELECT person_id, distinct_id FROM ({person_distinct_ids_sql}) WHERE person_id IN ({content_sql})
     ) as pdi ON person.id = pdi.person_id
     WHERE team_id = %(team_id)s
     GROUP BY id
 )
-"""
+""".format(
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    latest_person_sql="{latest_person_sql}",
+    content_sql="{content_sql}",
+    cohort_table="{cohort_table}",
+)
 
 GET_DISTINCT_IDS_BY_PROPERTY_SQL = """
-SELECT distinct_id FROM person_distinct_id WHERE person_id IN
+SELECT distinct_id FROM ({person_distinct_ids_sql}) WHERE person_id IN
 (
     SELECT id
-    FROM person
-    WHERE team_id = %(team_id)s {filters}
-) AND team_id = %(team_id)s
-"""
+    FROM ({latest_person_sql})
+)
+""".format(
+    person_distinct_ids_sql=GET_TEAM_PERSON_DISTINCT_IDS,
+    latest_person_sql=GET_LATEST_PERSON_SQL.format(query="{filters}"),
+)
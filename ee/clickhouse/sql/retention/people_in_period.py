@@ -7,10 +7,10 @@ SELECT toString(person_id), count(person_id) appearance_count, groupArray(interv
     FROM (
         SELECT 
         timestamp AS event_date,
-        pdi.person_id as person_id,
+        person_id,
         e.uuid as uuid,
         e.event as event
-        FROM events e join (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+        FROM events e {person_join}
         where toDateTime(e.timestamp) >= toDateTime(%(start_date)s) AND toDateTime(e.timestamp) <= toDateTime(%(end_date)s)
         AND e.team_id = %(team_id)s {returning_query} {filters}
     ) event
@@ -31,10 +31,10 @@ LIMIT %(limit)s OFFSET %(offset)s
 REFERENCE_EVENT_PEOPLE_PER_PERIOD_SQL = """
 SELECT DISTINCT 
 {trunc_func}(e.timestamp) as event_date,
-pdi.person_id as person_id,
+person_id,
 e.uuid as uuid,
 e.event as event
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+from events e {person_join}
 where event_date = {trunc_func}(toDateTime(%(start_date)s))
 AND e.team_id = %(team_id)s {target_query} {filters}
 """
@@ -44,8 +44,8 @@ DEFAULT_REFERENCE_EVENT_PEOPLE_PER_PERIOD_SQL = """
 SELECT DISTINCT 
 0,
 0,
-pdi.person_id as person_id
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+person_id
+from events e {person_join}
 where {trunc_func}(e.timestamp) = {trunc_func}(toDateTime(%(start_date)s))
 AND e.team_id = %(team_id)s {target_query} {filters}
 """
@@ -53,10 +53,10 @@ AND e.team_id = %(team_id)s {target_query} {filters}
 REFERENCE_EVENT_UNIQUE_PEOPLE_PER_PERIOD_SQL = """
 SELECT DISTINCT 
 min({trunc_func}(e.timestamp)) as event_date,
-pdi.person_id as person_id,
+person_id,
 argMin(e.uuid, {trunc_func}(e.timestamp)) as min_uuid,
 argMin(e.event, {trunc_func}(e.timestamp)) as min_event
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+from events e {person_join}
 WHERE e.team_id = %(team_id)s {target_query} {filters} 
 GROUP BY person_id HAVING
 event_date = {trunc_func}(toDateTime(%(start_date)s))
@@ -66,8 +66,8 @@ DEFAULT_REFERENCE_EVENT_UNIQUE_PEOPLE_PER_PERIOD_SQL = """
 SELECT DISTINCT 
 0,
 0,
-pdi.person_id as person_id
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+person_id
+from events e {person_join}
 WHERE e.team_id = %(team_id)s {target_query} {filters} 
 GROUP BY person_id HAVING
 min({trunc_func}(e.timestamp)) = {trunc_func}(toDateTime(%(start_date)s))
@@ -6,10 +6,10 @@ SELECT
 FROM (
     SELECT 
     timestamp AS event_date,
-    pdi.person_id as person_id,
+    person_id,
     e.uuid as uuid,
     e.event as event
-    FROM events e join (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+    FROM events e {person_join}
     where toDateTime(e.timestamp) >= toDateTime(%(start_date)s) AND toDateTime(e.timestamp) <= toDateTime(%(end_date)s)
     AND e.team_id = %(team_id)s {returning_query} {filters}
 ) event
@@ -25,10 +25,10 @@ ORDER BY base_interval, intervals_from_base
 REFERENCE_EVENT_SQL = """
 SELECT DISTINCT 
 {trunc_func}(e.timestamp) as event_date,
-pdi.person_id as person_id,
+person_id,
 e.uuid as uuid,
 e.event as event
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+from events e {person_join}
 where toDateTime(e.timestamp) >= toDateTime(%(reference_start_date)s) AND toDateTime(e.timestamp) <= toDateTime(%(reference_end_date)s)
 AND e.team_id = %(team_id)s {target_query} {filters}
 """
@@ -36,10 +36,10 @@ AND e.team_id = %(team_id)s {target_query} {filters}
 REFERENCE_EVENT_UNIQUE_SQL = """
 SELECT DISTINCT 
 min({trunc_func}(e.timestamp)) as event_date,
-pdi.person_id as person_id,
+person_id,
 argMin(e.uuid, {trunc_func}(e.timestamp)) as min_uuid,
 argMin(e.event, {trunc_func}(e.timestamp)) as min_event
-from events e JOIN (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+from events e {person_join}
 WHERE e.team_id = %(team_id)s {target_query} {filters} 
 GROUP BY person_id HAVING
 event_date >= toDateTime(%(reference_start_date)s) AND event_date <= toDateTime(%(reference_end_date)s)
@@ -48,7 +48,7 @@ event_date >= toDateTime(%(reference_start_date)s) AND event_date <= toDateTime(
 
 RETENTION_PEOPLE_SQL = """
 SELECT DISTINCT person_id 
-FROM events e join (SELECT person_id, distinct_id FROM person_distinct_id WHERE team_id = %(team_id)s) pdi on e.distinct_id = pdi.distinct_id
+FROM events e {person_join}
 where toDateTime(e.timestamp) >= toDateTime(%(start_date)s) AND toDateTime(e.timestamp) <= toDateTime(%(end_date)s)
 AND e.team_id = %(team_id)s AND person_id IN (
     SELECT person_id FROM ({reference_event_query}) as persons
@@ -17,7 +17,7 @@ SELECT groupArray(day_start) as date, groupArray(count) as data, breakdown_value
                 toDateTime({interval_annotation}(timestamp), 'UTC') as day_start,
                 {breakdown_value} as breakdown_value
             FROM
-            events e {event_join} {breakdown_filter}
+            events e {sample_clause} {event_join} {breakdown_filter}
             GROUP BY day_start, breakdown_value
         )
     )
@@ -29,7 +29,7 @@ SELECT groupArray(day_start) as date, groupArray(count) as data, breakdown_value
 BREAKDOWN_AGGREGATE_QUERY_SQL = """
 SELECT {aggregate_operation} as total, {breakdown_value} as breakdown_value
 FROM
-events e {event_join} {breakdown_filter}
+events e {sample_clause} {event_join} {breakdown_filter}
 GROUP BY breakdown_value
 """
 
@@ -88,7 +88,7 @@ AND breakdown_value in (%(values)s) {actions_query}
 BREAKDOWN_PROP_JOIN_SQL = """
 WHERE e.team_id = %(team_id)s {event_filter} {filters} {parsed_date_from} {parsed_date_to}
   AND JSONHas(properties, %(key)s)
-  AND JSONExtractRaw(properties, %(key)s) in (%(values)s) {actions_query}
+  AND {breakdown_value} in (%(values)s) {actions_query}
 """
 
 BREAKDOWN_COHORT_JOIN_SQL = """
@@ -20,21 +20,13 @@ SELECT groupArray(day_start) as date, groupArray(counts) as data, status FROM (
                     SELECT person_id, base_day, min(subsequent_day) as subsequent_day FROM (
                         SELECT person_id, day as base_day, events.subsequent_day as subsequent_day  FROM (
                             SELECT DISTINCT person_id, {trunc_func}(events.timestamp) day FROM events 
-                            JOIN
-                            (SELECT person_id,
-                                        distinct_id
-                                FROM person_distinct_id
-                                WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                            {person_join}
                             WHERE team_id = %(team_id)s AND {event_query} {filters}
                             GROUP BY person_id, day HAVING day <= toDateTime(%(date_to)s) AND day >= toDateTime(%(prev_date_from)s)
                         ) base
                         JOIN (
                             SELECT DISTINCT person_id, {trunc_func}(events.timestamp) subsequent_day FROM events 
-                            JOIN
-                            (SELECT person_id,
-                                        distinct_id
-                                FROM person_distinct_id
-                                WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                            {person_join}
                             WHERE team_id = %(team_id)s AND {event_query} {filters}
                             GROUP BY person_id, subsequent_day HAVING subsequent_day <= toDateTime(%(date_to)s) AND subsequent_day >= toDateTime(%(prev_date_from)s)
                         ) events ON base.person_id = events.person_id 
@@ -44,11 +36,7 @@ SELECT groupArray(day_start) as date, groupArray(counts) as data, status FROM (
                     UNION ALL
                     SELECT person_id, min(day) as base_day, min(day) as subsequent_day  FROM (
                         SELECT DISTINCT person_id, {trunc_func}(events.timestamp) day FROM events 
-                        JOIN
-                        (SELECT person_id,
-                                    distinct_id
-                            FROM person_distinct_id
-                            WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                        {person_join}
                         WHERE team_id = %(team_id)s AND {event_query} {filters}
                         GROUP BY person_id, day HAVING day <= toDateTime(%(date_to)s) AND day >= toDateTime(%(prev_date_from)s)
                     ) base
@@ -57,11 +45,7 @@ SELECT groupArray(day_start) as date, groupArray(counts) as data, status FROM (
                     SELECT person_id, base_day, subsequent_day FROM (
                         SELECT person_id, total as base_day, day_start as subsequent_day FROM (
                             SELECT DISTINCT person_id, groupArray({trunc_func}(events.timestamp)) day FROM events 
-                            JOIN
-                            (SELECT person_id,
-                                        distinct_id
-                                FROM person_distinct_id
-                                WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                            {person_join}
                             WHERE team_id = %(team_id)s AND {event_query} {filters}
                             AND toDateTime(events.timestamp) <= toDateTime(%(date_to)s) AND {trunc_func}(events.timestamp) >= toDateTime(%(date_from)s)
                             GROUP BY person_id
@@ -77,11 +61,7 @@ SELECT groupArray(day_start) as date, groupArray(counts) as data, status FROM (
                     ) e
                 JOIN (
                     SELECT DISTINCT person_id, {trunc_func}(min(events.timestamp)) earliest FROM events 
-                    JOIN
-                    (SELECT person_id,
-                                distinct_id
-                        FROM person_distinct_id
-                        WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                    {person_join}
                   WHERE team_id = %(team_id)s AND {event_query} {filters}
                     GROUP BY person_id
                 ) earliest ON e.person_id = earliest.person_id
@@ -101,21 +81,13 @@ SELECT person_id FROM (
         SELECT person_id, base_day, min(subsequent_day) as subsequent_day FROM (
             SELECT person_id, day as base_day, events.subsequent_day as subsequent_day  FROM (
                 SELECT DISTINCT person_id, {trunc_func}(events.timestamp) day FROM events 
-                JOIN
-                (SELECT person_id,
-                            distinct_id
-                    FROM person_distinct_id
-                    WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                {person_join}
                 WHERE team_id = %(team_id)s AND {event_query} {filters}
                 GROUP BY person_id, day HAVING day <= toDateTime(%(date_to)s) AND day >= toDateTime(%(prev_date_from)s)
             ) base
             JOIN (
                 SELECT DISTINCT person_id, {trunc_func}(events.timestamp) subsequent_day FROM events 
-                JOIN
-                (SELECT person_id,
-                            distinct_id
-                    FROM person_distinct_id
-                    WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                {person_join}
                 WHERE team_id = %(team_id)s AND {event_query} {filters}
                 GROUP BY person_id, subsequent_day HAVING subsequent_day <= toDateTime(%(date_to)s) AND subsequent_day >= toDateTime(%(prev_date_from)s)
             ) events ON base.person_id = events.person_id 
@@ -125,11 +97,7 @@ SELECT person_id FROM (
         UNION ALL
         SELECT person_id, min(day) as base_day, min(day) as subsequent_day  FROM (
             SELECT DISTINCT person_id, {trunc_func}(events.timestamp) day FROM events 
-            JOIN
-            (SELECT person_id,
-                        distinct_id
-                FROM person_distinct_id
-                WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+            {person_join}
             WHERE team_id = %(team_id)s AND {event_query} {filters}
             GROUP BY person_id, day HAVING day <= toDateTime(%(date_to)s) AND day >= toDateTime(%(prev_date_from)s)
         ) base
@@ -138,11 +106,7 @@ SELECT person_id FROM (
         SELECT person_id, base_day, subsequent_day FROM (
             SELECT person_id, dummy as base_day, day_start as subsequent_day FROM (
                 SELECT DISTINCT person_id, groupArray({trunc_func}(events.timestamp)) day FROM events 
-                JOIN
-                (SELECT person_id,
-                            distinct_id
-                    FROM person_distinct_id
-                    WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+                {person_join}
                 WHERE team_id = %(team_id)s AND {event_query} {filters}
                 AND toDateTime(events.timestamp) <= toDateTime(%(date_to)s) AND {trunc_func}(events.timestamp) >= toDateTime(%(date_from)s)
                 GROUP BY person_id
@@ -158,11 +122,7 @@ SELECT person_id FROM (
         ) e
     JOIN (
         SELECT DISTINCT person_id, {trunc_func}(min(events.timestamp)) earliest FROM events 
-        JOIN
-        (SELECT person_id,
-                    distinct_id
-            FROM person_distinct_id
-            WHERE team_id = %(team_id)s) pdi on events.distinct_id = pdi.distinct_id
+        {person_join}
         WHERE team_id = %(team_id)s AND {event_query} {filters}
         GROUP BY person_id
     ) earliest ON e.person_id = earliest.person_id
@@ -1,15 +1,28 @@
 VOLUME_SQL = """
-SELECT {aggregate_operation} as data, toDateTime({interval}({timestamp}), 'UTC') as date from events {event_join} where team_id = {team_id} and event = %(event)s {filters} {parsed_date_from} {parsed_date_to} GROUP BY {interval}({timestamp})
+SELECT {aggregate_operation} as data, toDateTime({interval}({timestamp}), 'UTC') as date from events {sample_clause} {event_join} where team_id = {team_id} and event = %(event)s {filters} {parsed_date_from} {parsed_date_to} GROUP BY {interval}({timestamp})
 """
 
 VOLUME_ACTIONS_SQL = """
-SELECT {aggregate_operation} as data, toDateTime({interval}({timestamp}), 'UTC') as date from events {event_join} where team_id = {team_id} and {actions_query} {filters} {parsed_date_from} {parsed_date_to} GROUP BY {interval}({timestamp})
+SELECT {aggregate_operation} as data, toDateTime({interval}({timestamp}), 'UTC') as date from events {sample_clause} {event_join} where team_id = {team_id} and {actions_query} {filters} {parsed_date_from} {parsed_date_to} GROUP BY {interval}({timestamp})
 """
 
 VOLUME_TOTAL_AGGREGATE_SQL = """
-SELECT {aggregate_operation} as data from events {event_join} where team_id = {team_id} and event = %(event)s {filters} {parsed_date_from} {parsed_date_to}
+SELECT {aggregate_operation} as data from events {sample_clause} {event_join} where team_id = {team_id} and event = %(event)s {filters} {parsed_date_from} {parsed_date_to}
 """
 
 VOLUME__TOTAL_AGGREGATE_ACTIONS_SQL = """
-SELECT {aggregate_operation} as data from events {event_join} where team_id = {team_id} and {actions_query} {filters} {parsed_date_from} {parsed_date_to}
+SELECT {aggregate_operation} as data from events {sample_clause} {event_join} where team_id = {team_id} and {actions_query} {filters} {parsed_date_from} {parsed_date_to}
+"""
+
+# Same as above, counting from the hourly rollup. The date clauses compare against timestamp, hence the alias
+VOLUME_ROLLUP_SQL = """
+SELECT {aggregate_operation} as data, toDateTime({interval}(timestamp), 'UTC') as date from (
+    SELECT hour AS timestamp, count, distinct_ids FROM events_hourly where team_id = {team_id} and event = %(event)s {parsed_date_from} {parsed_date_to}
+) GROUP BY {interval}(timestamp)
+"""
+
+VOLUME_TOTAL_AGGREGATE_ROLLUP_SQL = """
+SELECT {aggregate_operation} as data from (
+    SELECT hour AS timestamp, count, distinct_ids FROM events_hourly where team_id = {team_id} and event = %(event)s {parsed_date_from} {parsed_date_to}
+)
 """
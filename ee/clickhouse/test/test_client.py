@@ -1,15 +1,39 @@
 import datetime
+import time
+import uuid
+from decimal import Decimal
+from unittest.mock import MagicMock
 
 import fakeredis
-from django.test import TestCase
+from clickhouse_driver.errors import ServerException
+from django.conf import settings
+from django.test import TestCase, override_settings
 from freezegun import freeze_time
 
-from ee.clickhouse.client import CACHE_TTL, _deserialize, _key_hash, cache_sync_execute
+from ee.clickhouse.client import (
+    CACHE_TTL,
+    LOCAL_QUERY_CACHE,
+    RUNNING_TEAM_QUERIES_KEY,
+    SLOW_QUERIES_KEY,
+    QueryLimitExceeded,
+    _cached_execute,
+    _deserialize,
+    _key_hash,
+    cache_sync_execute,
+    get_slow_queries,
+    query_tags,
+    sync_execute,
+    sync_execute_batch,
+    sync_execute_iter,
+)
+from posthog.redis import get_client
 
 
+@override_settings(CLICKHOUSE_QUERY_CACHE_ENABLED=True)
 class ClickhouseClientTestCase(TestCase):
     def setUp(self):
         self.redis_client = fakeredis.FakeStrictRedis()
+        LOCAL_QUERY_CACHE.clear()
 
     def test_caching_client(self):
         ts_start = datetime.datetime.now()
@@ -40,6 +64,113 @@ class ClickhouseClientTestCase(TestCase):
         with freeze_time(start.isoformat()):
             exists = self.redis_client.exists(_key_hash(query, args=args))
             self.assertTrue(exists)
-        with freeze_time(start + datetime.timedelta(seconds=CACHE_TTL + 10)):
+        with freeze_time(
+            start + datetime.timedelta(seconds=CACHE_TTL + settings.CLICKHOUSE_QUERY_CACHE_STALE_TTL + 10)
+        ):
             exists = self.redis_client.exists(_key_hash(query, args=args))
             self.assertFalse(exists)
+
+    def test_cache_preserves_types(self):
+        rows = [(datetime.datetime(2020, 1, 1, 12), uuid.uuid4(), Decimal("1.5"), ["a", "b"])]
+        execute = MagicMock(return_value=rows)
+
+        _cached_execute(b"key", execute, self.redis_client, ttl=60)
+        LOCAL_QUERY_CACHE.clear()
+
+        self.assertEqual(_cached_execute(b"key", execute, self.redis_client, ttl=60), rows)
+        self.assertEqual(execute.call_count, 1)
+
+    def test_cache_serves_stale_result_while_another_worker_refreshes(self):
+        start = datetime.datetime.fromisoformat("2020-01-01 12:00:00")
+        with freeze_time(start):
+            _cached_execute(b"key", MagicMock(return_value=[(1,)]), self.redis_client, ttl=60)
+
+        with freeze_time(start + datetime.timedelta(seconds=70)):
+            LOCAL_QUERY_CACHE.clear()
+            self.redis_client.set(b"lock:key", "other worker")
+            execute = MagicMock(return_value=[(2,)])
+
+            self.assertEqual(_cached_execute(b"key", execute, self.redis_client, ttl=60), [(1,)])
+            execute.assert_not_called()
+
+            self.redis_client.delete(b"lock:key")
+            self.assertEqual(_cached_execute(b"key", execute, self.redis_client, ttl=60), [(2,)])
+            self.assertEqual(execute.call_count, 1)
+            self.assertFalse(self.redis_client.exists(b"lock:key"))
+
+    def test_cache_computes_result_when_lock_holder_gives_up(self):
+        self.redis_client.set(b"lock:key", "other worker", px=200)
+        execute = MagicMock(return_value=[(1,)])
+
+        self.assertEqual(_cached_execute(b"key", execute, self.redis_client, ttl=60), [(1,)])
+        self.assertEqual(execute.call_count, 1)
+
+    def test_sync_execute_batch(self):
+        results = sync_execute_batch([("SELECT %(value)s", {"value": value}) for value in range(5)])
+        self.assertEqual(results, [[(value,)] for value in range(5)])
+
+    def test_sync_execute_batch_return_exceptions(self):
+        with self.assertRaises(Exception):
+            sync_execute_batch([("SELECT 1", None), ("SELECT no_such_column", None)])
+
+        results = sync_execute_batch([("SELECT 1", None), ("SELECT no_such_column", None)], return_exceptions=True)
+        self.assertEqual(results[0], [(1,)])
+        self.assertIsInstance(results[1], Exception)
+
+    def test_slow_query_log(self):
+        get_client().delete(SLOW_QUERIES_KEY)
+        with self.settings(CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS=0), query_tags(insight="TRENDS", team_id=2):
+            sync_execute("SELECT %(value)s", {"value": 1})
+            sync_execute_batch([("SELECT 2", None), ("SELECT 3", None)])
+
+        slow_queries = get_slow_queries()
+        self.assertEqual(len(slow_queries), 3)
+        self.assertEqual(slow_queries[-1]["query"], "SELECT 1")
+        for slow_query in slow_queries:
+            self.assertEqual(slow_query["insight"], "TRENDS")
+            self.assertEqual(slow_query["team_id"], 2)
+            self.assertEqual(slow_query["call_site"], "ee.clickhouse.test.test_client:test_slow_query_log")
+            self.assertEqual(slow_query["cache_status"], "uncached")
+
+    def test_slow_query_log_is_bounded(self):
+        get_client().delete(SLOW_QUERIES_KEY)
+        with self.settings(CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS=0, CLICKHOUSE_SLOW_QUERY_LOG_SIZE=2):
+            for value in range(3):
+                sync_execute("SELECT %(value)s", {"value": value})
+
+        self.assertEqual([query["query"] for query in get_slow_queries()], ["SELECT 2", "SELECT 1"])
+
+    def test_governor_applies_query_limits(self):
+        with self.settings(CLICKHOUSE_QUERY_LIMITS={"default": {"max_rows_to_read": 10}}):
+            # Queries not run for a team are limited too, unless they opt out
+            with self.assertRaises(QueryLimitExceeded):
+                sync_execute("SELECT count() FROM numbers(1000)")
+            with query_tags(governed=False):
+                self.assertEqual(sync_execute("SELECT count() FROM numbers(1000)"), [(1000,)])
+
+            with query_tags(team_id=2), self.assertRaises(QueryLimitExceeded):
+                sync_execute("SELECT count() FROM numbers(1000)")
+            with self.assertRaises(ServerException):
+                list(sync_execute_iter("SELECT number FROM numbers(1000)"))
+
+            with query_tags(team_id=2):
+                self.assertEqual(
+                    sync_execute("SELECT count() FROM numbers(1000)", settings={"max_rows_to_read": 0}), [(1000,)]
+                )
+
+    def test_governor_limits_concurrent_queries_per_team(self):
+        redis_client = get_client()
+        redis_client.delete(RUNNING_TEAM_QUERIES_KEY.format(2))
+        redis_client.zadd(RUNNING_TEAM_QUERIES_KEY.format(2), {"other query": time.time() + 60})
+
+        with self.settings(CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_TEAM=1, CLICKHOUSE_QUERY_QUEUE_TIMEOUT=0):
+            with query_tags(team_id=2), self.assertRaises(QueryLimitExceeded):
+                sync_execute("SELECT 1")
+            with query_tags(team_id=3):
+                self.assertEqual(sync_execute("SELECT 1"), [(1,)])
+
+            redis_client.zrem(RUNNING_TEAM_QUERIES_KEY.format(2), "other query")
+            with query_tags(team_id=2):
+                self.assertEqual(sync_execute("SELECT 1"), [(1,)])
+
+        self.assertEqual(redis_client.zcard(RUNNING_TEAM_QUERIES_KEY.format(2)), 0)
@@ -0,0 +1,111 @@
+from uuid import uuid4
+
+from ee.clickhouse.client import sync_execute
+from ee.clickhouse.materialized_columns import (
+    backfill_materialized_column,
+    get_materialized_columns,
+    get_properties_to_materialize,
+    materialize,
+    materialized_column_name,
+)
+from ee.clickhouse.models.event import create_event
+from ee.clickhouse.models.property import parse_prop_clauses
+from ee.clickhouse.util import ClickhouseTestMixin
+from posthog.models.filters import Filter
+from posthog.models.team import Team
+from posthog.test.base import BaseTest
+
+
+def _create_event(**kwargs) -> None:
+    kwargs.update({"event_uuid": uuid4()})
+    create_event(**kwargs)
+
+
+class TestMaterializedColumns(ClickhouseTestMixin, BaseTest):
+    def test_column_names(self):
+        self.assertEqual(materialized_column_name("browser"), "mat_browser")
+        self.assertNotEqual(materialized_column_name("$browser"), materialized_column_name("_browser"))
+        self.assertRegex(materialized_column_name("$current url"), r"^mat__current_url_[0-9a-f]{6}$")
+
+    def test_get_materialized_columns(self):
+        self.assertEqual(get_materialized_columns()["test_prop"], "properties_test_prop")
+        self.assertEqual(get_materialized_columns()["isSampledEvent"], "properties_issampledevent")
+        self.assertNotIn("$browser", get_materialized_columns())
+
+        materialize("$browser")
+        materialize("it's")
+
+        self.assertEqual(get_materialized_columns()["$browser"], materialized_column_name("$browser"))
+        self.assertEqual(get_materialized_columns()["it's"], materialized_column_name("it's"))
+
+    def test_filters_use_materialized_columns(self):
+        _create_event(event="$pageview", team=self.team, distinct_id="1", properties={"$browser": "Chrome"})
+        _create_event(event="$pageview", team=self.team, distinct_id="1", properties={"$browser": "Safari"})
+        _create_event(event="$pageview", team=self.team, distinct_id="1", properties={})
+
+        filter = Filter(data={"properties": [{"key": "$browser", "value": "Chrome"}]})
+        query, params = parse_prop_clauses(filter.properties, self.team.pk)
+        self.assertNotIn("mat_", query)
+
+        materialize("$browser")
+        query, params = parse_prop_clauses(filter.properties, self.team.pk)
+        self.assertIn(materialized_column_name("$browser"), query)
+        self.assertNotIn("JSONExtract", query)
+
+        # Rows inserted before the column was added compute it when read
+        for prop, expected in (
+            ({"key": "$browser", "value": "Chrome"}, 1),
+            ({"key": "$browser", "value": "Chrome", "operator": "is_not"}, 2),
+            ({"key": "$browser", "value": "afar", "operator": "icontains"}, 1),
+            ({"key": "$browser", "value": "", "operator": "is_set"}, 2),
+            ({"key": "$browser", "value": "", "operator": "is_not_set"}, 1),
+        ):
+            query, params = parse_prop_clauses(Filter(data={"properties": [prop]}).properties, self.team.pk)
+            result = sync_execute(
+                "SELECT uuid FROM events WHERE team_id = %(team_id)s {}".format(query),
+                {**params, "team_id": self.team.pk},
+            )
+            self.assertEqual(len(result), expected, prop)
+
+    def test_person_properties_are_not_rewritten(self):
+        materialize("email")
+        filter = Filter(data={"properties": [{"key": "email", "value": "a@b.com", "type": "person"}]})
+        query, _ = parse_prop_clauses(filter.properties, self.team.pk)
+        self.assertNotIn("mat_", query)
+
+    def test_disabled(self):
+        materialize("$browser")
+        filter = Filter(data={"properties": [{"key": "$browser", "value": "Chrome"}]})
+        with self.settings(CLICKHOUSE_MATERIALIZED_COLUMNS_ENABLED=False):
+            query, _ = parse_prop_clauses(filter.properties, self.team.pk)
+        self.assertNotIn("mat_", query)
+
+    def test_backfill(self):
+        _create_event(event="$pageview", team=self.team, distinct_id="1", properties={"$browser": "Chrome"})
+        column = materialize("$browser")
+
+        backfill_materialized_column("$browser", column, 7)
+
+        self.assertEqual(sync_execute("SELECT {} FROM events".format(column)), [("Chrome",)])
+        self.assertEqual(
+            sync_execute(
+                "SELECT default_kind FROM system.columns WHERE table = 'events' AND name = %(name)s", {"name": column}
+            ),
+            [("MATERIALIZED",)],
+        )
+
+    def test_properties_to_materialize(self):
+        self.team.event_properties_with_usage = [
+            {"key": "$browser", "usage_count": 3, "volume": 10},
+            {"key": "$os", "usage_count": 1, "volume": 10},
+            {"key": "test_prop", "usage_count": 5, "volume": 10},
+            {"key": "unused", "usage_count": 0, "volume": 10},
+        ]
+        self.team.save()
+        Team.objects.create(
+            organization=self.organization, event_properties_with_usage=[{"key": "$os", "usage_count": 4, "volume": 1}],
+        )
+
+        # test_prop already has a column
+        self.assertEqual(get_properties_to_materialize(10), ["$os", "$browser"])
+        self.assertEqual(get_properties_to_materialize(1), ["$os"])
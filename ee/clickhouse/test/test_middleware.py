@@ -1,5 +1,6 @@
+from ee.clickhouse.client import get_slow_queries
 from posthog.api.test.base import APIBaseTest
-from posthog.models import User
+from posthog.models import PersonalAPIKey, User
 
 
 class TestQueryMiddleware(APIBaseTest):
@@ -20,3 +21,30 @@ class TestQueryMiddleware(APIBaseTest):
 
         response = self.client.get("/api/debug_ch_queries/").json()
         self.assertIn("SELECT", response[0]["query"])  # type: ignore
+
+    def test_slow_queries(self):
+        with self.settings(CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS=0):
+            self.client.get('/api/insight/trend/?events=[{"id": "$pageview"}]')
+
+        self.assertEqual(self.client.get("/api/slow_ch_queries/").status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/api/slow_ch_queries/").json()
+        self.assertEqual(response["offenders"][0]["team_id"], self.team.pk)
+        self.assertEqual(response["offenders"][0]["insight"], "TRENDS")
+        self.assertIn("SELECT", response["queries"][0]["query"])
+        self.assertEqual(len(self.client.get("/api/slow_ch_queries/?limit=1").json()["queries"]), 1)
+        self.assertEqual(self.client.get("/api/slow_ch_queries/?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/slow_ch_queries/?limit=all").status_code, 400)
+
+    def test_personal_api_key_queries_are_tagged_with_team(self):
+        key = PersonalAPIKey.objects.create(label="X", user=self.user)
+        self.client.logout()
+        with self.settings(CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS=0):
+            response = self.client.get(
+                '/api/insight/trend/?events=[{"id": "$pageview"}]', HTTP_AUTHORIZATION="Bearer {}".format(key.value)
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_slow_queries()[0]["team_id"], self.team.pk)
@@ -2,18 +2,31 @@ from contextlib import contextmanager
 
 from clickhouse_driver.errors import ServerException
 from django.db import DEFAULT_DB_ALIAS
+from django.test import override_settings
 
 from ee.clickhouse.client import sync_execute
+from ee.clickhouse.materialized_columns import MATERIALIZED_COLUMNS_CACHE
 from ee.clickhouse.sql.events import (
     DROP_EVENTS_TABLE_SQL,
     DROP_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL,
     EVENTS_TABLE_SQL,
     EVENTS_WITH_PROPS_TABLE_SQL,
 )
+from ee.clickhouse.sql.events_hourly import (
+    DROP_EVENTS_HOURLY_MV_SQL,
+    DROP_EVENTS_HOURLY_TABLE_SQL,
+    EVENTS_HOURLY_MV_SQL,
+    EVENTS_HOURLY_TABLE_SQL,
+)
 from ee.clickhouse.sql.person import (
+    BACKFILL_PERSON_DISTINCT_ID_JOIN_TABLE_SQL,
+    DROP_PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL,
+    DROP_PERSON_DISTINCT_ID_JOIN_TABLE_SQL,
     DROP_PERSON_DISTINCT_ID_TABLE_SQL,
     DROP_PERSON_STATIC_COHORT_TABLE_SQL,
     DROP_PERSON_TABLE_SQL,
+    PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL,
+    PERSON_DISTINCT_ID_JOIN_TABLE_SQL,
     PERSON_STATIC_COHORT_TABLE_SQL,
     PERSONS_DISTINCT_ID_TABLE_SQL,
     PERSONS_TABLE_SQL,
@@ -55,12 +68,30 @@ class ClickhouseTestMixin:
         sync_execute(SESSION_RECORDING_EVENTS_TABLE_SQL)
 
     def _destroy_event_tables(self):
+        sync_execute(DROP_EVENTS_HOURLY_MV_SQL)
+        sync_execute(DROP_EVENTS_HOURLY_TABLE_SQL)
         sync_execute(DROP_EVENTS_TABLE_SQL)
         sync_execute(DROP_EVENTS_WITH_ARRAY_PROPS_TABLE_SQL)
 
     def _create_event_tables(self):
         sync_execute(EVENTS_TABLE_SQL)
         sync_execute(EVENTS_WITH_PROPS_TABLE_SQL)
+        sync_execute(EVENTS_HOURLY_TABLE_SQL)
+        sync_execute(EVENTS_HOURLY_MV_SQL)
+        MATERIALIZED_COLUMNS_CACHE.clear()
+
+    @contextmanager
+    def _person_distinct_id_join_table(self):
+        """Look up persons in person_distinct_id_join, as with CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE on"""
+        sync_execute(PERSON_DISTINCT_ID_JOIN_TABLE_SQL)
+        sync_execute(PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL)
+        sync_execute(BACKFILL_PERSON_DISTINCT_ID_JOIN_TABLE_SQL)
+        try:
+            with override_settings(CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE=True):
+                yield
+        finally:
+            sync_execute(DROP_PERSON_DISTINCT_ID_JOIN_TABLE_MV_SQL)
+            sync_execute(DROP_PERSON_DISTINCT_ID_JOIN_TABLE_SQL)
 
     @contextmanager
     def _assertNumQueries(self, func):
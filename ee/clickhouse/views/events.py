@@ -1,13 +1,16 @@
 import json
 from datetime import timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.utils.timezone import now
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from ee.clickhouse.client import sync_execute
+from ee.clickhouse.client import get_query_tags, query_tags, sync_execute, sync_execute_iter
 from ee.clickhouse.models.action import format_action_filter
 from ee.clickhouse.models.event import ClickhouseEventSerializer, determine_event_conditions
 from ee.clickhouse.models.person import get_persons_by_distinct_ids
@@ -21,6 +24,7 @@ from ee.clickhouse.sql.events import (
     SELECT_ONE_EVENT_SQL,
 )
 from posthog.api.event import EventViewSet
+from posthog.api.utils import chunked, streaming_csv_response
 from posthog.models import Filter, Person, Team
 from posthog.models.action import Action
 from posthog.models.filters.sessions_filter import SessionsFilter
@@ -42,7 +46,15 @@ class ClickhouseEventsViewSet(EventViewSet):
     def _query_events_list(
         self, filter: Filter, team: Team, request: Request, long_date_from: bool = False, limit: int = 100
     ) -> List:
-        limit_sql = f"LIMIT {limit + 1}"
+        query = self._events_list_query(filter, team, request, long_date_from, limit + 1)
+        if query is None:
+            return []
+        return sync_execute(*query)
+
+    def _events_list_query(
+        self, filter: Filter, team: Team, request: Request, long_date_from: bool, limit: int
+    ) -> Optional[Tuple[str, Dict]]:
+        limit_sql = f"LIMIT {limit}"
         conditions, condition_params = determine_event_conditions(
             team,
             {
@@ -58,31 +70,33 @@ class ClickhouseEventsViewSet(EventViewSet):
             try:
                 action = Action.objects.get(pk=request.GET["action_id"], team_id=team.pk)
             except Action.DoesNotExist:
-                return []
+                return None
             if action.steps.count() == 0:
-                return []
+                return None
             action_query, params = format_action_filter(action)
             prop_filters += " AND {}".format(action_query)
             prop_filter_params = {**prop_filter_params, **params}
 
         if prop_filters != "":
-            return sync_execute(
+            return (
                 SELECT_EVENT_WITH_PROP_SQL.format(conditions=conditions, limit=limit_sql, filters=prop_filters),
                 {"team_id": team.pk, **condition_params, **prop_filter_params},
             )
         else:
-            return sync_execute(
+            return (
                 SELECT_EVENT_WITH_ARRAY_PROPS_SQL.format(conditions=conditions, limit=limit_sql),
                 {"team_id": team.pk, **condition_params},
             )
 
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        is_csv_request = self.request.accepted_renderer.format == "csv"
-        limit = self.CSV_EXPORT_LIMIT if is_csv_request else 100
+        limit = 100
 
         team = self.team
         filter = Filter(request=request)
 
+        if self.request.accepted_renderer.format == "csv":
+            return self._export_csv(filter, team, request)
+
         query_result = self._query_events_list(filter, team, request, limit=limit)
 
         # Retry the query without the 1 day optimization
@@ -94,7 +108,7 @@ class ClickhouseEventsViewSet(EventViewSet):
         ).data
 
         next_url: Optional[str] = None
-        if not is_csv_request and len(query_result) > 100:
+        if len(query_result) > 100:
             path = request.get_full_path()
             reverse = request.GET.get("orderBy", "-timestamp") != "-timestamp"
             next_url = request.build_absolute_uri(
@@ -108,6 +122,29 @@ class ClickhouseEventsViewSet(EventViewSet):
 
         return Response({"next": next_url, "results": result})
 
+    def _export_csv(self, filter: Filter, team: Team, request: Request) -> StreamingHttpResponse:
+        # Without a lower bound, all events are exported rather than the last day's
+        query = self._events_list_query(
+            filter, team, request, long_date_from=not request.GET.get("after"), limit=self.CSV_EXPORT_LIMIT
+        )
+
+        # Rows are read as the response is streamed, after the request's query tags have been reset
+        tags = get_query_tags()
+
+        def rows():
+            if query is None:
+                return
+            with query_tags(**tags):
+                events = sync_execute_iter(*query, settings={"max_block_size": settings.CSV_EXPORT_CHUNK_SIZE})
+                for chunk in chunked(events, settings.CSV_EXPORT_CHUNK_SIZE):
+                    persons = get_persons_by_distinct_ids(
+                        team.pk, list({event[5] for event in chunk})
+                    ).prefetch_related(Prefetch("persondistinctid_set", to_attr="distinct_ids_cache"))
+                    people = {distinct_id: person for person in persons for distinct_id in person.distinct_ids}
+                    yield from ClickhouseEventSerializer(chunk, many=True, context={"people": people}).data
+
+        return streaming_csv_response(self.CSV_EXPORT_FIELDS, rows(), "events.csv")
+
     def retrieve(self, request: Request, pk: Optional[int] = None, *args: Any, **kwargs: Any) -> Response:
         query_result = sync_execute(SELECT_ONE_EVENT_SQL, {"team_id": self.team.pk, "event_id": pk},)
         result = ClickhouseEventSerializer(query_result[0], many=False).data
@@ -12,8 +12,8 @@ from ee.clickhouse.queries.sessions.clickhouse_sessions import ClickhouseSession
 from ee.clickhouse.queries.trends.clickhouse_trends import ClickhouseTrends
 from ee.clickhouse.queries.util import get_earliest_timestamp
 from posthog.api.insight import InsightViewSet
-from posthog.constants import INSIGHT_FUNNELS, INSIGHT_PATHS, INSIGHT_SESSIONS, TRENDS_STICKINESS
-from posthog.decorators import cached_function
+from posthog.constants import INSIGHT_FUNNELS, INSIGHT_PATHS, INSIGHT_SESSIONS, TRENDS_LIFECYCLE, TRENDS_STICKINESS
+from posthog.decorators import cached_function, calculate_incrementally
 from posthog.models import Event
 from posthog.models.filters import Filter
 from posthog.models.filters.path_filter import PathFilter
@@ -34,18 +34,17 @@ class ClickhouseInsightsViewSet(InsightViewSet):
             )
             result = ClickhouseStickiness().run(stickiness_filter, team)
         else:
-            result = ClickhouseTrends().run(filter, team)
+            result = calculate_incrementally(filter, team.pk, lambda filter: ClickhouseTrends().run(filter, team))
+        # Stickiness and lifecycle don't sample
+        sampling = filter.sampling_to_dict() if filter.shown_as not in (TRENDS_STICKINESS, TRENDS_LIFECYCLE) else {}
 
         self._refresh_dashboard(request=request)
-        return {"result": result}
+        return {"result": result, **sampling}
 
     @cached_function()
     def calculate_session(self, request: Request) -> Dict[str, Any]:
-        return {
-            "result": ClickhouseSessions().run(
-                team=self.team, filter=SessionsFilter(request=request, data={"insight": INSIGHT_SESSIONS})
-            )
-        }
+        filter = SessionsFilter(request=request, data={"insight": INSIGHT_SESSIONS})
+        return {"result": ClickhouseSessions().run(team=self.team, filter=filter), **filter.sampling_to_dict()}
 
     @cached_function()
     def calculate_path(self, request: Request) -> Dict[str, Any]:
@@ -63,7 +62,7 @@ class ClickhouseInsightsViewSet(InsightViewSet):
     def calculate_funnel(self, request: Request) -> Dict[str, Any]:
         team = self.team
         filter = Filter(request=request, data={"insight": INSIGHT_FUNNELS})
-        return {"result": ClickhouseFunnel(team=team, filter=filter).run()}
+        return {"result": ClickhouseFunnel(team=team, filter=filter).run(), **filter.sampling_to_dict()}
 
     @cached_function()
     def calculate_retention(self, request: Request) -> Dict[str, Any]:
@@ -73,4 +72,4 @@ class ClickhouseInsightsViewSet(InsightViewSet):
             data.update({"date_from": "-11d"})
         filter = RetentionFilter(data=data, request=request)
         result = ClickhouseRetention().run(filter, team)
-        return {"result": result}
+        return {"result": result, **filter.sampling_to_dict()}
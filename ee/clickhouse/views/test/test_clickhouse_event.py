@@ -5,6 +5,7 @@ from uuid import uuid4
 from django.utils import timezone
 from freezegun import freeze_time
 
+from ee.clickhouse.client import get_query_tags
 from ee.clickhouse.models.event import create_event
 from ee.clickhouse.util import ClickhouseTestMixin
 from posthog.api.test.base import TransactionBaseTest
@@ -47,3 +48,15 @@ class ClickhouseTestEventApi(
         patch_sync_execute.return_value = [("event", "d", "{}", timezone.now(), "d", "d", "d") for _ in range(0, 100)]
         response = self.client.get("/api/event/").json()
         self.assertEqual(patch_sync_execute.call_count, 3)
+
+    @patch("ee.clickhouse.views.events.sync_execute_iter")
+    def test_csv_export_queries_are_tagged(self, patch_sync_execute_iter):
+        tags = []
+        patch_sync_execute_iter.side_effect = lambda *args, **kwargs: tags.append(get_query_tags()) or iter(())
+
+        response = self.client.get("/api/event.csv")
+        b"".join(response.streaming_content)
+
+        self.assertEqual(len(tags), 1)
+        self.assertEqual(tags[0]["team_id"], self.team.pk)
+        self.assertEqual(tags[0]["route"], "/api/event.csv")
@@ -1,16 +1,27 @@
-import io
 import json
-from typing import Any, Callable, Dict, Optional
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Sequence
 
 import kafka_helper
+import statsd
 from google.protobuf.internal.encoder import _VarintBytes  # type: ignore
 from google.protobuf.json_format import MessageToJson
 from kafka import KafkaProducer as KP
+from kafka.errors import KafkaTimeoutError
 
 from ee.clickhouse.client import async_execute, sync_execute
 from ee.kafka_client import helper
-from ee.settings import KAFKA_ENABLED
-from posthog.settings import IS_HEROKU, KAFKA_BASE64_KEYS, KAFKA_HOSTS, TEST
+from ee.settings import (
+    KAFKA_ENABLED,
+    KAFKA_PRODUCER_BATCH_SIZE,
+    KAFKA_PRODUCER_BUFFER_MEMORY,
+    KAFKA_PRODUCER_COMPRESSION,
+    KAFKA_PRODUCER_LINGER_MS,
+    KAFKA_PRODUCER_MAX_BLOCK_MS,
+    KAFKA_PRODUCER_METRICS_INTERVAL_SECONDS,
+)
+from posthog.settings import IS_HEROKU, KAFKA_BASE64_KEYS, KAFKA_HOSTS, STATSD_PREFIX, TEST
 from posthog.utils import SingletonDecorator
 
 
@@ -25,30 +36,117 @@ class TestKafkaProducer:
         return
 
 
+class _DeliveryStats:
+    """
+    Counts produced messages and their delivery reports, which come in on the producer's I/O thread,
+    and reports them to statsd at most every `interval` seconds instead of once per message.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+        self._buffer_full = 0
+        self._in_flight = 0
+        self._last_report = monotonic()
+
+    def produced(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+        self.maybe_report()
+
+    def delivered(self, _record_metadata: Any) -> None:
+        with self._lock:
+            self._sent += 1
+            self._in_flight -= 1
+        self.maybe_report()
+
+    def failed(self, _exception: Exception) -> None:
+        with self._lock:
+            self._failed += 1
+            self._in_flight -= 1
+        self.maybe_report()
+
+    def buffer_full(self) -> None:
+        with self._lock:
+            self._buffer_full += 1
+        self.maybe_report()
+
+    def maybe_report(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and monotonic() - self._last_report < self.interval:
+                return
+            sent, failed, buffer_full, in_flight = self._sent, self._failed, self._buffer_full, self._in_flight
+            self._sent = self._failed = self._buffer_full = 0
+            self._last_report = monotonic()
+
+        counter = statsd.Counter("%s_posthog_kafka_producer" % (STATSD_PREFIX,))
+        counter.increment("sent", sent)
+        counter.increment("failed", failed)
+        counter.increment("buffer_full", buffer_full)
+        statsd.Gauge("%s_posthog_kafka_producer" % (STATSD_PREFIX,)).send("queue_depth", in_flight)
+
+
 class _KafkaProducer:
     def __init__(self):
+        # Messages are batched per partition for up to linger_ms and compressed as a batch. Once buffer_memory
+        # is used up, send() blocks for at most max_block_ms before raising, which is our back-pressure
+        config = {
+            "linger_ms": KAFKA_PRODUCER_LINGER_MS,
+            "batch_size": KAFKA_PRODUCER_BATCH_SIZE,
+            "compression_type": KAFKA_PRODUCER_COMPRESSION,
+            "buffer_memory": KAFKA_PRODUCER_BUFFER_MEMORY,
+            "max_block_ms": KAFKA_PRODUCER_MAX_BLOCK_MS,
+        }
         if TEST:
             self.producer = TestKafkaProducer()
         elif IS_HEROKU:
-            self.producer = kafka_helper.get_kafka_producer(value_serializer=lambda d: d)
+            self.producer = KP(
+                bootstrap_servers=kafka_helper.get_kafka_brokers(),
+                security_protocol="SSL",
+                ssl_context=kafka_helper.get_kafka_ssl_context(),
+                acks="all",
+                **config,
+            )
         elif KAFKA_BASE64_KEYS:
-            self.producer = helper.get_kafka_producer(value_serializer=lambda d: d)
+            self.producer = helper.get_kafka_producer(value_serializer=lambda d: d, **config)
         else:
-            self.producer = KP(bootstrap_servers=KAFKA_HOSTS)
+            self.producer = KP(bootstrap_servers=KAFKA_HOSTS, **config)
+        self.stats = _DeliveryStats(KAFKA_PRODUCER_METRICS_INTERVAL_SECONDS)
 
     @staticmethod
     def json_serializer(d):
-        b = json.dumps(d).encode("utf-8")
-        return b
+        return json.dumps(d, separators=(",", ":")).encode("utf-8")
 
     def produce(self, topic: str, data: Any, value_serializer: Optional[Callable[[Any], Any]] = None):
+        self.produce_batch(topic, [data], value_serializer)
+
+    def produce_batch(
+        self, topic: str, data: Sequence[Any], value_serializer: Optional[Callable[[Any], Any]] = None
+    ) -> None:
+        "Sends a list of messages to `topic`, all serialized up front and handed to the producer in one go"
         if not value_serializer:
             value_serializer = self.json_serializer
-        b = value_serializer(data)
-        self.producer.send(topic, b)
+        messages = [value_serializer(message) for message in data]
+        for message in messages:
+            try:
+                future = self.producer.send(topic, message)
+            except KafkaTimeoutError:
+                # The buffer stayed full (or the topic's metadata couldn't be fetched) for max_block_ms
+                self.stats.buffer_full()
+                raise
+            if future is not None:
+                self.stats.produced()
+                future.add_callback(self.stats.delivered)
+                future.add_errback(self.stats.failed)
 
-    def close(self):
+    def flush(self):
         self.producer.flush()
+        self.stats.maybe_report(force=True)
+
+    def close(self):
+        self.flush()
 
 
 KafkaProducer = SingletonDecorator(_KafkaProducer)
@@ -64,11 +162,8 @@ class ClickhouseProducer:
 
     @staticmethod
     def proto_length_serializer(data: Any) -> bytes:
-        f = io.BytesIO()
-        f.write(_VarintBytes(data.ByteSize()))
-        f.write(data.SerializeToString())
-        f.seek(0)
-        return f.read()
+        # ByteSize() caches the size on the message, so SerializeToString() doesn't compute it again
+        return _VarintBytes(data.ByteSize()) + data.SerializeToString()
 
     def produce_proto(self, sql: str, topic: str, data: Any, sync: bool = True):
         if self.send_to_kafka:
@@ -98,9 +98,10 @@ def get_kafka_brokers():
     ]
 
 
-def get_kafka_producer(acks="all", value_serializer=lambda v: json.dumps(v).encode("utf-8")):
+def get_kafka_producer(acks="all", value_serializer=lambda v: json.dumps(v).encode("utf-8"), **kwargs):
     """
     Return a KafkaProducer that uses the SSLContext created with create_ssl_context.
+    Extra keyword arguments are passed on to KafkaProducer.
     """
 
     producer = KafkaProducer(
@@ -109,6 +110,7 @@ def get_kafka_producer(acks="all", value_serializer=lambda v: json.dumps(v).enco
         ssl_context=get_kafka_ssl_context(),
         value_serializer=value_serializer,
         acks=acks,
+        **kwargs,
     )
 
     return producer
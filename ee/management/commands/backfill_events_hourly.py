@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ee.clickhouse.client import query_tags, sync_execute
+from ee.clickhouse.sql.events_hourly import BACKFILL_EVENTS_HOURLY_SQL, GET_EVENTS_HOURLY_MV_CREATED_AT_SQL
+from posthog.settings import CLICKHOUSE_DATABASE
+
+
+# ex: python manage.py backfill_events_hourly
+class Command(BaseCommand):
+    help = "Roll up the events that got in before the events_hourly materialized view existed. Run it once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only print up to when events would be rolled up")
+
+    def handle(self, *args, **options):
+        rows = sync_execute(GET_EVENTS_HOURLY_MV_CREATED_AT_SQL, {"database": CLICKHOUSE_DATABASE})
+        if not rows:
+            print("events_hourly_mv doesn't exist, run the ClickHouse migrations first")
+            return
+
+        before = rows[0][0]
+        if options["dry_run"]:
+            print("Would roll up events ingested before {}".format(before))
+            return
+
+        with query_tags(governed=False):
+            sync_execute(BACKFILL_EVENTS_HOURLY_SQL, {"before": before})
+        print("Rolled up events ingested before {}".format(before))
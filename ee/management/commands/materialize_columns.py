@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from ee.clickhouse.materialized_columns import (
+    backfill_materialized_column,
+    get_materialized_columns,
+    get_properties_to_materialize,
+    materialize,
+)
+
+
+# ex: python manage.py materialize_columns --count 10 --backfill-days 90
+class Command(BaseCommand):
+    help = "Materialize the most filtered on event properties into columns of the events table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10, help="How many of the most used properties to materialize")
+        parser.add_argument(
+            "--property", type=str, action="append", help="Materialize this property instead, can be repeated"
+        )
+        parser.add_argument(
+            "--backfill-days", type=int, default=0, help="Write the columns for events from the last N days too"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only print which properties would be materialized")
+
+    def handle(self, *args, **options):
+        if options["property"]:
+            materialized = get_materialized_columns()
+            properties = [property for property in options["property"] if property not in materialized]
+        else:
+            properties = get_properties_to_materialize(options["count"])
+
+        if not properties:
+            print("No properties to materialize")
+            return
+
+        for property in properties:
+            if options["dry_run"]:
+                print("Would materialize {}".format(property))
+                continue
+
+            column = materialize(property)
+            print("Materialized {} as {}".format(property, column))
+            if options["backfill_days"] > 0:
+                backfill_materialized_column(property, column, options["backfill_days"])
+                print("Backfilled {} for the last {} days".format(column, options["backfill_days"]))
@@ -1,11 +1,22 @@
 """
 Django settings for PostHog Enterprise Edition.
 """
+import json
 import os
+from distutils.util import strtobool
 from typing import Dict, List
 
-from posthog.constants import RDBMS
-from posthog.settings import PRIMARY_DB, TEST
+from posthog.constants import (
+    INSIGHT_FUNNELS,
+    INSIGHT_LIFECYCLE,
+    INSIGHT_PATHS,
+    INSIGHT_RETENTION,
+    INSIGHT_SESSIONS,
+    INSIGHT_STICKINESS,
+    INSIGHT_TRENDS,
+    RDBMS,
+)
+from posthog.settings import PRIMARY_DB, TEST, get_from_env
 
 # Zapier REST hooks
 HOOK_EVENTS: Dict[str, str] = {
@@ -26,5 +37,91 @@ if "SOCIAL_AUTH_GOOGLE_OAUTH2_WHITELISTED_DOMAINS" in os.environ:
     ].split(",")
 
 # ClickHouse and Kafka
-CLICKHOUSE_DENORMALIZED_PROPERTIES = os.getenv("CLICKHOUSE_DENORMALIZED_PROPERTIES", "").split(",")
 KAFKA_ENABLED = PRIMARY_DB == RDBMS.CLICKHOUSE and not TEST
+
+# Read event properties from their MATERIALIZED column on the events table when there is one. Columns are added
+# with `./manage.py materialize_columns`, and looked up again every CLICKHOUSE_MATERIALIZED_COLUMNS_CACHE_TTL seconds
+CLICKHOUSE_MATERIALIZED_COLUMNS_ENABLED = get_from_env(
+    "CLICKHOUSE_MATERIALIZED_COLUMNS_ENABLED", True, type_cast=strtobool
+)
+CLICKHOUSE_MATERIALIZED_COLUMNS_CACHE_TTL = get_from_env("CLICKHOUSE_MATERIALIZED_COLUMNS_CACHE_TTL", 60, type_cast=int)
+
+# Look up the person of each event's distinct id with joinGet on the person_distinct_id_join table, rather than
+# joining on person_distinct_id. Trades memory on the ClickHouse node for a join on each query. The table is created
+# and filled by ClickHouse migration 0008 while this is enabled, and kept current by a materialized view on
+# person_distinct_id. That view only sees rows inserted on its own node, so leave this off with CLICKHOUSE_REPLICATION
+CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE = get_from_env(
+    "CLICKHOUSE_PERSON_DISTINCT_ID_JOIN_TABLE", False, type_cast=strtobool
+)
+
+# Count trends of events with no property filters from the events_hourly rollup, see
+# ee.clickhouse.queries.trends.rollup. Enable once `./manage.py backfill_events_hourly` has run. DAU counts unique
+# distinct ids there, rather than persons, so it's only taken from the rollup with CLICKHOUSE_TRENDS_ROLLUP_DAU
+CLICKHOUSE_TRENDS_ROLLUP_ENABLED = get_from_env("CLICKHOUSE_TRENDS_ROLLUP_ENABLED", False, type_cast=strtobool)
+CLICKHOUSE_TRENDS_ROLLUP_DAU = get_from_env("CLICKHOUSE_TRENDS_ROLLUP_DAU", False, type_cast=strtobool)
+
+# Maximum number of queries a process runs at once for one batch (ee.clickhouse.client.sync_execute_batch)
+CLICKHOUSE_QUERY_CONCURRENCY = get_from_env("CLICKHOUSE_QUERY_CONCURRENCY", 8, type_cast=int)
+
+# Query governor, for queries run on behalf of a team (see ee.clickhouse.client.query_tags)
+# ClickHouse settings applied by default, by insight type. Override with e.g.
+# CLICKHOUSE_QUERY_LIMITS='{"PATHS": {"max_execution_time": 300}}'
+CLICKHOUSE_QUERY_LIMITS: Dict[str, Dict[str, int]] = {
+    "default": {
+        "max_execution_time": 60,  # seconds
+        "max_memory_usage": 10 * 1024 ** 3,  # bytes
+        "max_rows_to_read": 5_000_000_000,
+    },
+    INSIGHT_FUNNELS: {"max_execution_time": 120},
+    INSIGHT_PATHS: {"max_execution_time": 120, "max_memory_usage": 20 * 1024 ** 3},
+    INSIGHT_RETENTION: {"max_execution_time": 120},
+}
+for _insight, _limits in json.loads(os.getenv("CLICKHOUSE_QUERY_LIMITS", "{}")).items():
+    CLICKHOUSE_QUERY_LIMITS[_insight] = {**CLICKHOUSE_QUERY_LIMITS.get(_insight, {}), **_limits}
+# Queries running at once, across all workers, per team and overall. Queries over the limit wait for up to
+# CLICKHOUSE_QUERY_QUEUE_TIMEOUT seconds, then fail
+CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_TEAM = get_from_env(
+    "CLICKHOUSE_MAX_CONCURRENT_QUERIES_PER_TEAM", 10, type_cast=int
+)
+CLICKHOUSE_MAX_CONCURRENT_QUERIES = get_from_env("CLICKHOUSE_MAX_CONCURRENT_QUERIES", 100, type_cast=int)
+CLICKHOUSE_QUERY_QUEUE_TIMEOUT = get_from_env("CLICKHOUSE_QUERY_QUEUE_TIMEOUT", 30, type_cast=int)
+
+# Queries slower than this are kept in a log of the last CLICKHOUSE_SLOW_QUERY_LOG_SIZE, see /api/slow_ch_queries/
+CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS = get_from_env("CLICKHOUSE_SLOW_QUERY_THRESHOLD_MS", 5000, type_cast=int)
+CLICKHOUSE_SLOW_QUERY_LOG_SIZE = get_from_env("CLICKHOUSE_SLOW_QUERY_LOG_SIZE", 1000, type_cast=int)
+
+# ClickHouse query result cache (ee.clickhouse.client.cache_sync_execute), used by the trends, funnel, retention and
+# paths queries. Off in tests, which change events between queries
+CLICKHOUSE_QUERY_CACHE_ENABLED = get_from_env("CLICKHOUSE_QUERY_CACHE_ENABLED", not TEST, type_cast=strtobool)
+# Seconds results are fresh for, by query class. Override with e.g. CLICKHOUSE_QUERY_CACHE_TTLS='{"PATHS": 600}'
+CLICKHOUSE_QUERY_CACHE_TTLS: Dict[str, int] = {
+    INSIGHT_TRENDS: 60,
+    INSIGHT_STICKINESS: 60,
+    INSIGHT_LIFECYCLE: 60,
+    INSIGHT_FUNNELS: 60,
+    INSIGHT_SESSIONS: 60,
+    INSIGHT_PATHS: 300,
+    INSIGHT_RETENTION: 300,
+    **json.loads(os.getenv("CLICKHOUSE_QUERY_CACHE_TTLS", "{}")),
+}
+# Once no longer fresh, results are still served for this long while one worker recomputes them
+CLICKHOUSE_QUERY_CACHE_STALE_TTL = get_from_env("CLICKHOUSE_QUERY_CACHE_STALE_TTL", 60, type_cast=int)
+# How long other workers wait for the one computing a result before computing it themselves
+CLICKHOUSE_QUERY_CACHE_LOCK_TIMEOUT = get_from_env("CLICKHOUSE_QUERY_CACHE_LOCK_TIMEOUT", 30, type_cast=int)
+# Per-process cache in front of Redis. Results with more rows than this aren't kept in it
+CLICKHOUSE_QUERY_CACHE_LOCAL_TTL = get_from_env("CLICKHOUSE_QUERY_CACHE_LOCAL_TTL", 5, type_cast=int)
+CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_SIZE = get_from_env("CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_SIZE", 1000, type_cast=int)
+CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_ROWS = get_from_env("CLICKHOUSE_QUERY_CACHE_LOCAL_MAX_ROWS", 10_000, type_cast=int)
+
+# Kafka producer tuning, see https://kafka-python.readthedocs.io/en/master/apidoc/KafkaProducer.html
+KAFKA_PRODUCER_LINGER_MS = get_from_env("KAFKA_PRODUCER_LINGER_MS", 20, type_cast=int)
+KAFKA_PRODUCER_BATCH_SIZE = get_from_env("KAFKA_PRODUCER_BATCH_SIZE", 64 * 1024, type_cast=int)  # bytes per partition
+# "gzip", "snappy", "lz4" or "zstd", the latter two need the lz4 and zstandard packages
+KAFKA_PRODUCER_COMPRESSION = get_from_env("KAFKA_PRODUCER_COMPRESSION", optional=True)
+# Messages waiting to be sent are buffered up to this many bytes. Once full, produce() waits for at most
+# KAFKA_PRODUCER_MAX_BLOCK_MS for the brokers to catch up, then fails instead of stalling capture. It also bounds
+# fetching a topic's metadata on the first produce, which can take seconds on a cold process or with SSL
+KAFKA_PRODUCER_BUFFER_MEMORY = get_from_env("KAFKA_PRODUCER_BUFFER_MEMORY", 32 * 1024 * 1024, type_cast=int)
+KAFKA_PRODUCER_MAX_BLOCK_MS = get_from_env("KAFKA_PRODUCER_MAX_BLOCK_MS", 5000, type_cast=int)
+# How often delivery counters are reported to statsd
+KAFKA_PRODUCER_METRICS_INTERVAL_SECONDS = get_from_env("KAFKA_PRODUCER_METRICS_INTERVAL_SECONDS", 10, type_cast=int)
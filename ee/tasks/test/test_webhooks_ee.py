@@ -44,3 +44,25 @@ class TestWebhooksEE(BaseTest):
         events = Event.objects.filter(event="User paid")
 
         self.assertEqual(list(events), [])
+
+    @patch("requests.post")
+    def test_post_event_to_webhook_ee_matches_elements_chain(self, requests_post):
+        self.team.slack_incoming_webhook = "http://slack.com/hook"
+        self.team.save()
+        action = Action.objects.create(team=self.team, name="clicked small link", post_to_slack=True)
+        ActionStep.objects.create(action=action, event="$autocapture", selector="a.small", href="/a-url")
+        other_action = Action.objects.create(team=self.team, name="clicked button", post_to_slack=True)
+        ActionStep.objects.create(action=other_action, event="$autocapture", selector="button")
+
+        event = {
+            "event": "$autocapture",
+            "properties": {},
+            "distinct_id": "test",
+            "timestamp": now(),
+            "elements_chain": 'a.small.xy:z:attr_class="xyz small\\""href="/a-url"nth-child="0"nth-of-type="0"',
+        }
+        post_event_to_webhook_ee(event, self.team.pk, "http://testserver")
+
+        self.assertEqual(requests_post.call_count, 1)
+        self.assertIn("clicked small link", requests_post.call_args[1]["json"]["text"])
+        self.assertEqual(Event.objects.count(), 0)
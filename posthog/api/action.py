@@ -44,7 +44,7 @@ from posthog.models.team import Team
 from posthog.permissions import ProjectMembershipNecessaryPermissions
 from posthog.queries import base, retention, stickiness, trends
 from posthog.tasks.calculate_action import calculate_action
-from posthog.utils import generate_cache_key, get_safe_cache
+from posthog.utils import get_safe_cache
 
 from .person import PersonSerializer, paginated_result
 
@@ -233,7 +233,7 @@ class ActionViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
         dashboard_id = request.GET.get("from_dashboard", None)
 
         filter = Filter(request=request)
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), team.pk))
+        cache_key = filter.cache_key(team.pk)
         result = {"loading": True}
 
         if refresh:
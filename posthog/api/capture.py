@@ -1,7 +1,7 @@
 import re
 from datetime import datetime
 from random import random
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import statsd
 from dateutil import parser
@@ -18,7 +18,7 @@ from posthog.models.utils import UUIDT
 from posthog.utils import cors_response, get_ip_address, load_data_from_request
 
 if settings.EE_AVAILABLE:
-    from ee.clickhouse.process_event import log_event, process_event_ee
+    from ee.clickhouse.process_event import log_events, process_event_ee
     from ee.kafka_client.topics import KAFKA_EVENTS_PLUGIN_INGESTION, KAFKA_EVENTS_WAL
 
 
@@ -93,6 +93,83 @@ def _ensure_web_feature_flags_in_properties(event: Dict[str, Any], team: Team, d
         event["properties"]["$active_feature_flags"] = get_active_feature_flags(team, distinct_id)
 
 
+def _publish_events_ee(
+    events: List[Dict[str, Any]],
+    distinct_ids: List[str],
+    ip: Optional[str],
+    site_url: str,
+    team: Team,
+    now: datetime,
+    sent_at: Optional[datetime],
+) -> None:
+    log_topics = [KAFKA_EVENTS_WAL]
+
+    if settings.PLUGIN_SERVER_INGESTION:
+        log_topics.append(KAFKA_EVENTS_PLUGIN_INGESTION)
+        statsd.Counter("%s_posthog_cloud_plugin_server_ingestion" % (settings.STATSD_PREFIX,)).increment(
+            delta=len(events)
+        )
+
+    event_uuids = [UUIDT() for _ in events]
+    log_events(list(zip(distinct_ids, events, event_uuids)), ip, site_url, team.id, now, sent_at, topics=log_topics)
+
+    # must done after logging because process_event_ee modifies the event, e.g. by removing $elements
+    if not settings.PLUGIN_SERVER_INGESTION:
+        for event, distinct_id, event_uuid in zip(events, distinct_ids, event_uuids):
+            process_event_ee(
+                distinct_id=distinct_id,
+                ip=ip,
+                site_url=site_url,
+                data=event,
+                team_id=team.id,
+                now=now,
+                sent_at=sent_at,
+                event_uuid=event_uuid,
+            )
+
+
+def _publish_events(
+    events: List[Dict[str, Any]],
+    distinct_ids: List[str],
+    ip: Optional[str],
+    site_url: str,
+    team: Team,
+    now: datetime,
+    sent_at: Optional[datetime],
+) -> None:
+    task_name = "posthog.tasks.process_event.process_event"
+    if settings.PLUGIN_SERVER_INGESTION or team.plugins_opt_in:
+        task_name += "_with_plugins"
+        celery_queue = settings.PLUGINS_CELERY_QUEUE
+    else:
+        celery_queue = settings.CELERY_DEFAULT_QUEUE
+
+    now_isoformat = now.isoformat()
+    # Publish the whole batch over a single broker connection instead of acquiring one per event
+    with celery_app.producer_or_acquire() as producer:
+        if task_name == "posthog.tasks.process_event.process_event" and settings.PROCESS_EVENT_BATCH_SIZE > 0:
+            tasks = [
+                [distinct_id, ip, site_url, event, team.id, now_isoformat, sent_at]
+                for event, distinct_id in zip(events, distinct_ids)
+            ]
+            for index in range(0, len(tasks), settings.PROCESS_EVENT_BATCH_SIZE):
+                celery_app.send_task(
+                    name="posthog.tasks.process_event.process_event_batch",
+                    queue=celery_queue,
+                    args=[tasks[index : index + settings.PROCESS_EVENT_BATCH_SIZE]],
+                    producer=producer,
+                )
+            return
+
+        for event, distinct_id in zip(events, distinct_ids):
+            celery_app.send_task(
+                name=task_name,
+                queue=celery_queue,
+                args=[distinct_id, ip, site_url, event, team.id, now_isoformat, sent_at,],
+                producer=producer,
+            )
+
+
 @csrf_exempt
 def get_event(request):
     timer = statsd.Timer("%s_posthog_cloud" % (settings.STATSD_PREFIX,))
@@ -101,7 +178,7 @@ def get_event(request):
     try:
         data_from_request = load_data_from_request(request)
         data = data_from_request["data"]
-    except TypeError:
+    except (TypeError, ValueError):
         return cors_response(
             request,
             JsonResponse(
@@ -174,9 +251,12 @@ def get_event(request):
     else:
         events = [data]
 
+    # Validate the whole payload up front, so that a malformed event in the middle of a batch
+    # doesn't leave the events before it published and the ones after it dropped
+    distinct_ids = []
     for event in events:
         try:
-            distinct_id = _get_distinct_id(event)
+            distinct_ids.append(_get_distinct_id(event))
         except KeyError:
             return cors_response(
                 request,
@@ -198,57 +278,20 @@ def get_event(request):
                 ),
             )
 
+    # Everything below is the same for every event in the request, so only compute it once
+    site_url = request.build_absolute_uri("/")[:-1]
+    ip = None if team.anonymize_ips else get_ip_address(request)
+
+    for event, distinct_id in zip(events, distinct_ids):
         if not event.get("properties"):
             event["properties"] = {}
 
         _ensure_web_feature_flags_in_properties(event, team, distinct_id)
 
-        event_uuid = UUIDT()
-        ip = None if team.anonymize_ips else get_ip_address(request)
-
-        if is_ee_enabled():
-            log_topics = [KAFKA_EVENTS_WAL]
-
-            if settings.PLUGIN_SERVER_INGESTION:
-                log_topics.append(KAFKA_EVENTS_PLUGIN_INGESTION)
-                statsd.Counter("%s_posthog_cloud_plugin_server_ingestion" % (settings.STATSD_PREFIX,)).increment()
-
-            log_event(
-                distinct_id=distinct_id,
-                ip=ip,
-                site_url=request.build_absolute_uri("/")[:-1],
-                data=event,
-                team_id=team.id,
-                now=now,
-                sent_at=sent_at,
-                event_uuid=event_uuid,
-                topics=log_topics,
-            )
-
-            # must done after logging because process_event_ee modifies the event, e.g. by removing $elements
-            if not settings.PLUGIN_SERVER_INGESTION:
-                process_event_ee(
-                    distinct_id=distinct_id,
-                    ip=ip,
-                    site_url=request.build_absolute_uri("/")[:-1],
-                    data=event,
-                    team_id=team.id,
-                    now=now,
-                    sent_at=sent_at,
-                    event_uuid=event_uuid,
-                )
-        else:
-            task_name = "posthog.tasks.process_event.process_event"
-            if settings.PLUGIN_SERVER_INGESTION or team.plugins_opt_in:
-                task_name += "_with_plugins"
-                celery_queue = settings.PLUGINS_CELERY_QUEUE
-            else:
-                celery_queue = settings.CELERY_DEFAULT_QUEUE
+    if is_ee_enabled():
+        _publish_events_ee(events, distinct_ids, ip, site_url, team, now, sent_at)
+    else:
+        _publish_events(events, distinct_ids, ip, site_url, team, now, sent_at)
 
-            celery_app.send_task(
-                name=task_name,
-                queue=celery_queue,
-                args=[distinct_id, ip, request.build_absolute_uri("/")[:-1], event, team.id, now.isoformat(), sent_at,],
-            )
     timer.stop("event_endpoint")
     return cors_response(request, JsonResponse({"status": 1}))
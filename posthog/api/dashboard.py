@@ -1,27 +1,38 @@
+import json
 import secrets
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from distutils.util import strtobool
-from typing import Any, Dict, Optional, cast
+from typing import Any, Dict, Iterator, List, Optional, cast
 
 import posthoganalytics
+from django.conf import settings
 from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
 from django.db.models import Model, Prefetch, QuerySet
 from django.db.models.query_utils import Q
-from django.http import HttpRequest
+from django.http import HttpRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.timezone import now
 from django.views.decorators.clickjacking import xframe_options_exempt
 from rest_framework import authentication, response, serializers, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.exceptions import AuthenticationFailed, NotFound, PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
+from sentry_sdk import capture_exception
 
 from posthog.api.routing import StructuredViewSetMixin
 from posthog.api.user import UserSerializer
 from posthog.auth import PersonalAPIKeyAuthentication, PublicTokenAuthentication
+from posthog.decorators import CacheType
+from posthog.ee import query_tags
 from posthog.helpers import create_dashboard_from_template
 from posthog.models import Dashboard, DashboardItem, Team
 from posthog.permissions import ProjectMembershipNecessaryPermissions
+from posthog.tasks.update_cache import dashboard_item_cache_params, update_cache_item
 from posthog.utils import get_safe_cache, render_template
 
 
@@ -141,12 +152,99 @@ class DashboardsViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
         serializer = DashboardSerializer(dashboard, context={"view": self, "request": request})
         return response.Response(serializer.data)
 
+    @action(methods=["GET"], detail=True)
+    def compute(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+        """
+        Results of all of the dashboard's items, streamed as a JSON object per line in the order they're ready in:
+        cached ones first, then the others as they're calculated, DASHBOARD_COMPUTE_CONCURRENCY at a time. Items with
+        the same filters are calculated once. Pass refresh=true to recalculate all of them.
+
+        Shared dashboards only get cached results, so that anyone with the link can't run queries on the team's behalf:
+        other items are reported as pending until update_cached_items has refreshed them.
+        """
+        refresh = strtobool(request.GET.get("refresh", "false"))
+        shared = "share_token" in request.GET
+        if refresh and shared:
+            raise PermissionDenied(detail="Shared dashboards can't be refreshed.")
+        dashboard = get_object_or_404(self.get_queryset(), pk=kwargs["pk"])
+        dashboard.last_accessed_at = now()
+        dashboard.save(update_fields=["last_accessed_at"])
+        items = (
+            DashboardItem.objects.filter(dashboard=dashboard, deleted=False, filters__isnull=False)
+            .exclude(filters={})
+            .select_related("dashboard", "team")
+            .order_by("order")
+        )
+
+        items_by_key: Dict[str, List[DashboardItem]] = defaultdict(list)
+        params = {}
+        for item in items:
+            key, cache_type, payload = dashboard_item_cache_params(item)
+            items_by_key[key].append(item)
+            params[key] = (cache_type, payload)
+
+        cached_results = {} if refresh else cache.get_many(list(items_by_key.keys()))
+
+        def lines() -> Iterator[str]:
+            misses = []
+            for key, same_items in items_by_key.items():
+                cached = cached_results.get(key)
+                if cached and not cached.get("task_id", None):
+                    yield from _result_lines(same_items, cached.get("result"), cached.get("last_refresh"), True)
+                else:
+                    misses.append(key)
+
+            if shared:
+                for key in misses:
+                    yield from _result_lines(items_by_key[key], None, None, False, pending=True)
+                return
+            if not misses:
+                return
+            with ThreadPoolExecutor(max_workers=settings.DASHBOARD_COMPUTE_CONCURRENCY) as executor:
+                futures = {
+                    executor.submit(_compute_dashboard_item, dashboard.team_id, key, *params[key]): key
+                    for key in misses
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        capture_exception(e)
+                        result = None
+                    yield from _result_lines(items_by_key[futures[future]], result, now(), False)
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
     def get_parents_query_dict(self) -> Dict[str, Any]:  # to be moved to a separate Legacy*ViewSet Class
         if not self.request.user.is_authenticated or "share_token" in self.request.GET or not self.request.user.team:
             return {}
         return {"team_id": self.request.user.team.id}
 
 
+def _compute_dashboard_item(team_id: int, key: str, cache_type: CacheType, payload: Dict[str, Any]) -> Any:
+    try:
+        # Worker threads don't see the request's query tags, so the queries are tagged with the team again
+        with query_tags(team_id=team_id, route="dashboard_compute"):
+            return update_cache_item(key, cache_type, payload)
+    finally:
+        # Each worker thread opens its own database connection
+        connection.close()
+
+
+def _result_lines(
+    items: List[DashboardItem], result: Any, last_refresh: Optional[datetime], is_cached: bool, pending: bool = False
+) -> Iterator[str]:
+    for item in items:
+        line = {
+            "id": item.pk,
+            "result": result,
+            "last_refresh": last_refresh,
+            "is_cached": is_cached,
+            "pending": pending,
+        }
+        yield json.dumps(line, cls=DjangoJSONEncoder) + "\n"
+
+
 class DashboardItemSerializer(serializers.ModelSerializer):
     result = serializers.SerializerMethodField()
     last_refresh = serializers.SerializerMethodField()
@@ -2,8 +2,10 @@ import json
 from datetime import timedelta
 from typing import Any, Dict, List, Optional, Union, cast
 
+from django.conf import settings
 from django.db.models import Prefetch, QuerySet
 from django.db.models.query_utils import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.timezone import now
 from rest_framework import request, response, serializers, viewsets
@@ -14,6 +16,7 @@ from rest_framework.settings import api_settings
 from rest_framework_csv import renderers as csvrenderers
 
 from posthog.api.routing import StructuredViewSetMixin
+from posthog.api.utils import chunked, streaming_csv_response
 from posthog.models import Element, ElementGroup, Event, Filter, Person, PersonDistinctId
 from posthog.models.action import Action
 from posthog.models.event import EventManager
@@ -72,6 +75,9 @@ class EventSerializer(serializers.HyperlinkedModelSerializer):
             return event.distinct_id
 
     def get_elements(self, event: Event):
+        if hasattr(event, "elements_list"):
+            # Events that were never saved, e.g. built from ClickHouse for hooks
+            return ElementSerializer(event.elements_list, many=True).data  # type: ignore
         if not event.elements_hash:
             return []
         if hasattr(event, "elements_group_cache"):
@@ -102,7 +108,8 @@ class EventViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated, ProjectMembershipNecessaryPermissions]
 
-    CSV_EXPORT_LIMIT = 100_000  # Return at most this number of events in CSV export
+    CSV_EXPORT_LIMIT = settings.CSV_EXPORT_LIMIT  # Return at most this number of events in CSV export
+    CSV_EXPORT_FIELDS = ["id", "distinct_id", "event", "timestamp", "person", "properties"]
 
     def get_queryset(self):
         queryset = cast(EventManager, super().get_queryset()).add_person_id(self.team_id)
@@ -138,33 +145,35 @@ class EventViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
                 queryset = queryset.filter(properties_to_Q(filter.properties, team_id=self.team_id))
         return queryset
 
-    def _prefetch_events(self, events: List[Event]) -> List[Event]:
-        team_id = self.team_id
-        distinct_ids = []
-        hash_ids = []
-        for event in events:
-            distinct_ids.append(event.distinct_id)
-            if event.elements_hash:
-                hash_ids.append(event.elements_hash)
+    def _prefetch_people(self, events: List[Event]) -> List[Event]:
         people = Person.objects.filter(
-            team_id=team_id, persondistinctid__distinct_id__in=distinct_ids
+            team_id=self.team_id, persondistinctid__distinct_id__in={event.distinct_id for event in events}
         ).prefetch_related(Prefetch("persondistinctid_set", to_attr="distinct_ids_cache"))
+        properties_by_distinct_id = {
+            distinct_id: person.properties for person in people for distinct_id in person.distinct_ids
+        }
+        for event in events:
+            event.person_properties = properties_by_distinct_id.get(event.distinct_id)  # type: ignore
+        return events
+
+    def _prefetch_events(self, events: List[Event]) -> List[Event]:
+        team_id = self.team_id
+        hash_ids = [event.elements_hash for event in events if event.elements_hash]
+        self._prefetch_people(events)
         if len(hash_ids) > 0:
             groups = ElementGroup.objects.filter(team_id=team_id, hash__in=hash_ids).prefetch_related("element_set")
         else:
             groups = ElementGroup.objects.none()
         for event in events:
-            try:
-                event.person_properties = [person.properties for person in people if event.distinct_id in person.distinct_ids][0]  # type: ignore
-            except IndexError:
-                event.person_properties = None  # type: ignore
             try:
                 event.elements_group_cache = [group for group in groups if group.hash == event.elements_hash][0]  # type: ignore
             except IndexError:
                 event.elements_group_cache = None  # type: ignore
         return events
 
-    def list(self, request: request.Request, *args: Any, **kwargs: Any) -> response.Response:
+    def list(
+        self, request: request.Request, *args: Any, **kwargs: Any
+    ) -> Union[response.Response, StreamingHttpResponse]:
         is_csv_request = self.request.accepted_renderer.format == "csv"
         monday = now() + timedelta(days=-now().weekday())
         # Don't allow events too far into the future
@@ -172,23 +181,23 @@ class EventViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
         next_url: Optional[str] = None
 
         if is_csv_request:
-            events = queryset[: self.CSV_EXPORT_LIMIT]
-        else:
-            events = queryset.filter(timestamp__gte=monday.replace(hour=0, minute=0, second=0))[:101]
-            if len(events) < 101:
-                events = queryset[:101]
-            path = request.get_full_path()
-            reverse = request.GET.get("orderBy", "-timestamp") != "-timestamp"
-            if len(events) > 100:
-                next_url = request.build_absolute_uri(
-                    "{}{}{}={}".format(
-                        path,
-                        "&" if "?" in path else "?",
-                        "after" if reverse else "before",
-                        events[99].timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                    )
+            return self._export_csv(queryset)
+
+        events = queryset.filter(timestamp__gte=monday.replace(hour=0, minute=0, second=0))[:101]
+        if len(events) < 101:
+            events = queryset[:101]
+        path = request.get_full_path()
+        reverse = request.GET.get("orderBy", "-timestamp") != "-timestamp"
+        if len(events) > 100:
+            next_url = request.build_absolute_uri(
+                "{}{}{}={}".format(
+                    path,
+                    "&" if "?" in path else "?",
+                    "after" if reverse else "before",
+                    events[99].timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
                 )
-            events = events[:100]
+            )
+        events = events[:100]
 
         prefetched_events = self._prefetch_events(list(events))
 
@@ -201,6 +210,15 @@ class EventViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
             }
         )
 
+    def _export_csv(self, queryset: QuerySet) -> StreamingHttpResponse:
+        def rows():
+            # Read through a server-side cursor, with persons looked up a chunk of events at a time
+            events = queryset[: self.CSV_EXPORT_LIMIT].iterator(chunk_size=settings.CSV_EXPORT_CHUNK_SIZE)
+            for chunk in chunked(events, settings.CSV_EXPORT_CHUNK_SIZE):
+                yield from EventSerializer(self._prefetch_people(chunk), many=True, context={"format": "csv"}).data
+
+        return streaming_csv_response(self.CSV_EXPORT_FIELDS, rows(), "events.csv")
+
     @action(methods=["GET"], detail=False)
     def values(self, request: request.Request, **kwargs) -> response.Response:
         result = self.get_values(request)
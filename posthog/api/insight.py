@@ -14,7 +14,7 @@ from posthog.api.routing import StructuredViewSetMixin
 from posthog.api.user import UserSerializer
 from posthog.celery import update_cache_item_task
 from posthog.constants import FROM_DASHBOARD, INSIGHT, INSIGHT_FUNNELS, INSIGHT_PATHS, TRENDS_STICKINESS
-from posthog.decorators import CacheType, cached_function
+from posthog.decorators import CacheType, cached_function, calculate_incrementally
 from posthog.models import DashboardItem, Event, Filter, Team
 from posthog.models.filters import Filter, RetentionFilter
 from posthog.models.filters.path_filter import PathFilter
@@ -23,7 +23,7 @@ from posthog.models.filters.stickiness_filter import StickinessFilter
 from posthog.permissions import ProjectMembershipNecessaryPermissions
 from posthog.queries import paths, retention, stickiness, trends
 from posthog.queries.sessions.sessions import Sessions
-from posthog.utils import generate_cache_key, get_safe_cache
+from posthog.utils import get_safe_cache
 
 
 class InsightSerializer(serializers.ModelSerializer):
@@ -162,7 +162,7 @@ class InsightViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
             )
             result = stickiness.Stickiness().run(stickiness_filter, team)
         else:
-            result = trends.Trends().run(filter, team)
+            result = calculate_incrementally(filter, team.pk, lambda filter: trends.Trends().run(filter, team))
 
         self._refresh_dashboard(request=request)
 
@@ -206,7 +206,7 @@ class InsightViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
         refresh = request.GET.get("refresh", None)
 
         filter = Filter(request=request, data={"insight": INSIGHT_FUNNELS})
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), team.pk))
+        cache_key = filter.cache_key(team.pk)
         result = {"loading": True}
 
         if refresh:
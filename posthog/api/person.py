@@ -2,7 +2,9 @@ import json
 import warnings
 from typing import Any, Dict, List, Optional, Union
 
-from django.db.models import Count, Func, Prefetch, Q, QuerySet
+from django.conf import settings
+from django.db.models import Count, Func, Prefetch, Q, QuerySet, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django_filters import rest_framework as filters
 from rest_framework import request, response, serializers, viewsets
 from rest_framework.decorators import action
@@ -14,7 +16,7 @@ from rest_framework.utils.serializer_helpers import ReturnDict
 from rest_framework_csv import renderers as csvrenderers
 
 from posthog.api.routing import StructuredViewSetMixin
-from posthog.api.utils import get_target_entity
+from posthog.api.utils import chunked, get_target_entity, streaming_csv_response
 from posthog.constants import TRENDS_LINEAR, TRENDS_TABLE
 from posthog.models import Event, Filter, Person
 from posthog.models.filters import RetentionFilter
@@ -92,11 +94,31 @@ class PersonViewSet(StructuredViewSetMixin, viewsets.ModelViewSet):
     retention_class = Retention
     stickiness_class = Stickiness
 
+    CSV_EXPORT_LIMIT = settings.CSV_EXPORT_LIMIT  # Return at most this number of persons in CSV export
+    CSV_EXPORT_FIELDS = ["id", "name", "distinct_ids", "properties", "is_identified", "created_at", "uuid"]
+
+    def list(
+        self, request: request.Request, *args: Any, **kwargs: Any
+    ) -> Union[response.Response, StreamingHttpResponse]:
+        if request.accepted_renderer.format == "csv":
+            return self._export_csv(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
+
     def paginate_queryset(self, queryset):
-        if self.request.accepted_renderer.format == "csv" or not self.paginator:
+        if not self.paginator:
             return None
         return self.paginator.paginate_queryset(queryset, self.request, view=self)
 
+    def _export_csv(self, queryset: QuerySet) -> StreamingHttpResponse:
+        def rows():
+            # Iterating skips the queryset's prefetches, so distinct ids are fetched a chunk of persons at a time
+            persons = queryset[: self.CSV_EXPORT_LIMIT].iterator(chunk_size=settings.CSV_EXPORT_CHUNK_SIZE)
+            for chunk in chunked(persons, settings.CSV_EXPORT_CHUNK_SIZE):
+                prefetch_related_objects(chunk, Prefetch("persondistinctid_set", to_attr="distinct_ids_cache"))
+                yield from PersonSerializer(chunk, many=True).data
+
+        return streaming_csv_response(self.CSV_EXPORT_FIELDS, rows(), "persons.csv")
+
     def _filter_request(self, request: request.Request, queryset: QuerySet) -> QuerySet:
         if request.GET.get("id"):
             ids = request.GET["id"].split(",")
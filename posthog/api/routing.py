@@ -5,6 +5,7 @@ from rest_framework_extensions.mixins import NestedViewSetMixin
 from rest_framework_extensions.routers import ExtendedDefaultRouter
 from rest_framework_extensions.settings import extensions_api_settings
 
+from posthog.ee import is_ee_enabled
 from posthog.models.organization import Organization
 from posthog.models.team import Team
 
@@ -50,6 +51,23 @@ class StructuredViewSetMixin(NestedViewSetMixin):
     def organization(self) -> Organization:
         return Organization.objects.get(id=self.get_parents_query_dict()["organization_id"])
 
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if is_ee_enabled():
+            # Authenticated now (e.g. with a personal API key), so attribute queries to the project they're for
+            team_id = self._team_id_or_none()
+            if team_id is not None:
+                from ee.clickhouse.client import tag_queries
+
+                tag_queries(team_id=team_id)
+
+    def _team_id_or_none(self) -> Optional[int]:
+        try:
+            return self.team_id
+        except (AssertionError, AttributeError, KeyError, AuthenticationFailed, NotFound):
+            # Not a project's endpoint, or not a user's project (e.g. a shared dashboard)
+            return None
+
     def filter_queryset_by_parents_lookups(self, queryset):
         parents_query_dict = self.get_parents_query_dict()
         for source, destination in self.filter_rewrite_rules.items():
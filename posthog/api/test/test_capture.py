@@ -384,6 +384,46 @@ class TestCapture(BaseTest):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json()["message"], "You need to set user distinct ID field `distinct_id`.")
 
+    @patch("posthog.api.capture.celery_app.send_task")
+    def test_batch_with_invalid_event_publishes_nothing(self, patch_process_event_with_plugins):
+        response = self.client.post(
+            "/batch/",
+            data={
+                "api_key": self.team.api_token,
+                "batch": [
+                    {"type": "capture", "event": "user signed up", "distinct_id": "2"},
+                    {"type": "capture", "distinct_id": "2"},
+                    {"type": "capture", "event": "user signed up", "distinct_id": "3"},
+                ],
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "You need to set event name field `event`.")
+        self.assertEqual(patch_process_event_with_plugins.call_count, 0)
+
+    @patch("posthog.api.capture.celery_app.send_task")
+    def test_batch_publishes_every_event(self, patch_process_event_with_plugins):
+        self.client.post(
+            "/batch/",
+            data={
+                "api_key": self.team.api_token,
+                "batch": [
+                    {"type": "capture", "event": "user signed up", "distinct_id": str(index)} for index in range(10)
+                ],
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(patch_process_event_with_plugins.call_count, 10)
+        self.assertEqual(
+            [call[1]["args"][0] for call in patch_process_event_with_plugins.call_args_list],
+            [str(index) for index in range(10)],
+        )
+        # every event in the batch shares the request-level data
+        self.assertEqual(len({call[1]["args"][2] for call in patch_process_event_with_plugins.call_args_list}), 1)
+
     @patch("posthog.models.team.TEAM_CACHE", {})
     @patch("posthog.api.capture.celery_app.send_task")
     def test_engage(self, patch_process_event_with_plugins):
@@ -1,5 +1,7 @@
 import json
+from unittest.mock import patch
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.timezone import now
 from freezegun import freeze_time
@@ -7,7 +9,6 @@ from rest_framework import status
 
 from posthog.models import Dashboard, DashboardItem, Filter, User
 from posthog.test.base import APIBaseTest
-from posthog.utils import generate_cache_key
 
 
 class TestDashboard(APIBaseTest):
@@ -108,7 +109,7 @@ class TestDashboard(APIBaseTest):
         self.assertEqual(response.status_code, 200)
         item = DashboardItem.objects.get(pk=item.pk)
         self.assertAlmostEqual(item.last_refresh, now(), delta=timezone.timedelta(seconds=5))
-        self.assertEqual(item.filters_hash, generate_cache_key("{}_{}".format(filter.toJSON(), self.team.pk)))
+        self.assertEqual(item.filters_hash, filter.cache_key(self.team.pk))
 
         with self.assertNumQueries(12):
             response = self.client.get("/api/dashboard/%s/" % dashboard.pk).json()
@@ -116,6 +117,78 @@ class TestDashboard(APIBaseTest):
         self.assertAlmostEqual(Dashboard.objects.get().last_accessed_at, now(), delta=timezone.timedelta(seconds=5))
         self.assertEqual(response["items"][0]["result"][0]["count"], 0)
 
+    @patch("posthog.api.dashboard.update_cache_item")
+    def test_compute_dashboard(self, patch_update_cache_item):
+        patch_update_cache_item.side_effect = lambda key, cache_type, payload: [{"count": len(payload["filter"])}]
+        dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
+        cached_item = DashboardItem.objects.create(
+            dashboard=dashboard, filters={"events": [{"id": "$pageview"}]}, team=self.team, order=0
+        )
+        same_items = [
+            DashboardItem.objects.create(
+                dashboard=dashboard, filters={"events": [{"id": "$autocapture"}]}, team=self.team, order=order
+            )
+            for order in (1, 2)
+        ]
+        other_item = DashboardItem.objects.create(
+            dashboard=dashboard, filters={"events": [{"id": "sign up"}]}, team=self.team, order=3
+        )
+        DashboardItem.objects.create(dashboard=dashboard, filters={}, team=self.team, order=4)
+        cache.set(cached_item.filters_hash, {"result": [{"count": 1}], "last_refresh": now()})
+
+        response = self.client.get("/api/dashboard/%s/compute/" % dashboard.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(lines[0]["id"], cached_item.pk)
+        self.assertEqual(lines[0]["result"], [{"count": 1}])
+        self.assertTrue(lines[0]["is_cached"])
+        self.assertCountEqual([line["id"] for line in lines[1:]], [same_items[0].pk, same_items[1].pk, other_item.pk])
+        self.assertFalse(any(line["is_cached"] for line in lines[1:]))
+        self.assertTrue(all(line["result"] for line in lines[1:]))
+        # Items with the same filters are calculated once
+        self.assertEqual(patch_update_cache_item.call_count, 2)
+        self.assertAlmostEqual(
+            Dashboard.objects.get(pk=dashboard.pk).last_accessed_at, now(), delta=timezone.timedelta(seconds=5)
+        )
+
+        response = self.client.get("/api/dashboard/%s/compute/?refresh=true" % dashboard.pk)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertFalse(any(line["is_cached"] for line in lines))
+        self.assertEqual(patch_update_cache_item.call_count, 5)
+
+    @patch("posthog.api.dashboard.update_cache_item")
+    def test_compute_shared_dashboard(self, patch_update_cache_item):
+        patch_update_cache_item.return_value = [{"count": 1}]
+        self.client.logout()
+        dashboard = Dashboard.objects.create(team=self.team, share_token="testtoken", name="public dashboard")
+        cached_item = DashboardItem.objects.create(
+            dashboard=dashboard, filters={"events": [{"id": "$pageview"}]}, team=self.team, order=0
+        )
+        uncached_item = DashboardItem.objects.create(
+            dashboard=dashboard, filters={"events": [{"id": "sign up"}]}, team=self.team, order=1
+        )
+        cache.set(cached_item.filters_hash, {"result": [{"count": 1}], "last_refresh": now()})
+
+        response = self.client.get(f"/api/dashboard/{dashboard.pk}/compute/?share_token=testtoken")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["id"], cached_item.pk)
+        self.assertEqual(lines[0]["result"], [{"count": 1}])
+        self.assertFalse(lines[0]["pending"])
+        # Items without a cached result aren't calculated on behalf of whoever has the link
+        self.assertEqual(lines[1]["id"], uncached_item.pk)
+        self.assertIsNone(lines[1]["result"])
+        self.assertTrue(lines[1]["pending"])
+        self.assertEqual(patch_update_cache_item.call_count, 0)
+
+        response = self.client.get(f"/api/dashboard/{dashboard.pk}/compute/?share_token=testtoken&refresh=true")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(patch_update_cache_item.call_count, 0)
+
     def test_no_cache_available(self):
         dashboard = Dashboard.objects.create(team=self.team, name="dashboard")
         filter_dict = {
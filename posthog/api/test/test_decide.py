@@ -117,11 +117,12 @@ class TestDecide(BaseTest):
             key="filer-by-property-2",
             created_by=self.user,
         )
-        with self.assertNumQueries(5):
+        with self.assertNumQueries(4):
             response = self._post_decide().json()
         self.assertEqual(response["featureFlags"][0], "beta-feature")
 
-        with self.assertNumQueries(5):
+        # the team and its flags are cached now, only the person is fetched
+        with self.assertNumQueries(2):
             response = self._post_decide({"token": self.team.api_token, "distinct_id": "another_id"}).json()
         self.assertEqual(len(response["featureFlags"]), 0)
 
@@ -1,3 +1,4 @@
+import csv
 import json
 from unittest.mock import patch
 
@@ -368,11 +369,29 @@ def factory_test_event_api(event_factory, person_factory, action_factory):
                     event_factory(team=self.team, event="5th action", distinct_id="2", properties={"$os": "Windows 95"})
                 response = self.client.get("/api/event.csv")
             self.assertEqual(
-                len(response.content.splitlines()),
+                len(b"".join(response.streaming_content).splitlines()),
                 1001,
                 "CSV export should return up to CSV_EXPORT_LIMIT events (+ headers row)",
             )
 
+        @patch("posthog.api.event.EventViewSet.CSV_EXPORT_LIMIT", 3)
+        def test_events_csv_export_streams_chunks(self):
+            person_factory(team=self.team, distinct_ids=["2"], properties={"email": "tim@posthog.com"})
+            with freeze_time("2012-01-15T04:01:34.000Z"):
+                for index in range(5):
+                    event_factory(
+                        team=self.team, event="5th action", distinct_id=str(index % 3), properties={"index": index}
+                    )
+                with self.settings(CSV_EXPORT_CHUNK_SIZE=2):
+                    response = self.client.get("/api/event.csv")
+                    rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+
+            self.assertEqual(len(rows), 3)
+            for row in rows:
+                self.assertEqual(row["event"], "5th action")
+                self.assertEqual(json.loads(row["properties"])["index"] % 3, int(row["distinct_id"]))
+                self.assertEqual(row["person"], "tim@posthog.com" if row["distinct_id"] == "2" else row["distinct_id"])
+
     return TestEvents
 
 
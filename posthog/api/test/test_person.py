@@ -1,4 +1,6 @@
+import csv
 import json
+from unittest.mock import patch
 from uuid import uuid4
 
 from django.test.utils import freeze_time
@@ -330,6 +332,23 @@ def factory_test_person(event_factory, person_factory, get_events, get_people):
                 ["distinct_id1", "17787c3099427b-0e8f6c86323ea9-33647309-1aeaa0-17787c30995b7c"],
             )
 
+        @patch("posthog.api.person.PersonViewSet.CSV_EXPORT_LIMIT", 3)
+        def test_csv_export(self) -> None:
+            for index in range(5):
+                person_factory(
+                    team=self.team, distinct_ids=[f"person_{index}", f"anonymous_{index}"], properties={"index": index}
+                )
+
+            with self.settings(CSV_EXPORT_CHUNK_SIZE=2):
+                response = self.client.get("/api/person.csv?search=has:index")
+                rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(rows), 3)
+            for row in rows:
+                index = json.loads(row["properties"])["index"]
+                self.assertEqual(set(json.loads(row["distinct_ids"])), {f"person_{index}", f"anonymous_{index}"})
+
     return TestPerson
 
 
@@ -1,8 +1,16 @@
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar
+
+from django.http import StreamingHttpResponse
 from rest_framework import request
 
 from posthog.constants import ENTITY_ID, ENTITY_TYPE
 from posthog.models import Entity
 
+T = TypeVar("T")
+
 
 def get_target_entity(request: request.Request) -> Entity:
     entity_id = request.GET.get(ENTITY_ID)
@@ -12,3 +20,41 @@ def get_target_entity(request: request.Request) -> Entity:
         return Entity({"id": entity_id, "type": entity_type})
     else:
         raise ValueError("An entity must be provided for target entity to be determined")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Echo:
+    """
+    File-like object handing back what's written to it, so that csv.writer returns each row instead of buffering it.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def streaming_csv_response(fields: List[str], rows: Iterable[Dict[str, Any]], filename: str) -> StreamingHttpResponse:
+    """
+    Writes `rows` as CSV while they're iterated, so exports take as much memory however many rows they have.
+    Columns are fixed upfront: nested values, like properties, are written as JSON rather than flattened into a column
+    per key.
+    """
+    writer = csv.DictWriter(_Echo(), fieldnames=fields, extrasaction="ignore")
+
+    def lines() -> Iterator[str]:
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(
+                {key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in row.items()}
+            )
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    return response
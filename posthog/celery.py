@@ -82,6 +82,14 @@ def setup_periodic_tasks(sender, **kwargs):
             expires=ACTION_EVENT_MAPPING_INTERVAL_SECONDS,
         )
 
+    if settings.TEAM_METADATA_WRITE_BEHIND:
+        sender.add_periodic_task(
+            settings.TEAM_METADATA_FLUSH_INTERVAL_SECONDS,
+            flush_team_metadata.s(),
+            name="flush team event names and properties",
+            expires=settings.TEAM_METADATA_FLUSH_INTERVAL_SECONDS,
+        )
+
     if settings.ASYNC_EVENT_PROPERTY_USAGE:
         sender.add_periodic_task(60 * 60, calculate_event_property_usage.s(), name="calculate event property usage")
 
@@ -172,6 +180,13 @@ def redis_celery_queue_depth():
         return
 
 
+@app.task(ignore_result=True)
+def flush_team_metadata():
+    from posthog.tasks.team_metadata import flush_team_metadata
+
+    flush_team_metadata()
+
+
 @app.task(ignore_result=True)
 def update_event_partitions():
     with connection.cursor() as cursor:
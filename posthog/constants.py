@@ -84,6 +84,11 @@ STICKINESS_DAYS = "stickiness_days"
 FORMULA = "formula"
 ENTITY_ID = "entity_id"
 ENTITY_TYPE = "entity_type"
+SAMPLING_FACTOR = "sampling_factor"
+SAMPLING_BY = "sampling_by"
+
+SAMPLING_BY_EVENT = "event"
+SAMPLING_BY_PERSON = "person"
 
 RETENTION_RECURRING = "retention_recurring"
 RETENTION_FIRST_TIME = "retention_first_time"
@@ -1,17 +1,29 @@
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 from enum import Enum
 from functools import wraps
-from typing import Callable, Dict, List, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Union, cast
 
+import statsd
+from django.conf import settings
 from django.core.cache import cache
 from django.http.request import HttpRequest
 from django.utils.timezone import now
 
+from posthog.constants import (
+    DATE_FROM,
+    DATE_TO,
+    INSIGHT_TRENDS,
+    TRENDS_CUMULATIVE,
+    TRENDS_DISPLAY_BY_VALUE,
+    TRENDS_LIFECYCLE,
+    TRENDS_STICKINESS,
+)
 from posthog.models import Filter, Team, User
 from posthog.models.dashboard_item import DashboardItem
 from posthog.models.filters.utils import get_filter
-from posthog.settings import TEMP_CACHE_RESULTS_TTL
-from posthog.utils import generate_cache_key
+from posthog.settings import CACHED_RESULTS_TTL, TEMP_CACHE_RESULTS_TTL
+from posthog.utils import get_daterange
 
 from .utils import generate_cache_key, get_safe_cache
 
@@ -37,12 +49,16 @@ def cached_function():
                 return f(*args, **kwargs)
 
             filter = get_filter(request=request, team=team)
-            cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), team.pk))
+            cache_key = filter.cache_key(team.pk)
             # return cached result if possible
             if not request.GET.get("refresh", False):
                 cached_result = get_safe_cache(cache_key)
                 if cached_result and cached_result.get("result"):
+                    _cache_metrics().increment("hit")
                     return {**cached_result, "is_cached": True}
+                _cache_metrics().increment("miss")
+            else:
+                _cache_metrics().increment("refresh")
             # call function being wrapped
             result = f(*args, **kwargs)
 
@@ -59,3 +75,122 @@ def cached_function():
         return wrapper
 
     return parameterized_decorator
+
+
+def _cache_metrics() -> statsd.Counter:
+    "Cached insight results served (hit), missing (miss) or recalculated on request (refresh)"
+    return statsd.Counter("%s_posthog_insight_cache" % (settings.STATSD_PREFIX,))
+
+
+INCREMENTAL_INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def calculate_incrementally(
+    filter: Filter, team_id: int, calculate: Callable[[Filter], List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Calculates a trend up to now by only recalculating its latest buckets, and taking the earlier ones from the
+    last time a trend with the same filter (whatever its date range) was calculated.
+
+    Buckets from the last calculation, less INCREMENTAL_INSIGHTS_LATE_ARRIVAL_HOURS for events that are ingested late,
+    are recalculated. Every INCREMENTAL_INSIGHTS_FULL_REFRESH_HOURS, the whole date range is.
+    """
+    if not _is_incremental(filter):
+        return calculate(filter)
+
+    interval = filter.interval or "day"
+    key = _incremental_cache_key(filter, team_id)
+    calculated_at = now()
+    date_from = _bucket_start(cast(datetime, filter.date_from), interval)
+
+    history = get_safe_cache(key)
+    if history and history["fully_calculated_at"] > calculated_at - timedelta(
+        hours=settings.INCREMENTAL_INSIGHTS_FULL_REFRESH_HOURS
+    ):
+        recalculate_from = _bucket_start(
+            history["calculated_at"] - timedelta(hours=settings.INCREMENTAL_INSIGHTS_LATE_ARRIVAL_HOURS), interval
+        )
+        if recalculate_from > date_from:
+            latest = calculate(filter.with_data({DATE_FROM: recalculate_from}))
+            result = _merge_buckets(history["result"], latest, date_from, recalculate_from, interval)
+            if result is not None:
+                cache.set(key, {**history, "result": result, "calculated_at": calculated_at}, CACHED_RESULTS_TTL)
+                return result
+
+    result = calculate(filter)
+    cache.set(
+        key,
+        {"result": result, "calculated_at": calculated_at, "fully_calculated_at": calculated_at},
+        CACHED_RESULTS_TTL,
+    )
+    return result
+
+
+def _is_incremental(filter: Filter) -> bool:
+    return (
+        settings.INCREMENTAL_INSIGHTS_ENABLED
+        and type(filter) == Filter
+        and (filter.insight or INSIGHT_TRENDS) == INSIGHT_TRENDS
+        and filter.shown_as not in (TRENDS_STICKINESS, TRENDS_LIFECYCLE)
+        and (filter.interval or "day") in INCREMENTAL_INTERVALS
+        # Relative to now, so that only the latest buckets change
+        and filter._date_from not in (None, "all")
+        and filter._date_to is None
+        # Buckets that depend on other buckets
+        and filter.display != TRENDS_CUMULATIVE
+        and filter.display not in TRENDS_DISPLAY_BY_VALUE
+        and not filter.compare
+        # Breakdown values are the top ones over the whole date range
+        and not filter.breakdown
+    )
+
+
+def _incremental_cache_key(filter: Filter, team_id: int) -> str:
+    filter_dict = {key: value for key, value in filter.canonical_dict().items() if key not in (DATE_FROM, DATE_TO)}
+    return generate_cache_key("incremental_{}_{}".format(json.dumps(filter_dict, sort_keys=True), team_id))
+
+
+def _bucket_start(timestamp: datetime, interval: str) -> datetime:
+    timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0) if interval == "day" else timestamp
+
+
+def _bucket_key(timestamp: datetime, interval: str) -> str:
+    # Formatted as the trend's "days"
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S" if interval == "hour" else "%Y-%m-%d")
+
+
+def _merge_buckets(
+    history: List[Dict[str, Any]],
+    latest: List[Dict[str, Any]],
+    date_from: datetime,
+    recalculate_from: datetime,
+    interval: str,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Takes the buckets from `date_from` up to `recalculate_from` from `history`, and the later ones from `latest`.
+    Returns None if `history` doesn't have all of those earlier buckets, or isn't the same series.
+    """
+    if len(history) != len(latest):
+        return None
+    earlier_buckets = len(get_daterange(date_from, recalculate_from - INCREMENTAL_INTERVALS[interval], interval))
+    date_from_key, recalculate_from_key = _bucket_key(date_from, interval), _bucket_key(recalculate_from, interval)
+
+    result = []
+    for earlier, series in zip(history, latest):
+        if earlier.get("label") != series.get("label") or earlier.get("action") != series.get("action"):
+            return None
+        indexes = [index for index, day in enumerate(earlier["days"]) if date_from_key <= day < recalculate_from_key]
+        if len(indexes) != earlier_buckets:
+            return None
+        data = [earlier["data"][index] for index in indexes] + series["data"]
+        result.append(
+            {
+                **series,
+                "data": data,
+                "count": float(sum(data)),
+                "labels": [earlier["labels"][index] for index in indexes] + series["labels"],
+                "days": [earlier["days"][index] for index in indexes] + series["days"],
+            }
+        )
+    return result
@@ -1,3 +1,6 @@
+from contextlib import nullcontext
+from typing import Any, ContextManager
+
 from django.conf import settings
 
 from posthog.constants import RDBMS
@@ -5,3 +8,12 @@ from posthog.constants import RDBMS
 
 def is_ee_enabled() -> bool:
     return settings.EE_AVAILABLE and settings.PRIMARY_DB == RDBMS.CLICKHOUSE
+
+
+def query_tags(**tags: Any) -> ContextManager:
+    "ee.clickhouse.client.query_tags, e.g. to govern the queries of tasks run for a team. A no-op without ClickHouse"
+    if is_ee_enabled():
+        from ee.clickhouse.client import query_tags as clickhouse_query_tags
+
+        return clickhouse_query_tags(**tags)
+    return nullcontext()
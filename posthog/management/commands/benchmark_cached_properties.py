@@ -0,0 +1,64 @@
+import timeit
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand
+
+from posthog.models import Filter, Team
+from posthog.models.feature_flag import FEATURE_FLAG_CACHE, FeatureFlag, get_active_feature_flags
+
+BENCHMARK_TEAM_ID = -1  # Feature flags are put in the cache for a team that doesn't exist, so nothing is queried
+
+
+def _filter_data(index: int) -> Dict[str, Any]:
+    return {
+        "events": [{"id": "$pageview", "order": 0}, {"id": "event {}".format(index), "order": 1, "math": "dau"}],
+        "actions": [{"id": index, "order": 2}],
+        "properties": [
+            {"key": "$browser", "value": "Chrome", "type": "event"},
+            {"key": "email", "value": "@posthog.com", "operator": "icontains", "type": "person"},
+        ],
+        "date_from": "-30d",
+        "interval": "day",
+        "display": "ActionsLineGraph",
+        "breakdown": "$os",
+    }
+
+
+def _feature_flag(index: int) -> FeatureFlag:
+    return FeatureFlag(
+        team_id=BENCHMARK_TEAM_ID,
+        key="flag-{}".format(index),
+        filters={"groups": [{"rollout_percentage": percentage} for percentage in (10, 20, 30, 40)]},
+    )
+
+
+class Command(BaseCommand):
+    help = """Time serializing filters (Filter.toJSON) and matching feature flags (get_active_feature_flags), which
+    rely on cached_property. Run it on two revisions to compare them."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filters", type=int, default=50, help="Number of distinct filters serialized in turn")
+        parser.add_argument("--flags", type=int, default=50, help="Number of feature flags matched per call")
+        parser.add_argument("--repeat", type=int, default=200, help="Number of times each is timed")
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        filters: List[Filter] = [Filter(data=_filter_data(index)) for index in range(options["filters"])]
+
+        elapsed = timeit.timeit(lambda: filters[0].toJSON(), number=repeat)
+        self._print("toJSON, same filter", elapsed, repeat)
+        elapsed = timeit.timeit(lambda: [filter.toJSON() for filter in filters], number=repeat)
+        self._print("toJSON, {} filters in turn".format(len(filters)), elapsed, repeat * len(filters))
+        elapsed = timeit.timeit(lambda: Filter(data=_filter_data(0)).toJSON(), number=repeat)
+        self._print("toJSON, new filter", elapsed, repeat)
+
+        FEATURE_FLAG_CACHE[BENCHMARK_TEAM_ID] = [_feature_flag(index) for index in range(options["flags"])]
+        try:
+            team = Team(pk=BENCHMARK_TEAM_ID)
+            elapsed = timeit.timeit(lambda: get_active_feature_flags(team, "distinct_id"), number=repeat)
+            self._print("get_active_feature_flags, {} flags".format(options["flags"]), elapsed, repeat)
+        finally:
+            FEATURE_FLAG_CACHE.pop(BENCHMARK_TEAM_ID, None)
+
+    def _print(self, name: str, elapsed: float, calls: int) -> None:
+        print("{:>40}: {:.3f}ms per call".format(name, elapsed / calls * 1000))
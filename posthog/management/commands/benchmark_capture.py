@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.client import RequestFactory
+
+from posthog.api.capture import get_event
+from posthog.celery import app as celery_app
+from posthog.ee import is_ee_enabled
+from posthog.models import Team
+
+
+class Command(BaseCommand):
+    help = """Measure how many events per second a single worker pushes through /batch, publishing included.
+    Celery tasks go to --broker, an in-memory one by default, so that the number doesn't depend on a Redis round
+    trip. With ClickHouse, events are produced to the Kafka brokers in KAFKA_HOSTS and flushed before timing stops."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--team_id", type=int, help="ID of the team to send events to (defaults to the first)")
+        parser.add_argument("--batch_size", type=int, default=500, help="Number of events per /batch request")
+        parser.add_argument("--requests", type=int, default=20, help="Number of /batch requests to send")
+        parser.add_argument("--broker", default="memory://", help="Celery broker URL to publish tasks to")
+
+    def handle(self, *args, **options):
+        team = Team.objects.get(pk=options["team_id"]) if options["team_id"] else Team.objects.first()
+        if team is None:
+            print("No team to send events to!")
+            return
+
+        # Tasks are published over the broker's write connection, which is only opened once something is published
+        celery_app.conf.broker_write_url = options["broker"]
+
+        batch_size = options["batch_size"]
+        payload = json.dumps(
+            {
+                "api_key": team.api_token,
+                "batch": [
+                    {
+                        "type": "capture",
+                        "event": "benchmark event",
+                        "distinct_id": "benchmark_{}".format(index % 50),
+                        "properties": {"$lib": "posthog-python", "index": index, "$current_url": "https://example.com"},
+                    }
+                    for index in range(batch_size)
+                ],
+            }
+        )
+        factory = RequestFactory()
+
+        start = time.perf_counter()
+        for _ in range(options["requests"]):
+            response = get_event(factory.post("/batch/", data=payload, content_type="application/json"))
+            assert response.status_code == 200, response.content
+        if is_ee_enabled():
+            from ee.kafka_client.client import KafkaProducer
+
+            KafkaProducer().flush()
+        elapsed = time.perf_counter() - start
+
+        total_events = batch_size * options["requests"]
+        print(
+            "{} events in {} requests of {}: {:.3f}s, {:.0f} events/sec".format(
+                total_events, options["requests"], batch_size, elapsed, total_events / elapsed
+            )
+        )
@@ -0,0 +1,98 @@
+import base64
+import gzip
+import json
+import random
+import timeit
+from typing import Any, Dict, List
+
+import lzstring
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from posthog.utils import decode_payload
+
+
+def _posthog_js_event(index: int) -> Dict[str, Any]:
+    event: Dict[str, Any] = {
+        "event": "$autocapture" if index % 3 else "$pageview",
+        "properties": {
+            "$os": "Mac OS X",
+            "$browser": "Chrome",
+            "$device_type": "Desktop",
+            "$current_url": "https://app.example.com/insights?interval=day&events=%5B%7B%22id%22%3A%22%24pageview%22%7D%5D",
+            "$host": "app.example.com",
+            "$pathname": "/insights",
+            "$browser_version": 87,
+            "$screen_height": 1080,
+            "$screen_width": 1920,
+            "$lib": "web",
+            "$lib_version": "1.8.0",
+            "$insert_id": "{:016x}".format(random.getrandbits(64)),
+            "$time": 1606000000.123 + index,
+            "distinct_id": "175f3ccd34b6b5-0d4b2b4ddc4b8c-316b7003-1fa400-175f3ccd34c84d",
+            "$device_id": "175f3ccd34b6b5-0d4b2b4ddc4b8c-316b7003-1fa400-175f3ccd34c84d",
+            "$initial_referrer": "$direct",
+            "$initial_referring_domain": "$direct",
+            "$active_feature_flags": ["new-paths-ui", "funnel-step-breakdown"],
+            "token": "phc_benchmark",
+            "title": "Insights • PostHog 🦔",
+        },
+        "timestamp": "2020-11-22T12:00:{:02d}.000Z".format(index % 60),
+    }
+    if index % 3:
+        event["properties"]["$event_type"] = "click"
+        event["properties"]["$ce_version"] = 1
+        event["properties"]["$elements"] = [
+            {"tag_name": "span", "$el_text": "Save", "classes": ["ant-btn-text"], "attr__class": "ant-btn-text",},
+            {
+                "tag_name": "button",
+                "classes": ["ant-btn", "ant-btn-primary"],
+                "attr__class": "ant-btn ant-btn-primary",
+                "attr__type": "button",
+                "nth_child": 2,
+                "nth_of_type": 1,
+            },
+            {"tag_name": "div", "classes": ["ant-modal-footer"], "attr__class": "ant-modal-footer", "nth_child": 3},
+            {"tag_name": "body", "nth_child": 2, "nth_of_type": 1},
+        ]
+    return event
+
+
+class Command(BaseCommand):
+    help = """Time how long decoding /batch payloads sent by posthog-js takes, for every compression mode.
+    Run it on two revisions to compare them."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=50, help="Number of events per payload")
+        parser.add_argument("--repeat", type=int, default=200, help="Number of times each payload is decoded")
+        parser.add_argument("--orjson", action="store_true", help="Decode JSON with orjson")
+        parser.add_argument(
+            "--lzstring", action="store_true", help="Also time the lzstring package's decoder, for comparison"
+        )
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        batch: List[Dict[str, Any]] = [_posthog_js_event(index) for index in range(options["events"])]
+        raw = json.dumps(batch)
+        payloads = {
+            # (data as the request gives it, compression)
+            "json": (raw.encode("utf-8"), ""),
+            "base64": (base64.b64encode(raw.encode("utf-8")).decode("ascii"), ""),
+            "gzip-js": (gzip.compress(raw.encode("utf-8")), "gzip-js"),
+            "lz64": (lzstring.LZString().compressToBase64(raw).encode("ascii"), "lz64"),
+        }
+
+        print("{} events, {} bytes of JSON, decoded {} times".format(len(batch), len(raw), options["repeat"]))
+        with override_settings(ORJSON_PAYLOAD_DECODING=options["orjson"]):
+            for name, (data, compression) in payloads.items():
+                assert decode_payload(data, compression) == batch
+                elapsed = timeit.timeit(lambda: decode_payload(data, compression), number=options["repeat"])
+                self._print(name, len(data), elapsed, options["repeat"])
+
+        if options["lzstring"]:
+            data = payloads["lz64"][0].decode("ascii")
+            elapsed = timeit.timeit(lambda: lzstring.LZString().decompressFromBase64(data), number=options["repeat"])
+            self._print("lz64 (lzstring, without JSON)", len(data), elapsed, options["repeat"])
+
+    def _print(self, name: str, size: int, elapsed: float, repeat: int) -> None:
+        print("{:>32}: {:>8} bytes, {:.3f}ms per payload".format(name, size, elapsed / repeat * 1000))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from posthog.models import DashboardItem
+from posthog.models.filters.utils import get_filter
+
+
+class Command(BaseCommand):
+    help = """Recompute filters_hash for every dashboard item, e.g. after the way filters are hashed into cache keys
+    changed. Items whose hash doesn't match their filters' cache key aren't found by refreshes, nor their results."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--team_id", nargs="+", type=int, help="Only rehash the items of these teams")
+        parser.add_argument("--batch_size", type=int, default=500, help="Number of items to update at once")
+
+    def handle(self, *args, **options):
+        items = DashboardItem.objects.filter(filters__isnull=False).exclude(filters={})
+        if options["team_id"]:
+            items = items.filter(team_id__in=options["team_id"])
+
+        checked, rehashed = 0, 0
+        batch = []
+        for item in items.select_related("dashboard", "team").order_by("pk").iterator():
+            checked += 1
+            filters_hash = get_filter(data=item.dashboard_filters(), team=item.team).cache_key(item.team_id)
+            if item.filters_hash != filters_hash:
+                item.filters_hash = filters_hash
+                batch.append(item)
+            if len(batch) >= options["batch_size"]:
+                rehashed += self._update(batch)
+        rehashed += self._update(batch)
+
+        print("Rehashed {} of {} dashboard items".format(rehashed, checked))
+
+    def _update(self, batch):
+        DashboardItem.objects.bulk_update(batch, ["filters_hash"])
+        updated = len(batch)
+        batch.clear()
+        return updated
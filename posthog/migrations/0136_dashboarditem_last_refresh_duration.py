@@ -0,0 +1,16 @@
+# Generated by Django 3.0.11 on 2021-03-24 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posthog", "0135_plugins_on_cloud"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboarditem", name="last_refresh_duration", field=models.FloatField(blank=True, null=True),
+        ),
+    ]
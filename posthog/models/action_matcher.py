@@ -0,0 +1,313 @@
+import re
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Prefetch
+from django.dispatch import receiver
+
+from posthog.cache_utils import TTLCache
+from posthog.redis import get_client
+
+from .action import Action
+from .action_step import ActionStep
+from .cohort import CohortPeople
+from .element import Element
+from .element_group import ElementGroup
+from .event import Selector
+from .filters import Filter
+from .person import Person
+from .property import Property, jsonb_text
+
+# team_id -> (version of the team's actions, ActionMatcher)
+ACTION_MATCHER_CACHE: TTLCache[Tuple[int, "ActionMatcher"]] = TTLCache(
+    maxsize=settings.TEAM_CACHE_MAX_SIZE, ttl=settings.ACTION_MATCHER_CACHE_TTL
+)
+
+
+def _actions_version_key(team_id: int) -> str:
+    return "@posthog/actions-version/{}".format(team_id)
+
+
+class EventToMatch:
+    """
+    An event being matched against actions. Whatever isn't part of the event itself (its elements if they
+    weren't given, the person and their cohorts) is only fetched if an action needs it, and at most once.
+    """
+
+    def __init__(
+        self,
+        team_id: int,
+        event: Optional[str],
+        distinct_id: str,
+        properties: Dict[str, Any],
+        elements: Optional[List[Element]] = None,
+        elements_hash: Optional[str] = None,
+    ):
+        self.team_id = team_id
+        self.event = event
+        self.distinct_id = distinct_id
+        self.properties = properties
+        self._elements = elements
+        self._elements_hash = elements_hash
+        self._person: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._person_loaded = False
+        self._cohort_ids: Dict[int, bool] = {}
+
+    @property
+    def elements(self) -> List[Element]:
+        if self._elements is None:
+            self._elements = (
+                list(
+                    Element.objects.filter(
+                        group__in=ElementGroup.objects.filter(team_id=self.team_id, hash=self._elements_hash)
+                    ).order_by("order")
+                )
+                if self._elements_hash
+                else []
+            )
+        return self._elements
+
+    @property
+    def person(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if not self._person_loaded:
+            self._person = (
+                Person.objects.filter(
+                    team_id=self.team_id,
+                    persondistinctid__distinct_id=str(self.distinct_id),
+                    persondistinctid__team_id=self.team_id,
+                )
+                .values_list("id", "properties")
+                .first()
+            )
+            self._person_loaded = True
+        return self._person
+
+    def in_cohort(self, cohort_id: int) -> bool:
+        if cohort_id not in self._cohort_ids:
+            self._cohort_ids[cohort_id] = self.person is not None and (
+                CohortPeople.objects.filter(cohort_id=cohort_id, person_id=self.person[0]).exists()
+            )
+        return self._cohort_ids[cohort_id]
+
+
+def _like_to_regex(pattern: str) -> Pattern:
+    # LIKE wildcards are % and _, and \ escapes them
+    regex = ""
+    escaped = False
+    for char in pattern:
+        if escaped:
+            regex += re.escape(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            regex += ".*"
+        elif char == "_":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return re.compile(regex, re.DOTALL)
+
+
+def _element_matches_part(element: Element, data: Dict[str, Any]) -> bool:
+    for key, value in data.items():
+        if key.startswith("attributes__attr__"):
+            found = (element.attributes or {}).get(key[len("attributes__") :])
+            if found is None or jsonb_text(found) != value:
+                return False
+        elif key == "attr_class__contains":
+            if not element.attr_class or not set(value).issubset(element.attr_class):
+                return False
+        elif key == "nth_child":
+            try:
+                if element.nth_child is None or element.nth_child != int(value):
+                    return False
+            except ValueError:
+                return False
+        elif getattr(element, key) != value:
+            return False
+    return True
+
+
+def _selector_matches(selector: Selector, elements: Sequence[Element]) -> bool:
+    # Same as EventManager._element_subquery: every part of the selector is matched to the nth element (by order)
+    # that fits it, and these need to be ancestors of one another (direct parents for ">")
+    ordered = sorted(
+        ((element.order if element.order is not None else index, element) for index, element in enumerate(elements)),
+        key=lambda item: item[0],
+    )
+    previous_order = -1
+    for index, part in enumerate(selector.parts):
+        matching = [order for order, element in ordered if _element_matches_part(element, part.data)]
+        if len(matching) <= part.unique_order:
+            return False
+        order = matching[part.unique_order]
+        if index > 0:
+            if part.direct_descendant and order != previous_order + 1:
+                return False
+            if not part.direct_descendant and order <= previous_order:
+                return False
+        previous_order = order
+    return True
+
+
+def _compile_element_filter(filters: Dict[str, Any]) -> Optional[Callable[[EventToMatch], bool]]:
+    """In-memory equivalent of EventManager.filter_by_element."""
+    selector = Selector(filters["selector"]) if filters.get("selector") else None
+    element_filters = {key: filters[key] for key in ("tag_name", "text", "href") if filters.get(key)}
+    if selector is None and not element_filters:
+        return None
+
+    def matches(event: EventToMatch) -> bool:
+        elements = event.elements
+        if selector is not None and not _selector_matches(selector, elements):
+            return False
+        if element_filters and not any(
+            all(getattr(element, key) == value for key, value in element_filters.items()) for element in elements
+        ):
+            return False
+        return True
+
+    return matches
+
+
+def _compile_url_filter(step: ActionStep) -> Optional[Callable[[EventToMatch], bool]]:
+    """In-memory equivalent of EventManager.filter_by_url."""
+    if not step.url:
+        return None
+    url = step.url
+    if step.url_matching == ActionStep.EXACT:
+        matches_url: Callable[[str], bool] = lambda current_url: current_url == url
+    else:
+        try:
+            regex = re.compile(url) if step.url_matching == ActionStep.REGEX else _like_to_regex(f"%{url}%")
+        except re.error:
+            # Invalid regexes are user mistakes, they match nothing
+            return lambda event: False
+        if step.url_matching == ActionStep.REGEX:
+            matches_url = lambda current_url: regex.search(current_url) is not None
+        else:
+            matches_url = lambda current_url: regex.fullmatch(current_url) is not None
+
+    def matches(event: EventToMatch) -> bool:
+        current_url = event.properties.get("$current_url")
+        return current_url is not None and matches_url(jsonb_text(current_url))
+
+    return matches
+
+
+def _compile_properties_filter(properties: List[Property]) -> Optional[Callable[[EventToMatch], bool]]:
+    """In-memory equivalent of properties_to_Q."""
+    event_properties = [prop for prop in properties if prop.type == "event"]
+    person_properties = [prop for prop in properties if prop.type == "person"]
+    element_filter = _compile_element_filter({prop.key: prop.value for prop in properties if prop.type == "element"})
+    cohort_ids = [int(prop.value) for prop in properties if prop.type == "cohort" and prop.key == "id"]  # type: ignore
+    if not event_properties and not person_properties and element_filter is None and not cohort_ids:
+        return None
+
+    def matches(event: EventToMatch) -> bool:
+        if not all(prop.matches(event.properties) for prop in event_properties):
+            return False
+        if person_properties:
+            person = event.person
+            if person is None or not all(prop.matches(person[1]) for prop in person_properties):
+                return False
+        if element_filter is not None and not element_filter(event):
+            return False
+        return all(event.in_cohort(cohort_id) for cohort_id in cohort_ids)
+
+    return matches
+
+
+def compile_action_step(step: ActionStep) -> Callable[[EventToMatch], bool]:
+    """Compiles a step into a predicate which matches the same events as EventManager.query_db_by_action."""
+    predicates = [
+        predicate
+        for predicate in (
+            _compile_properties_filter(Filter(data={"properties": step.properties}).properties),
+            _compile_element_filter(
+                {"selector": step.selector, "tag_name": step.tag_name, "text": step.text, "href": step.href}
+            ),
+            _compile_url_filter(step),
+        )
+        if predicate is not None
+    ]
+
+    def matches(event: EventToMatch) -> bool:
+        try:
+            return all(predicate(event) for predicate in predicates)
+        except ValueError:
+            # e.g. an unsupported property operator
+            return False
+
+    return matches
+
+
+class ActionMatcher:
+    """A team's actions, compiled to predicates and indexed by the event name of their steps."""
+
+    def __init__(self, actions: Sequence[Action]):
+        self._steps_by_event: Dict[Optional[str], List[Tuple[Action, Callable[[EventToMatch], bool]]]] = defaultdict(
+            list
+        )
+        for action in actions:
+            for step in action.steps.all():
+                # Steps without an event name match any event
+                self._steps_by_event[step.event or None].append((action, compile_action_step(step)))
+
+    def matching_actions(self, event: EventToMatch) -> List[Action]:
+        matched: Dict[int, Action] = {}
+        candidates = self._steps_by_event.get(event.event, []) if event.event else []
+        for action, matches in candidates + self._steps_by_event.get(None, []):
+            if action.pk not in matched and matches(event):
+                matched[action.pk] = action
+        return [matched[pk] for pk in sorted(matched)]
+
+
+def get_action_matcher(team_id: int) -> ActionMatcher:
+    # Changes made through any process bump the team's version in Redis, so that a cached matcher is never stale
+    version = int(get_client().get(_actions_version_key(team_id)) or 0)
+    cached = ACTION_MATCHER_CACHE.get(team_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    matcher = ActionMatcher(
+        Action.objects.filter(team_id=team_id, deleted=False).prefetch_related(
+            Prefetch("steps", queryset=ActionStep.objects.order_by("id"))
+        )
+    )
+    ACTION_MATCHER_CACHE[team_id] = (version, matcher)
+    return matcher
+
+
+def invalidate_action_matcher(team_id: int) -> None:
+    get_client().incr(_actions_version_key(team_id))
+    ACTION_MATCHER_CACHE.pop(team_id)
+
+
+@receiver(models.signals.post_save, sender=Action)
+@receiver(models.signals.post_delete, sender=Action)
+def invalidate_action_matcher_for_action(sender, instance: Action, **kwargs):
+    invalidate_action_matcher(instance.team_id)
+
+
+@receiver(models.signals.post_save, sender=ActionStep)
+@receiver(models.signals.post_delete, sender=ActionStep)
+def invalidate_action_matcher_for_step(sender, instance: ActionStep, **kwargs):
+    if ActionStep._meta.get_field("action").is_cached(instance):
+        team_id = instance.action.team_id
+    else:
+        team_id = Action.objects.filter(pk=instance.action_id).values_list("team_id", flat=True).first()
+    # Without an action, the step was deleted along with it and the action's own signal takes care of it
+    if team_id is not None:
+        invalidate_action_matcher(team_id)
@@ -9,7 +9,6 @@ from django_deprecate_fields import deprecate_field
 from posthog.constants import INSIGHT_RETENTION, INSIGHT_SESSIONS, INSIGHT_TRENDS
 from posthog.models.dashboard import Dashboard
 from posthog.models.filters.utils import get_filter
-from posthog.utils import generate_cache_key
 
 
 class DashboardItem(models.Model):
@@ -29,6 +28,8 @@ class DashboardItem(models.Model):
     color: models.CharField = models.CharField(max_length=400, null=True, blank=True)
     last_refresh: models.DateTimeField = models.DateTimeField(blank=True, null=True)
     refreshing: models.BooleanField = models.BooleanField(default=False)
+    # Seconds the last refresh took to calculate, see posthog.tasks.update_cache
+    last_refresh_duration: models.FloatField = models.FloatField(null=True, blank=True)
     created_by: models.ForeignKey = models.ForeignKey("User", on_delete=models.SET_NULL, null=True, blank=True)
     is_sample: models.BooleanField = models.BooleanField(
         default=False
@@ -62,4 +63,4 @@ def dashboard_item_saved(sender, instance: DashboardItem, dashboard=None, **kwar
         filter = get_filter(data=instance.dashboard_filters(dashboard=dashboard), team=instance.team)
 
         instance.filters = filter.to_dict()
-        instance.filters_hash = generate_cache_key("{}_{}".format(filter.toJSON(), instance.team_id))
+        instance.filters_hash = filter.cache_key(instance.team_id)
@@ -1,15 +1,13 @@
 import copy
-import datetime
 import re
-from collections import defaultdict
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import celery
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib.postgres.fields import JSONField
-from django.db import connection, models, transaction
-from django.db.models import Exists, F, OuterRef, Prefetch, Q, QuerySet, Subquery
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Subquery
 from django.forms.models import model_to_dict
 from django.utils import timezone
 
@@ -22,15 +20,10 @@ from .element_group import ElementGroup
 from .filters import Filter
 from .person import Person, PersonDistinctId
 from .team import Team
-from .utils import namedtuplefetchall
 
 attribute_regex = r"([a-zA-Z]*)\[(.*)=[\'|\"](.*)[\'|\"]\]"
 
 
-LAST_UPDATED_TEAM_ACTION: Dict[int, datetime.datetime] = {}
-TEAM_EVENT_ACTION_QUERY_CACHE: Dict[int, Dict[str, tuple]] = defaultdict(dict)
-# TEAM_EVENT_ACTION_QUERY_CACHE looks like team_id -> event ex('$pageview') -> query
-TEAM_ACTION_QUERY_CACHE: Dict[int, str] = {}
 DEFAULT_EARLIEST_TIME_DELTA = relativedelta(weeks=1)
 
 
@@ -237,7 +230,8 @@ class EventManager(models.QuerySet):
         site_url = kwargs.get("site_url")
 
         with transaction.atomic():
-            if kwargs.get("elements"):
+            elements = kwargs.get("elements")
+            if elements:
                 if kwargs.get("team"):
                     kwargs["elements_hash"] = ElementGroup.objects.create(
                         team=kwargs["team"], elements=kwargs.pop("elements")
@@ -252,7 +246,7 @@ class EventManager(models.QuerySet):
             if not settings.ASYNC_EVENT_ACTION_MAPPING:
                 should_post_webhook = False
                 relations = []
-                for action in event.actions:
+                for action in event.get_matching_actions(elements=elements):
                     relations.append(action.events.through(action_id=action.pk, event_id=event.pk))
                     if is_ee_enabled():
                         continue  # avoiding duplication here - in EE hooks are handled by webhooks_ee.py
@@ -276,96 +270,33 @@ class Event(models.Model):
             models.Index(fields=["timestamp", "team_id", "event"]),
         ]
 
-    def _can_use_cached_query(self, last_updated_action_ts):
-        if not self.team_id in LAST_UPDATED_TEAM_ACTION:
-            return False
-
-        if not self.team_id in TEAM_EVENT_ACTION_QUERY_CACHE:
-            return False
-
-        if not self.event in TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id]:
-            return False
-
-        if not self.team_id in TEAM_ACTION_QUERY_CACHE:
-            return False
-
-        # Cache is expired because actions were updated
-        if last_updated_action_ts > LAST_UPDATED_TEAM_ACTION[self.team_id]:
-            return False
-        return True
-
     @property
     def person(self):
         return Person.objects.get(
             team_id=self.team_id, persondistinctid__team_id=self.team_id, persondistinctid__distinct_id=self.distinct_id
         )
 
-    # This (ab)uses query_db_by_action to find which actions match this event
-    # We can't use filter_by_action here, as we use this function when we create an event so
-    # the event won't be in the Action-Event relationship yet.
-    # We use query caching to reduce the time spent on generating redundant queries
     @property
     def actions(self) -> List:
-        last_updated_action_ts = Action.objects.filter(team_id=self.team_id).aggregate(models.Max("updated_at"))[
-            "updated_at__max"
-        ]
-
-        actions = (
-            Action.objects.filter(
-                team_id=self.team_id, steps__event=self.event, deleted=False,  # filter by event name to narrow down
+        return self.get_matching_actions()
+
+    def get_matching_actions(self, elements: Optional[List[Element]] = None) -> List[Action]:
+        """
+        Actions this event matches, found in memory with the team's compiled actions, as the event isn't in the
+        Action-Event relationship yet when it's created. Pass the event's elements if at hand to save a query.
+        """
+        from .action_matcher import EventToMatch, get_action_matcher
+
+        return get_action_matcher(self.team_id).matching_actions(
+            EventToMatch(
+                team_id=self.team_id,
+                event=self.event,
+                distinct_id=self.distinct_id,
+                properties=self.properties,
+                elements=elements,
+                elements_hash=self.elements_hash,
             )
-            .distinct("id")
-            .prefetch_related(Prefetch("steps", queryset=ActionStep.objects.order_by("id")))
         )
-        if not self._can_use_cached_query(last_updated_action_ts):
-            TEAM_ACTION_QUERY_CACHE[self.team_id], _ = actions.query.sql_with_params()
-            if len(actions) == 0:
-                return []
-            events: models.QuerySet[Any] = Event.objects.filter(pk=self.pk)
-            for action in actions:
-                events = events.annotate(
-                    **{
-                        "action_{}".format(action.pk): Event.objects.filter(pk=self.pk)
-                        .query_db_by_action(action)
-                        .values("id")[:1]
-                    }
-                )
-            # This block is a little cryptic so bear with me
-            # We grab the query and the params from the ORM here
-            q, p = events.query.sql_with_params()
-
-            # We then take the parameters and replace the event id's with a placeholder
-            # We use this later to sub back in future event id's
-            # The rest of the parameters are shared between action types
-            qp = tuple(["%s" if i == self.pk else i for i in p])
-
-            # Create a cache item and add it to the cache keyed on team_id and event id
-            qcache = {self.event: (q, qp)}
-            TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id].update(qcache)
-
-            # Update the last updated team action timestamp for future reference
-            LAST_UPDATED_TEAM_ACTION[self.team_id] = last_updated_action_ts
-        else:
-
-            # If we have reached this block we are about to use the sql query cache
-            # Grab the actions using the cached action query
-            actions.raw(TEAM_ACTION_QUERY_CACHE[self.team_id])
-
-            # Grab the cached query and query params, we will need to replace some params
-            q, p = TEAM_EVENT_ACTION_QUERY_CACHE[self.team_id][self.event]
-
-            # Replace the query param placeholders with the event id (opposite of what we did above)
-            qp = tuple([self.pk if i == "%s" else i for i in p])
-
-            with connection.cursor() as cursor:
-                # Format and execute the cached query using the mostly cached params
-                qstring = cursor.mogrify(q, qp)
-                cursor.execute(qstring)
-                events = namedtuplefetchall(cursor)
-
-        event = [event for event in events][0]
-        filtered_actions = [action for action in actions if getattr(event, "action_{}".format(action.pk), None)]
-        return filtered_actions
 
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     objects: EventManager = EventManager.as_manager()  # type: ignore
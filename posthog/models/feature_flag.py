@@ -1,5 +1,5 @@
 import hashlib
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import posthoganalytics
 from django.conf import settings
@@ -13,7 +13,9 @@ from django.dispatch import receiver
 from django.utils import timezone
 from sentry_sdk.api import capture_exception
 
+from posthog.cache_utils import TTLCache
 from posthog.models.filters.mixins.utils import cached_property
+from posthog.models.property import Property
 from posthog.models.team import Team
 from posthog.queries.base import properties_to_Q
 
@@ -22,6 +24,11 @@ from .person import Person
 
 __LONG_SCALE__ = float(0xFFFFFFFFFFFFFFF)
 
+# team_id -> the team's active feature flags, local to the process
+FEATURE_FLAG_CACHE: TTLCache[List["FeatureFlag"]] = TTLCache(
+    maxsize=settings.TEAM_CACHE_MAX_SIZE, ttl=settings.FEATURE_FLAG_CACHE_TTL
+)
+
 
 class FeatureFlag(models.Model):
     class Meta:
@@ -57,6 +64,11 @@ class FeatureFlag(models.Model):
     def groups(self):
         return self.get_filters().get("groups", [])
 
+    @cached_property
+    def group_properties(self) -> List[List[Property]]:
+        """Parsed property filters of every group, computed once per instance."""
+        return [Filter(data=group).properties for group in self.groups]
+
     def get_filters(self):
         if "groups" in self.filters:
             return self.filters
@@ -70,10 +82,37 @@ class FeatureFlag(models.Model):
             }
 
 
+class PersonProperties:
+    """Properties of the person behind a distinct_id, fetched lazily and at most once."""
+
+    def __init__(self, team_id: int, distinct_id: str):
+        self.team_id = team_id
+        self.distinct_id = distinct_id
+        self._loaded = False
+        self._properties: Optional[Dict[str, Any]] = None
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        if not self._loaded:
+            self._properties = (
+                Person.objects.filter(
+                    team_id=self.team_id,
+                    persondistinctid__distinct_id=self.distinct_id,
+                    persondistinctid__team_id=self.team_id,
+                )
+                .values_list("properties", flat=True)
+                .first()
+            )
+            self._loaded = True
+        return self._properties
+
+
 class FeatureFlagMatcher:
-    def __init__(self, distinct_id: str, feature_flag: FeatureFlag):
+    def __init__(
+        self, distinct_id: str, feature_flag: FeatureFlag, person_properties: Optional[PersonProperties] = None
+    ):
         self.distinct_id = distinct_id
         self.feature_flag = feature_flag
+        self.person_properties = person_properties or PersonProperties(feature_flag.team_id, distinct_id)
 
     def is_match(self):
         return any(self.is_group_match(group, index) for index, group in enumerate(self.feature_flag.groups))
@@ -93,7 +132,13 @@ class FeatureFlagMatcher:
         return False
 
     def _match_distinct_id(self, group_index: int) -> bool:
-        return len(self.query_groups) > 0 and self.query_groups[0][group_index]
+        group_properties = self.feature_flag.group_properties[group_index]
+        if any(prop.type == "cohort" for prop in group_properties):
+            # Cohort membership lives in the database, so fall back to querying
+            return len(self.query_groups) > 0 and self.query_groups[0][group_index]
+
+        person_properties = self.person_properties.get()
+        return person_properties is not None and all(prop.matches(person_properties) for prop in group_properties)
 
     @cached_property
     def query_groups(self) -> List[List[bool]]:
@@ -140,15 +185,37 @@ def feature_flag_created(sender, instance, created, raw, using, **kwargs):
         )
 
 
+@receiver(models.signals.post_save, sender=FeatureFlag)
+@receiver(models.signals.post_delete, sender=FeatureFlag)
+def invalidate_feature_flag_cache(sender, instance, **kwargs):
+    FEATURE_FLAG_CACHE.pop(instance.team_id, None)
+
+
+def get_team_feature_flags(team_id: int) -> List[FeatureFlag]:
+    feature_flags = FEATURE_FLAG_CACHE.get(team_id)
+    if feature_flags is None:
+        feature_flags = list(
+            FeatureFlag.objects.filter(team_id=team_id, active=True, deleted=False).only(
+                "id", "team_id", "filters", "key", "rollout_percentage"
+            )
+        )
+        for feature_flag in feature_flags:
+            try:
+                feature_flag.group_properties  # parse filters once, while the flag is cached
+            except Exception as err:
+                capture_exception(err)
+        FEATURE_FLAG_CACHE[team_id] = feature_flags
+    return feature_flags
+
+
 def get_active_feature_flags(team: Team, distinct_id: str) -> List[str]:
     flags_enabled = []
-    feature_flags = FeatureFlag.objects.filter(team=team, active=True, deleted=False).only(
-        "id", "team_id", "filters", "key", "rollout_percentage"
-    )
-    for feature_flag in feature_flags:
+    # Shared between all flags, so that the person is fetched at most once and only if a flag filters on properties
+    person_properties = PersonProperties(team.pk, distinct_id)
+    for feature_flag in get_team_feature_flags(team.pk):
         try:
             # distinct_id will always be a string, but data can have non-string values ("Any")
-            if feature_flag.distinct_id_matches(distinct_id):
+            if FeatureFlagMatcher(distinct_id, feature_flag, person_properties).is_match():
                 flags_enabled.append(feature_flag.key)
         except Exception as err:
             capture_exception(err)
@@ -1,11 +1,21 @@
 import inspect
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from dateutil import parser
 from django.http import HttpRequest
 
+from posthog.constants import DATE_FROM, DATE_TO, INSIGHT, INSIGHT_TRENDS, INTERVAL, PROPERTIES
+from posthog.ee import is_ee_enabled
 from posthog.models.filters.mixins.common import BaseParamMixin
 from posthog.models.utils import sane_repr
+from posthog.utils import generate_cache_key
+
+# Values that filter on nothing, so leaving them out doesn't change results
+EMPTY_VALUES = (None, "", [], {})
+# Values filters fall back to when they're left out
+DEFAULT_VALUES = {INTERVAL: "day", INSIGHT: INSIGHT_TRENDS}
+HOUR_OR_MINUTE_DATES = ("-24h", "-48h")
 
 
 class BaseFilter(BaseParamMixin):
@@ -32,8 +42,66 @@ class BaseFilter(BaseParamMixin):
     def toJSON(self):
         return json.dumps(self.to_dict(), default=lambda o: o.__dict__, sort_keys=True, indent=4)
 
+    def canonical_dict(self) -> Dict[str, Any]:
+        """
+        to_dict, written the same way for all filters that give the same results: empty and default values are left
+        out, properties are sorted and have their default operator and type, and absolute dates are written as ISO
+        timestamps. On ClickHouse, which counts from the start of the bucket they fall in, they are truncated to it.
+        Relative dates are kept as they are, so that keys don't change over time.
+        """
+        canonical = _canonical(self.to_dict())
+        interval = (canonical.get(INTERVAL) or "").lower()
+        with_time = interval in ("hour", "minute") or canonical.get(DATE_FROM) in HOUR_OR_MINUTE_DATES
+        truncate = is_ee_enabled()
+        for key in (DATE_FROM, DATE_TO):
+            if key in canonical:
+                canonical[key] = _canonical_date(canonical[key], with_time, truncate)
+        return {
+            key: value for key, value in canonical.items() if key not in DEFAULT_VALUES or DEFAULT_VALUES[key] != value
+        }
+
+    def cache_key(self, team_id: int) -> str:
+        "Key results of this filter are cached under, shared by insights and dashboard items"
+        return generate_cache_key(
+            "{}_{}".format(json.dumps(self.canonical_dict(), default=lambda o: o.__dict__, sort_keys=True), team_id)
+        )
+
     def with_data(self, overrides: Dict[str, Any]):
         "Allow making copy of filter whilst preserving the class"
         return type(self)(data={**self._data, **overrides}, **self.kwargs)
 
     __repr__ = sane_repr("_data", "kwargs", include_id=False)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        canonical = {key: _canonical(item) for key, item in value.items()}
+        if isinstance(canonical.get(PROPERTIES), list):
+            canonical[PROPERTIES] = _canonical_properties(canonical[PROPERTIES])
+        return {key: item for key, item in canonical.items() if item not in EMPTY_VALUES}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _canonical_properties(properties: List[Any]) -> List[Any]:
+    canonical = []
+    for prop in properties:
+        if isinstance(prop, dict):
+            prop = {"operator": "exact", "type": "event", **prop}
+            if isinstance(prop.get("value"), list) and all(isinstance(value, str) for value in prop["value"]):
+                prop["value"] = sorted(prop["value"])
+        canonical.append(prop)
+    return sorted(canonical, key=lambda prop: json.dumps(prop, sort_keys=True, default=str))
+
+
+def _canonical_date(date: Any, with_time: bool, truncate: bool) -> Any:
+    if not isinstance(date, str) or date == "all" or date.startswith("-"):
+        return date
+    try:
+        timestamp = parser.isoparse(date)
+    except ValueError:
+        return date
+    if not truncate:
+        return timestamp.isoformat()
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S" if with_time else "%Y-%m-%d")
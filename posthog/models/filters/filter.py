@@ -20,6 +20,7 @@ from posthog.models.filters.mixins.common import (
     InsightMixin,
     IntervalMixin,
     OffsetMixin,
+    SamplingMixin,
     SelectorMixin,
     SessionMixin,
     ShownAsMixin,
@@ -44,6 +45,7 @@ class Filter(
     InsightMixin,
     SessionMixin,
     OffsetMixin,
+    SamplingMixin,
     DateMixin,
     BaseFilter,
     FormulaMixin,
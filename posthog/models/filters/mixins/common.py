@@ -25,6 +25,10 @@ from posthog.constants import (
     INSIGHT_TRENDS,
     INTERVAL,
     OFFSET,
+    SAMPLING_BY,
+    SAMPLING_BY_EVENT,
+    SAMPLING_BY_PERSON,
+    SAMPLING_FACTOR,
     SELECTOR,
     SESSION,
     SHOWN_AS,
@@ -171,6 +175,37 @@ class OffsetMixin(BaseParamMixin):
         return int(_offset or "0")
 
 
+class SamplingMixin(BaseParamMixin):
+    """
+    Compute the insight from a share of the data. Sampling events is fastest, as ClickHouse only reads that share of
+    the events table. Sampling persons keeps all events of each sampled person, which insights counting unique
+    persons or following them from event to event need.
+    """
+
+    @cached_property
+    def sampling_factor(self) -> Optional[float]:
+        factor = self._data.get(SAMPLING_FACTOR)
+        if factor is None or factor == "":
+            return None
+        try:
+            factor = float(factor)
+        except (TypeError, ValueError):
+            return None
+        if not 0 < factor < 1:
+            return None
+        return factor
+
+    @cached_property
+    def sampling_by(self) -> str:
+        return SAMPLING_BY_PERSON if self._data.get(SAMPLING_BY) == SAMPLING_BY_PERSON else SAMPLING_BY_EVENT
+
+    @include_dict
+    def sampling_to_dict(self):
+        return (
+            {"sampling_factor": self.sampling_factor, "sampling_by": self.sampling_by} if self.sampling_factor else {}
+        )
+
+
 class CompareMixin(BaseParamMixin):
     def _process_compare(self, compare: Optional[Union[str, bool]]) -> bool:
         if isinstance(compare, bool):
@@ -1,9 +1,28 @@
-from functools import lru_cache
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
 
 
 # can't use cached_property directly from functools because of 3.7 compatibilty
-def cached_property(func):
-    return property(lru_cache(maxsize=1)(func))
+class cached_property(Generic[T]):
+    """
+    Computes the value once per instance: it's then kept in the instance's __dict__, where it's found before this
+    (non-data) descriptor on later lookups.
+    """
+
+    def __init__(self, func: Callable[[Any], T]):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> T:
+        if instance is None:
+            return self  # type: ignore
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
 
 
 def include_dict(f):
@@ -25,6 +25,7 @@ from posthog.models.filters.mixins.common import (
     InsightMixin,
     IntervalMixin,
     OffsetMixin,
+    SamplingMixin,
 )
 from posthog.models.filters.mixins.property import PropertyMixin
 from posthog.models.filters.mixins.retention import (
@@ -48,6 +49,7 @@ class RetentionFilter(
     FilterTestAccountsMixin,
     InsightMixin,
     OffsetMixin,
+    SamplingMixin,
     BaseFilter,
 ):
     def __init__(self, data: Dict[str, Any] = {}, request: Optional[HttpRequest] = None, **kwargs) -> None:
@@ -1,5 +1,6 @@
 import json
 from typing import Any, Callable, Optional
+from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
 from django.db.models import Q
@@ -36,6 +37,81 @@ class TestFilter(BaseTest):
         )
         self.assertCountEqual(list(filter.to_dict().keys()), ["events", "display", "compare", "insight", "date_from"])
 
+    def test_cache_key(self):
+        filter = Filter(
+            data={
+                "events": [{"id": "$pageview", "order": 0, "properties": [{"key": "$os", "value": "Mac"}]}],
+                "properties": [
+                    {"key": "$browser", "value": ["Firefox", "Chrome"], "type": "event"},
+                    {"key": "email", "value": "@posthog.com", "operator": "icontains", "type": "person"},
+                ],
+                "date_from": "2020-01-01",
+                "date_to": "-1d",
+            }
+        )
+        same_filter = Filter(
+            data={
+                "events": [
+                    {
+                        "id": "$pageview",
+                        "order": 0,
+                        "math": None,
+                        "properties": [{"key": "$os", "value": "Mac", "operator": "exact", "type": "event"}],
+                    }
+                ],
+                "actions": [],
+                "properties": [
+                    {"key": "email", "value": "@posthog.com", "operator": "icontains", "type": "person"},
+                    {"key": "$browser", "value": ["Chrome", "Firefox"], "operator": None},
+                ],
+                "date_from": "2020-01-01T13:45:00Z",
+                "date_to": "-1d",
+                "interval": "day",
+                "insight": "TRENDS",
+                "breakdown": "",
+            }
+        )
+        with patch("posthog.models.filters.base_filter.is_ee_enabled", return_value=True):
+            self.assertEqual(filter.cache_key(self.team.pk), same_filter.cache_key(self.team.pk))
+            self.assertEqual(filter.canonical_dict()["date_from"], "2020-01-01")
+        with patch("posthog.models.filters.base_filter.is_ee_enabled", return_value=False):
+            # Postgres filters on the exact timestamp
+            self.assertNotEqual(filter.cache_key(self.team.pk), same_filter.cache_key(self.team.pk))
+            self.assertEqual(filter.canonical_dict()["date_from"], "2020-01-01T00:00:00")
+            self.assertEqual(
+                filter.cache_key(self.team.pk),
+                filter.with_data({"date_from": "2020-01-01T00:00:00"}).cache_key(self.team.pk),
+            )
+
+        self.assertNotEqual(filter.cache_key(self.team.pk), same_filter.cache_key(self.team.pk + 1))
+        self.assertNotEqual(
+            filter.cache_key(self.team.pk), filter.with_data({"date_to": "-2d"}).cache_key(self.team.pk),
+        )
+        self.assertNotEqual(
+            filter.with_data({"interval": "hour"}).cache_key(self.team.pk),
+            same_filter.with_data({"interval": "hour"}).cache_key(self.team.pk),
+        )
+
+    def test_cached_properties_are_kept_per_instance(self):
+        filters = [Filter(data={"events": [{"id": str(index)}]}) for index in range(3)]
+        entities = [filter.entities for filter in filters]
+
+        for filter, filter_entities in zip(filters, entities):
+            self.assertIs(filter.entities, filter_entities)
+            self.assertEqual(filter.entities[0].id, filter_entities[0].id)
+
+    def test_sampling(self):
+        filter = Filter(data={"events": [{"id": "$pageview"}], "sampling_factor": "0.1", "sampling_by": "person"})
+        self.assertEqual(filter.sampling_factor, 0.1)
+        self.assertEqual(filter.sampling_by, "person")
+        self.assertEqual(filter.to_dict()["sampling_factor"], 0.1)
+
+        self.assertEqual(Filter(data={"sampling_factor": 0.5}).sampling_by, "event")
+        for factor in [None, "", 0, 1, 2, "abc", "nan", [0.5]]:
+            filter = Filter(data={"events": [{"id": "$pageview"}], "sampling_factor": factor})
+            self.assertIsNone(filter.sampling_factor)
+            self.assertNotIn("sampling_factor", filter.to_dict())
+
 
 def property_to_Q_test_factory(filter_events: Callable, event_factory, person_factory):
     class TestPropertiesToQ(BaseTest):
@@ -437,6 +513,64 @@ class TestDjangoPropertiesToQ(property_to_Q_test_factory(_filter_events, Event.o
         self.assertTrue(matched_person)
 
 
+class TestPropertyMatches(BaseTest):
+    def _matches(self, filter_data, properties) -> bool:
+        return all(prop.matches(properties) for prop in Filter(data={"properties": filter_data}).properties)
+
+    def test_exact(self):
+        self.assertTrue(
+            self._matches({"$current_url": "https://whatever.com"}, {"$current_url": "https://whatever.com"})
+        )
+        self.assertFalse(self._matches({"$current_url": "https://whatever.com"}, {"$current_url": 1}))
+        self.assertFalse(self._matches({"$current_url": "https://whatever.com"}, {}))
+        self.assertTrue(
+            self._matches({"$current_url": ["https://a.com", "https://b.com"]}, {"$current_url": "https://b.com"})
+        )
+        self.assertTrue(self._matches({"$a_number": 5}, {"$a_number": 5}))
+        self.assertFalse(self._matches({"$a_number": 5}, {"$a_number": "5"}))
+        self.assertTrue(self._matches({"is_first_user": "true"}, {"is_first_user": True}))
+        self.assertFalse(self._matches({"is_first_user": 1}, {"is_first_user": True}))
+
+    def test_is_not(self):
+        self.assertTrue(self._matches({"$current_url__is_not": "https://whatever.com"}, {}))
+        self.assertTrue(self._matches({"$current_url__is_not": "https://whatever.com"}, {"$current_url": None}))
+        self.assertFalse(
+            self._matches({"$current_url__is_not": "https://whatever.com"}, {"$current_url": "https://whatever.com"})
+        )
+
+    def test_is_set_and_is_not_set(self):
+        self.assertTrue(
+            self._matches([{"key": "is_first", "operator": "is_set", "value": "is_set"}], {"is_first": None})
+        )
+        self.assertFalse(self._matches([{"key": "is_first", "operator": "is_set", "value": "is_set"}], {}))
+        self.assertTrue(self._matches([{"key": "is_first", "operator": "is_not_set", "value": "is_not_set"}], {}))
+
+    def test_contains_and_regex(self):
+        self.assertTrue(
+            self._matches({"$current_url__icontains": "WHATEVER"}, {"$current_url": "https://whatever.com"})
+        )
+        self.assertFalse(self._matches({"$current_url__icontains": "whatever"}, {}))
+        self.assertTrue(self._matches({"$current_url__not_icontains": "whatever"}, {}))
+        self.assertTrue(self._matches({"$current_url__not_icontains": "whatever"}, {"$current_url": None}))
+        self.assertFalse(
+            self._matches({"$current_url__not_icontains": "whatever"}, {"$current_url": "https://whatever.com"})
+        )
+        self.assertTrue(self._matches({"$current_url__regex": r"\.com$"}, {"$current_url": "https://whatever.com"}))
+        self.assertFalse(self._matches({"$current_url__regex": r"\.com$"}, {"$current_url": "https://whatever.org"}))
+        self.assertFalse(self._matches({"$current_url__regex": "?*"}, {"$current_url": "https://whatever.com"}))
+
+    def test_numerical(self):
+        self.assertTrue(self._matches({"$a_number__gt": 5}, {"$a_number": 6}))
+        self.assertFalse(self._matches({"$a_number__gt": 5}, {"$a_number": 5}))
+        self.assertFalse(self._matches({"$a_number__gt": 5}, {"$a_number": "rubbish"}))
+        self.assertTrue(self._matches({"$a_number__lt": 6}, {"$a_number": 5}))
+        self.assertFalse(self._matches({"$a_number__lt": 6}, {}))
+
+    def test_cohort_cannot_be_matched(self):
+        with self.assertRaises(ValueError):
+            self._matches([{"key": "id", "value": 1, "type": "cohort"}], {})
+
+
 class TestDateFilterQ(BaseTest):
     def test_filter_by_all(self):
         filter = Filter(
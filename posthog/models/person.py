@@ -1,11 +1,17 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
 from django.apps import apps
+from django.conf import settings
 from django.contrib.postgres.fields import JSONField
 from django.db import models, transaction
+from django.dispatch import receiver
 
+from posthog.cache_utils import TTLCache
 from posthog.models.utils import UUIDT
 
+# (team_id, distinct_id) -> person id. Only existing mappings are cached, as a person can be created any time
+PERSON_ID_CACHE: TTLCache[int] = TTLCache(maxsize=settings.PERSON_ID_CACHE_MAX_SIZE, ttl=settings.PERSON_ID_CACHE_TTL)
+
 
 class PersonManager(models.Manager):
     def create(self, *args: Any, **kwargs: Any):
@@ -18,8 +24,36 @@ class PersonManager(models.Manager):
             return person
 
     @staticmethod
-    def distinct_ids_exist(team_id: int, distinct_ids: List[str]) -> bool:
-        return PersonDistinctId.objects.filter(team_id=team_id, distinct_id__in=distinct_ids).exists()
+    def distinct_ids_exist(team_id: int, distinct_ids: List[str], use_cache: bool = True) -> bool:
+        # A cached mapping may have been deleted by another worker, so callers that skip creating a person when one
+        # exists must pass use_cache=False
+        if use_cache and any((team_id, str(distinct_id)) in PERSON_ID_CACHE for distinct_id in distinct_ids):
+            return True
+        found = PersonDistinctId.objects.filter(team_id=team_id, distinct_id__in=distinct_ids).values_list(
+            "distinct_id", "person_id"
+        )
+        for distinct_id, person_id in found:
+            PERSON_ID_CACHE[(team_id, distinct_id)] = person_id
+        return len(found) > 0
+
+    @staticmethod
+    def get_person_id(team_id: int, distinct_id: str, use_cache: bool = True) -> Optional[int]:
+        key = (team_id, str(distinct_id))
+        person_id = PERSON_ID_CACHE.get(key) if use_cache else None
+        if person_id is None:
+            person_id = (
+                PersonDistinctId.objects.filter(team_id=team_id, distinct_id=str(distinct_id))
+                .values_list("person_id", flat=True)
+                .first()
+            )
+            if person_id is not None:
+                PERSON_ID_CACHE[key] = person_id
+        return person_id
+
+    @staticmethod
+    def invalidate_distinct_ids(team_id: int, distinct_ids: List[str]) -> None:
+        for distinct_id in distinct_ids:
+            PERSON_ID_CACHE.pop((team_id, str(distinct_id)))
 
 
 class Person(models.Model):
@@ -61,6 +95,7 @@ class Person(models.Model):
             for person_distinct_id in other_person_distinct_ids:
                 person_distinct_id.person = self
                 person_distinct_id.save()
+                PERSON_ID_CACHE.pop((self.team_id, person_distinct_id.distinct_id))
 
             other_person_cohort_ids = CohortPeople.objects.filter(person=other_person)
             for person_cohort_id in other_person_cohort_ids:
@@ -88,3 +123,8 @@ class PersonDistinctId(models.Model):
     team: models.ForeignKey = models.ForeignKey("Team", on_delete=models.CASCADE)
     person: models.ForeignKey = models.ForeignKey(Person, on_delete=models.CASCADE)
     distinct_id: models.CharField = models.CharField(max_length=400)
+
+
+@receiver(models.signals.post_delete, sender=PersonDistinctId)
+def person_distinct_id_deleted(sender, instance: PersonDistinctId, **kwargs):
+    PERSON_ID_CACHE.pop((instance.team_id, instance.distinct_id))
@@ -1,4 +1,6 @@
 import json
+import re
+from numbers import Number
 from typing import Any, Dict, List, Optional, Union, cast
 
 from django.db.models import Exists, OuterRef, Q
@@ -80,6 +82,91 @@ class Property:
             assert not isinstance(value, list)
             return Q(**{f"properties__{self.key}__{self.operator}": value})
 
+    def matches(self, properties: Dict[str, Any]) -> bool:
+        """
+        Evaluates this filter against a properties dict in Python, mirroring what `property_to_Q` does in Postgres.
+        Cohort filters need the database and can't be evaluated this way.
+        """
+        if self.type == "cohort":
+            raise ValueError("Cohort properties can't be matched in Python")
+
+        value = self._parse_value(self.value)
+        has_key = self.key in properties
+        found = properties.get(self.key)
+
+        if self.operator == "is_not":
+            return not has_key or not _json_in(found, value)
+        if self.operator == "is_set":
+            return has_key
+        if self.operator == "is_not_set":
+            return not has_key
+        if self.operator in ("regex", "not_regex") and not is_valid_regex(value):
+            return False
+        if isinstance(self.operator, str) and self.operator.startswith("not_"):
+            return not has_key or found is None or not _lookup_matches(self.operator[4:], found, value)
+
+        if self.operator == "exact" or self.operator is None:
+            return has_key and _json_in(found, value)
+        return has_key and found is not None and _lookup_matches(self.operator, found, value)
+
+
+def _json_type_rank(value: Any) -> int:
+    # Postgres orders jsonb values of different types as Object > Array > Boolean > Number > String > Null
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return 1
+    if isinstance(value, bool):
+        return 3
+    if isinstance(value, Number):
+        return 2
+    if isinstance(value, list):
+        return 4
+    return 5
+
+
+def _json_equal(found: Any, value: Any) -> bool:
+    return _json_type_rank(found) == _json_type_rank(value) and found == value
+
+
+def _json_in(found: Any, value: Any) -> bool:
+    # exact and is_not operators can pass lists as arguments
+    if isinstance(value, list):
+        return any(_json_equal(found, v) for v in value)
+    return _json_equal(found, value)
+
+
+def jsonb_text(value: Any) -> str:
+    # What Postgres' ->> operator gives for a jsonb value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _lookup_matches(lookup: str, found: Any, value: Any) -> bool:
+    if lookup == "icontains":
+        return jsonb_text(value).lower() in jsonb_text(found).lower()
+    if lookup == "regex":
+        return re.search(jsonb_text(value), jsonb_text(found)) is not None
+    if lookup in ("gt", "lt", "gte", "lte", "exact"):
+        found_rank, value_rank = _json_type_rank(found), _json_type_rank(value)
+        if found_rank != value_rank:
+            left, right = found_rank, value_rank
+        elif found_rank in (1, 2, 3):
+            left, right = found, value
+        else:
+            left, right = json.dumps(found, sort_keys=True), json.dumps(value, sort_keys=True)
+        return {
+            "gt": lambda: left > right,
+            "lt": lambda: left < right,
+            "gte": lambda: left >= right,
+            "lte": lambda: left <= right,
+            "exact": lambda: left == right,
+        }[lookup]()
+    raise ValueError("Unsupported property operator: {}".format(lookup))
+
 
 def lookup_q(key: str, value: Any) -> Q:
     # exact and is_not operators can pass lists as arguments. Handle those lookups!
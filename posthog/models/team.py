@@ -1,18 +1,32 @@
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, List, Optional
 
+import statsd
+from django.conf import settings
 from django.contrib.postgres.fields import ArrayField, JSONField
+from django.core.cache import cache
 from django.core.validators import MinLengthValidator
 from django.db import models
 from django.dispatch.dispatcher import receiver
 
+from posthog.cache_utils import TTLCache
 from posthog.helpers.dashboard_templates import create_dashboard_from_template
 from posthog.utils import GenericEmails
 
 from .dashboard import Dashboard
 from .utils import UUIDT, generate_random_token, sane_repr
 
-TEAM_CACHE: Dict[str, "Team"] = {}
+# API token -> Team (or None for tokens that don't belong to any team), local to the process
+TEAM_CACHE: TTLCache[Optional["Team"]] = TTLCache(maxsize=settings.TEAM_CACHE_MAX_SIZE, ttl=settings.TEAM_CACHE_TTL)
+_NOT_CACHED: Any = object()
+
+
+def _team_cache_key(token: str) -> str:
+    return "team_from_token_{}".format(token)
+
+
+def _team_token_cache_key(team_id: int) -> str:
+    return "team_token_{}".format(team_id)
 
 
 class TeamManager(models.Manager):
@@ -55,10 +69,33 @@ class TeamManager(models.Manager):
     def get_team_from_token(self, token: Optional[str]) -> Optional["Team"]:
         if not token:
             return None
+
+        counter = statsd.Counter("%s_posthog_team_cache" % (settings.STATSD_PREFIX,))
+        team = TEAM_CACHE.get(token, _NOT_CACHED)
+        if team is not _NOT_CACHED:
+            counter.increment("hit")
+            return team
+
+        if settings.TEAM_CACHE_REDIS_ENABLED:
+            team = cache.get(_team_cache_key(token), _NOT_CACHED)
+            if team is not _NOT_CACHED:
+                counter.increment("redis_hit")
+                TEAM_CACHE[token] = team
+                return team
+
+        counter.increment("miss")
         try:
-            return Team.objects.get(api_token=token)
+            team = Team.objects.get(api_token=token)
         except Team.DoesNotExist:
-            return None
+            team = None
+
+        TEAM_CACHE[token] = team
+        if settings.TEAM_CACHE_REDIS_ENABLED:
+            cache.set(_team_cache_key(token), team, settings.TEAM_CACHE_TTL)
+            if team is not None:
+                # Remember which token the team was cached under, so that it can be evicted after a token rotation
+                cache.set(_team_token_cache_key(team.pk), token, settings.TEAM_CACHE_TTL)
+        return team
 
 
 class Team(models.Model):
@@ -120,3 +157,20 @@ class Team(models.Model):
 def team_deleted(sender, instance, **kwargs):
     instance.event_set.all().delete()
     instance.elementgroup_set.all().delete()
+
+
+@receiver(models.signals.post_save, sender=Team)
+@receiver(models.signals.post_delete, sender=Team)
+def invalidate_team_cache(sender, instance: Team, **kwargs):
+    # The token may just have been rotated, so evict whatever token the team was cached under as well
+    stale_tokens = {token for token, team in TEAM_CACHE.items() if team is not None and team.pk == instance.pk}
+    # Ingestion saves teams loaded with only(), don't query the token just to evict it
+    if "api_token" not in instance.get_deferred_fields():
+        stale_tokens.add(instance.api_token)
+    if settings.TEAM_CACHE_REDIS_ENABLED:
+        cached_token = cache.get(_team_token_cache_key(instance.pk))
+        if cached_token:
+            stale_tokens.add(cached_token)
+        cache.delete_many([_team_cache_key(token) for token in stale_tokens] + [_team_token_cache_key(instance.pk)])
+    for token in stale_tokens:
+        TEAM_CACHE.pop(token, None)
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from django.conf import settings
@@ -14,6 +15,9 @@ from .personal_api_key import PersonalAPIKey
 from .team import Team
 from .utils import generate_random_token, sane_repr
 
+# Personal API key usage (`last_used_at`) is written at most this often, rather than on every request
+PERSONAL_API_KEY_LAST_USED_RESOLUTION = timedelta(minutes=1)
+
 
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
@@ -73,16 +77,22 @@ class UserManager(BaseUserManager):
             return user
 
     def get_from_personal_api_key(self, key_value: str) -> Optional["User"]:
+        """Resolve the active user owning a personal API key. Not cached, so that revoked keys and deactivated users
+        stop authenticating right away. Key usage (`last_used_at`) is recorded at most once per
+        PERSONAL_API_KEY_LAST_USED_RESOLUTION."""
         try:
             personal_api_key: PersonalAPIKey = (
                 PersonalAPIKey.objects.select_related("user").filter(user__is_active=True).get(value=key_value)
             )
         except PersonalAPIKey.DoesNotExist:
             return None
-        else:
-            personal_api_key.last_used_at = timezone.now()
-            personal_api_key.save()
-            return personal_api_key.user
+        current_time = timezone.now()
+        if (
+            personal_api_key.last_used_at is None
+            or personal_api_key.last_used_at < current_time - PERSONAL_API_KEY_LAST_USED_RESOLUTION
+        ):
+            PersonalAPIKey.objects.filter(pk=personal_api_key.pk).update(last_used_at=current_time)
+        return personal_api_key.user
 
 
 class User(AbstractUser):
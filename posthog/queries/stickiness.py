@@ -25,6 +25,9 @@ def execute_custom_sql(query, params):
 
 class Stickiness(BaseQuery):
     def _serialize_entity(self, entity: Entity, filter: StickinessFilter, team_id: int) -> List[Dict[str, Any]]:
+        return self._serialize_stickiness(entity, self.stickiness(entity=entity, filter=filter, team_id=team_id))
+
+    def _serialize_stickiness(self, entity: Entity, stickiness: Dict[str, Any]) -> List[Dict[str, Any]]:
         serialized: Dict[str, Any] = {
             "action": entity.to_dict(),
             "label": entity.name,
@@ -35,7 +38,7 @@ class Stickiness(BaseQuery):
         }
         response = []
         new_dict = copy.deepcopy(serialized)
-        new_dict.update(self.stickiness(entity=entity, filter=filter, team_id=team_id))
+        new_dict.update(stickiness)
         response.append(new_dict)
         return response
 
@@ -159,6 +159,18 @@ ASYNC_EVENT_ACTION_MAPPING = PRIMARY_DB == RDBMS.POSTGRES and get_from_env(
 )
 
 ASYNC_EVENT_PROPERTY_USAGE = get_from_env("ASYNC_EVENT_PROPERTY_USAGE", False, type_cast=strtobool)
+# Queue newly seen event names and properties in Redis and write them to the team periodically,
+# instead of saving the team from the ingestion workers
+TEAM_METADATA_WRITE_BEHIND = get_from_env("TEAM_METADATA_WRITE_BEHIND", False, type_cast=strtobool)
+TEAM_METADATA_FLUSH_INTERVAL_SECONDS = get_from_env("TEAM_METADATA_FLUSH_INTERVAL_SECONDS", 10, type_cast=int)
+TEAM_METADATA_SEEN_TTL = get_from_env("TEAM_METADATA_SEEN_TTL", 300, type_cast=int)  # seconds
+
+# Decode /capture, /batch and /decide payloads with orjson, if installed, instead of the json module
+ORJSON_PAYLOAD_DECODING = get_from_env("ORJSON_PAYLOAD_DECODING", False, type_cast=strtobool)
+
+# Number of events of a /batch request ingested per process_event_batch task (Postgres pipeline without plugins),
+# 0 publishes one process_event task per event
+PROCESS_EVENT_BATCH_SIZE = get_from_env("PROCESS_EVENT_BATCH_SIZE", 0, type_cast=int)
 ACTION_EVENT_MAPPING_INTERVAL_SECONDS = get_from_env("ACTION_EVENT_MAPPING_INTERVAL_SECONDS", 300, type_cast=int)
 
 # IP block settings
@@ -426,6 +438,31 @@ REDBEAT_LOCK_TIMEOUT = 45  # keep distributed beat lock for 45sec
 
 CACHED_RESULTS_TTL = 7 * 24 * 60 * 60  # how long to keep cached results for
 TEMP_CACHE_RESULTS_TTL = 24 * 60 * 60  # how long to keep non dashboard cached results for
+# Trends up to now are refreshed by only recalculating their buckets since the last refresh, see
+# posthog.decorators.calculate_incrementally. Buckets this many hours older are recalculated too, for events ingested
+# late, and every INCREMENTAL_INSIGHTS_FULL_REFRESH_HOURS the whole date range is
+INCREMENTAL_INSIGHTS_ENABLED = get_from_env("INCREMENTAL_INSIGHTS_ENABLED", False, type_cast=strtobool)
+INCREMENTAL_INSIGHTS_LATE_ARRIVAL_HOURS = get_from_env("INCREMENTAL_INSIGHTS_LATE_ARRIVAL_HOURS", 2, type_cast=int)
+INCREMENTAL_INSIGHTS_FULL_REFRESH_HOURS = get_from_env("INCREMENTAL_INSIGHTS_FULL_REFRESH_HOURS", 24, type_cast=int)
+# Maximum number of dashboard items a request to /api/dashboard/:id/compute/ calculates at once
+DASHBOARD_COMPUTE_CONCURRENCY = get_from_env("DASHBOARD_COMPUTE_CONCURRENCY", 4, type_cast=int)
+
+# In-process cache of API token -> Team lookups done by /capture, /e, /batch and /decide
+TEAM_CACHE_TTL = get_from_env("TEAM_CACHE_TTL", 60, type_cast=int)  # seconds, 0 disables the cache
+TEAM_CACHE_MAX_SIZE = get_from_env("TEAM_CACHE_MAX_SIZE", 10_000, type_cast=int)
+# Whether to also share those lookups between workers through Redis
+TEAM_CACHE_REDIS_ENABLED = get_from_env("TEAM_CACHE_REDIS_ENABLED", False, type_cast=strtobool)
+# In-process cache of (team, distinct_id) -> person id lookups done during ingestion
+PERSON_ID_CACHE_TTL = get_from_env("PERSON_ID_CACHE_TTL", 60, type_cast=int)  # seconds, 0 disables the cache
+PERSON_ID_CACHE_MAX_SIZE = get_from_env("PERSON_ID_CACHE_MAX_SIZE", 100_000, type_cast=int)
+# How long a team's compiled actions are kept in-process, to match them against new events
+ACTION_MATCHER_CACHE_TTL = get_from_env("ACTION_MATCHER_CACHE_TTL", 60, type_cast=int)  # seconds, 0 disables the cache
+# How long a team's compiled feature flags are kept in-process
+FEATURE_FLAG_CACHE_TTL = get_from_env("FEATURE_FLAG_CACHE_TTL", 30, type_cast=int)  # seconds, 0 disables the cache
+
+# Event and person CSV exports are streamed, reading and writing this many rows at a time, up to CSV_EXPORT_LIMIT rows
+CSV_EXPORT_LIMIT = get_from_env("CSV_EXPORT_LIMIT", 100_000, type_cast=int)
+CSV_EXPORT_CHUNK_SIZE = get_from_env("CSV_EXPORT_CHUNK_SIZE", 1000, type_cast=int)
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
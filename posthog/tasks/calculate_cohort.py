@@ -9,7 +9,7 @@ from django.db.models import F
 from django.utils import timezone
 
 from posthog.constants import INSIGHT_STICKINESS
-from posthog.ee import is_ee_enabled
+from posthog.ee import is_ee_enabled, query_tags
 from posthog.models import Cohort
 
 logger = logging.getLogger(__name__)
@@ -38,7 +38,8 @@ def calculate_cohorts() -> None:
 def calculate_cohort(cohort_id: int) -> None:
     start_time = time.time()
     cohort = Cohort.objects.get(pk=cohort_id)
-    cohort.calculate_people()
+    with query_tags(team_id=cohort.team_id, route="calculate_cohort"):
+        cohort.calculate_people()
     logger.info("Calculating cohort {} took {:.2f} seconds".format(cohort.pk, (time.time() - start_time)))
 
 
@@ -66,13 +67,14 @@ def insert_cohort_from_query(
 
         cohort = Cohort.objects.get(pk=cohort_id)
         entity = Entity(data=entity_data)
-        if insight_type == INSIGHT_STICKINESS:
-            _stickiness_filter = StickinessFilter(
-                data=filter_data, team=cohort.team, get_earliest_timestamp=get_earliest_timestamp
-            )
-            insert_stickiness_people_into_cohort(cohort, entity, _stickiness_filter)
-        else:
-            _filter = Filter(data=filter_data)
-            insert_entity_people_into_cohort(cohort, entity, _filter)
+        with query_tags(team_id=cohort.team_id, route="insert_cohort_from_query"):
+            if insight_type == INSIGHT_STICKINESS:
+                _stickiness_filter = StickinessFilter(
+                    data=filter_data, team=cohort.team, get_earliest_timestamp=get_earliest_timestamp
+                )
+                insert_stickiness_people_into_cohort(cohort, entity, _stickiness_filter)
+            else:
+                _filter = Filter(data=filter_data)
+                insert_entity_people_into_cohort(cohort, entity, _filter)
 
-        insert_cohort_people_into_pg(cohort=cohort)
+            insert_cohort_people_into_pg(cohort=cohort)
@@ -6,7 +6,7 @@ from django.db import connection
 from django.db.models import Count
 from django.utils.timezone import now
 
-from posthog.ee import is_ee_enabled
+from posthog.ee import is_ee_enabled, query_tags
 from posthog.models import Team
 from posthog.models.dashboard_item import DashboardItem
 from posthog.models.event import Event
@@ -45,14 +45,16 @@ def calculate_event_property_usage_for_team(team_id: int) -> None:
     # intermittent save in case the heavier queries don't finish
     _save_team(team, event_names, event_properties)
 
-    events_volume = _get_events_volume(team)
+    with query_tags(team_id=team.pk, route="calculate_event_property_usage"):
+        events_volume = _get_events_volume(team)
     for event, value in event_names.items():
         value["volume"] = _extract_count(events_volume, event)
         event_names[event] = value
 
     _save_team(team, event_names, event_properties)
 
-    properties_volume = _get_properties_volume(team)
+    with query_tags(team_id=team.pk, route="calculate_event_property_usage"):
+        properties_volume = _get_properties_volume(team)
     for key, value in event_properties.items():
         value["volume"] = _extract_count(properties_volume, key)
         event_properties[key] = value
@@ -1,21 +1,28 @@
 import datetime
 import json
+from collections import defaultdict
 from numbers import Number
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import posthoganalytics
 from celery import shared_task
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
-from django.db import IntegrityError
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
 from sentry_sdk import capture_exception
 
-from posthog.models import Element, Event, Person, SessionRecordingEvent, Team
+from posthog.models import Element, ElementGroup, Event, Person, PersonDistinctId, SessionRecordingEvent, Team
+from posthog.models.element_group import hash_elements
+from posthog.tasks.team_metadata import record_names_and_properties
 
 
 def _alias(previous_distinct_id: str, distinct_id: str, team_id: int, retry_if_failed: bool = True,) -> None:
     old_person: Optional[Person] = None
     new_person: Optional[Person] = None
+    # Both distinct_ids may end up pointing at another person
+    Person.objects.invalidate_distinct_ids(team_id, [previous_distinct_id, distinct_id])
 
     try:
         old_person = Person.objects.get(
@@ -76,15 +83,28 @@ def sanitize_event_name(event: Any) -> str:
 
 
 def store_names_and_properties(team: Team, event: str, properties: Dict) -> None:
-    # In _capture we only prefetch a couple of fields in Team to avoid fetching too much data
-    save = False
-    if not team.ingested_event:
-        # First event for the team captured
-        for user in team.organization.members.all():
-            posthoganalytics.capture(user.distinct_id, "first team event ingested", {"team": str(team.uuid)})
+    if settings.TEAM_METADATA_WRITE_BEHIND:
+        if _store_ingested_event(team):
+            Team.objects.filter(pk=team.pk).update(ingested_event=True)
+        record_names_and_properties(team, event, properties)
+    elif _add_names_and_properties(team, event, properties):
+        team.save()
 
-        team.ingested_event = True
-        save = True
+
+def _store_ingested_event(team: Team) -> bool:
+    if team.ingested_event:
+        return False
+    # First event for the team captured
+    for user in team.organization.members.all():
+        posthoganalytics.capture(user.distinct_id, "first team event ingested", {"team": str(team.uuid)})
+    team.ingested_event = True
+    return True
+
+
+def _add_names_and_properties(team: Team, event: str, properties: Dict) -> bool:
+    """Record the event name and property keys on the team. Returns whether the team needs to be saved."""
+    # In _capture we only prefetch a couple of fields in Team to avoid fetching too much data
+    save = _store_ingested_event(team)
     if event not in team.event_names:
         save = True
         team.event_names.append(event)
@@ -97,8 +117,27 @@ def store_names_and_properties(team: Team, event: str, properties: Dict) -> None
         if isinstance(value, Number) and key not in team.event_properties_numerical:
             team.event_properties_numerical.append(key)
             save = True
-    if save:
-        team.save()
+    return save
+
+
+def _get_elements(properties: Dict) -> Optional[List[Element]]:
+    elements = properties.get("$elements")
+    if not elements:
+        return None
+    del properties["$elements"]
+    return [
+        Element(
+            text=el["$el_text"][0:400] if el.get("$el_text") else None,
+            tag_name=el["tag_name"],
+            href=el["attr__href"][0:2048] if el.get("attr__href") else None,
+            attr_class=el["attr__class"].split(" ") if el.get("attr__class") else None,
+            attr_id=el.get("attr__id"),
+            nth_child=el.get("nth_child"),
+            nth_of_type=el.get("nth_of_type"),
+            attributes={key: value for key, value in el.items() if key.startswith("attr__")},
+        )
+        for index, el in enumerate(elements)
+    ]
 
 
 def _capture(
@@ -110,23 +149,7 @@ def _capture(
     properties: Dict,
     timestamp: Union[datetime.datetime, str],
 ) -> None:
-    elements = properties.get("$elements")
-    elements_list = None
-    if elements:
-        del properties["$elements"]
-        elements_list = [
-            Element(
-                text=el["$el_text"][0:400] if el.get("$el_text") else None,
-                tag_name=el["tag_name"],
-                href=el["attr__href"][0:2048] if el.get("attr__href") else None,
-                attr_class=el["attr__class"].split(" ") if el.get("attr__class") else None,
-                attr_id=el.get("attr__id"),
-                nth_child=el.get("nth_child"),
-                nth_of_type=el.get("nth_of_type"),
-                attributes={key: value for key, value in el.items() if key.startswith("attr__")},
-            )
-            for index, el in enumerate(elements)
-        ]
+    elements_list = _get_elements(properties)
 
     team = Team.objects.only(
         "slack_incoming_webhook",
@@ -150,10 +173,10 @@ def _capture(
         team=team,
         site_url=site_url,
         **({"timestamp": timestamp} if timestamp else {}),
-        **({"elements": elements_list} if elements_list else {})
+        **({"elements": elements_list} if elements_list else {}),
     )
     store_names_and_properties(team=team, event=event, properties=properties)
-    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)]):
+    if not Person.objects.distinct_ids_exist(team_id=team_id, distinct_ids=[str(distinct_id)], use_cache=False):
         # Catch race condition where in between getting and creating,
         # another request already created this user
         try:
@@ -169,31 +192,83 @@ def _capture(
         )
 
 
+def _apply_person_properties(person_properties: Dict, properties: Any, set_once: bool = False) -> None:
+    if type(properties) != type({}):
+        return
+    if set_once:
+        # Set properties on a user record, only if they do not yet exist.
+        for key, value in properties.items():
+            person_properties.setdefault(key, value)
+    else:
+        person_properties.update(properties)
+
+
 def update_person_properties(team_id: int, distinct_id: str, properties: Dict, set_once: bool = False) -> None:
     if type(properties) != type({}):
         return
 
-    try:
-        person = Person.objects.get(
-            team_id=team_id, persondistinctid__team_id=team_id, persondistinctid__distinct_id=str(distinct_id)
-        )
-    except Person.DoesNotExist:
+    person_id = Person.objects.get_person_id(team_id, distinct_id)
+    if person_id is None:
         try:
-            person = Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)])
+            person_id = Person.objects.create(team_id=team_id, distinct_ids=[str(distinct_id)]).pk
         # Catch race condition where in between getting and creating, another request already created this person
         except Exception:
-            person = Person.objects.get(
-                team_id=team_id, persondistinctid__team_id=team_id, persondistinctid__distinct_id=str(distinct_id)
-            )
-    if set_once:
-        # Set properties on a user record, only if they do not yet exist.
-        # Unlike $set, this will not overwrite existing people property values.
-        new_properties = properties.copy()
-        new_properties.update(person.properties)
-        person.properties = new_properties
-    else:
-        person.properties.update(properties)
-    person.save()
+            person_id = Person.objects.get_person_id(team_id, distinct_id)
+
+    set_properties, set_once_properties = ({}, properties) if set_once else (properties, {})
+    if not _merge_person_properties(team_id, person_id, set_properties, set_once_properties):
+        # The cached person is gone, e.g. it's been merged into another one by another worker
+        person_id = Person.objects.get_person_id(team_id, distinct_id, use_cache=False)
+        _merge_person_properties(team_id, person_id, set_properties, set_once_properties)
+
+
+# Merges properties into the stored ones without reading them first, and only writes the row if that changes them.
+# Returns no row if the person doesn't exist, and a row of NULLs if the properties were already up to date.
+# $set_once properties only apply where the stored ones are missing, $set ones override them
+MERGE_PERSON_PROPERTIES_SQL = """
+WITH person AS (
+    SELECT id FROM posthog_person WHERE id = %(person_id)s AND team_id = %(team_id)s
+), updated AS (
+    UPDATE posthog_person SET properties = %(set_once)s::jsonb || properties || %(set)s::jsonb
+    WHERE id = (SELECT id FROM person) AND %(set_once)s::jsonb || properties || %(set)s::jsonb <> properties
+    RETURNING id, uuid, created_at, properties, is_identified
+)
+SELECT updated.* FROM person LEFT JOIN updated ON true
+"""
+
+
+def _merge_person_properties(
+    team_id: int, person_id: Optional[int], set_properties: Dict, set_once_properties: Dict
+) -> bool:
+    """Returns False if the person doesn't exist anymore."""
+    if person_id is None:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            MERGE_PERSON_PROPERTIES_SQL,
+            {
+                "person_id": person_id,
+                "team_id": team_id,
+                "set": json.dumps(set_properties),
+                "set_once": json.dumps(set_once_properties),
+            },
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    if row[0] is not None:
+        # Let receivers (e.g. syncing persons to ClickHouse) know, as a save() would have
+        id, uuid, created_at, stored_properties, is_identified = row
+        person = Person(
+            id=id,
+            uuid=uuid,
+            created_at=created_at,
+            team_id=team_id,
+            properties=stored_properties if isinstance(stored_properties, dict) else json.loads(stored_properties),
+            is_identified=is_identified,
+        )
+        post_save.send(sender=Person, instance=person, created=False, update_fields=None, raw=False, using="default")
+    return True
 
 
 def _set_is_identified(team_id: int, distinct_id: str, is_identified: bool = True) -> None:
@@ -288,3 +363,192 @@ def process_event(
         properties=properties,
         timestamp=handle_timestamp(data, now, sent_at),
     )
+
+
+def _get_or_create_persons(team_id: int, distinct_ids: Set[str]) -> Dict[str, int]:
+    """Map distinct_ids to person ids, creating persons in bulk for the distinct_ids that don't have one yet."""
+    person_ids: Dict[str, int] = dict(
+        PersonDistinctId.objects.filter(team_id=team_id, distinct_id__in=distinct_ids).values_list(
+            "distinct_id", "person_id"
+        )
+    )
+    missing = [distinct_id for distinct_id in distinct_ids if distinct_id not in person_ids]
+    if not missing:
+        return person_ids
+
+    try:
+        with transaction.atomic():
+            persons = Person.objects.bulk_create([Person(team_id=team_id) for _ in missing])
+            PersonDistinctId.objects.bulk_create(
+                [
+                    PersonDistinctId(team_id=team_id, person_id=person.pk, distinct_id=distinct_id)
+                    for person, distinct_id in zip(persons, missing)
+                ]
+            )
+        person_ids.update({distinct_id: person.pk for person, distinct_id in zip(persons, missing)})
+    except IntegrityError:
+        # Another worker created some of these persons in the meantime, fall back to creating them one by one
+        for distinct_id in missing:
+            try:
+                person_ids[distinct_id] = Person.objects.create(team_id=team_id, distinct_ids=[distinct_id]).pk
+            except IntegrityError:
+                person_ids[distinct_id] = PersonDistinctId.objects.get(
+                    team_id=team_id, distinct_id=distinct_id
+                ).person_id
+    return person_ids
+
+
+def _get_or_create_element_groups(team_id: int, elements_by_hash: Dict[str, List[Element]]) -> None:
+    existing = set(
+        ElementGroup.objects.filter(team_id=team_id, hash__in=list(elements_by_hash.keys())).values_list(
+            "hash", flat=True
+        )
+    )
+    missing = [elements_hash for elements_hash in elements_by_hash if elements_hash not in existing]
+    if not missing:
+        return
+
+    try:
+        with transaction.atomic():
+            groups = ElementGroup.objects.bulk_create(
+                [ElementGroup(team_id=team_id, hash=elements_hash) for elements_hash in missing]
+            )
+            elements = []
+            for group in groups:
+                for element in elements_by_hash[group.hash]:
+                    element.group = group
+                    elements.append(element)
+            Element.objects.bulk_create(elements)
+    except IntegrityError:
+        # Another worker created some of these groups in the meantime, ElementGroupManager.create handles that
+        for elements_hash in missing:
+            ElementGroup.objects.create(team_id=team_id, elements=elements_by_hash[elements_hash])
+
+
+def _capture_batch(team_id: int, events: List[Dict[str, Any]]) -> None:
+    """
+    Batched equivalent of `_capture` for events of a single team: persons, element groups and events are all
+    created in bulk, and $set/$set_once updates are merged per person before a single write.
+    """
+    team = Team.objects.only(
+        "slack_incoming_webhook",
+        "event_names",
+        "event_properties",
+        "event_names_with_usage",
+        "event_properties_with_usage",
+        "event_properties_numerical",
+        "anonymize_ips",
+        "ingested_event",
+        "organization_id",
+    ).get(pk=team_id)
+
+    elements_by_hash: Dict[str, List[Element]] = {}
+    save_team = False
+    new_events = []
+    for event in events:
+        properties = event["properties"]
+        elements_hash = None
+        elements = _get_elements(properties)
+        if elements:
+            for index, element in enumerate(elements):
+                element.order = index
+            elements_hash = hash_elements(elements)
+            elements_by_hash.setdefault(elements_hash, elements)
+
+        if event["ip"] and not team.anonymize_ips and "$ip" not in properties:
+            properties["$ip"] = event["ip"]
+
+        event_name = sanitize_event_name(event["event"])
+        if settings.TEAM_METADATA_WRITE_BEHIND:
+            store_names_and_properties(team, event_name, properties)
+        else:
+            save_team = _add_names_and_properties(team, event_name, properties) or save_team
+        new_events.append(
+            Event(
+                event=event_name,
+                distinct_id=event["distinct_id"],
+                properties=properties,
+                team=team,
+                site_url=event["site_url"],
+                elements_hash=elements_hash,
+                **({"timestamp": event["timestamp"]} if event["timestamp"] else {}),
+            )
+        )
+
+    with transaction.atomic():
+        if elements_by_hash:
+            _get_or_create_element_groups(team_id, elements_by_hash)
+        if settings.ASYNC_EVENT_ACTION_MAPPING:
+            Event.objects.bulk_create(new_events)
+        else:
+            # DEPRECATED: synchronous action mapping happens in EventManager.create, one event at a time
+            for new_event in new_events:
+                Event.objects.create(
+                    team=team,
+                    **{
+                        field.attname: getattr(new_event, field.attname)
+                        for field in Event._meta.concrete_fields
+                        if field.attname != "team_id"
+                    },
+                )
+    if save_team:
+        team.save()
+
+    person_ids = _get_or_create_persons(team_id, {event["distinct_id"] for event in events})
+
+    # Fold all $set and $set_once of the batch in order, so that each person is updated once. The update merges them
+    # into the stored properties atomically, so that concurrent updates of the same person aren't lost
+    updates: Dict[int, Tuple[Dict, Dict]] = defaultdict(lambda: ({}, {}))
+    for event in events:
+        set_properties, set_once_properties = updates[person_ids[event["distinct_id"]]]
+        _apply_person_properties(set_properties, event["properties"].get("$set"))
+        _apply_person_properties(set_once_properties, event["properties"].get("$set_once"), set_once=True)
+    for person_id, (set_properties, set_once_properties) in updates.items():
+        if set_properties or set_once_properties:
+            _merge_person_properties(team_id, person_id, set_properties, set_once_properties)
+
+
+@shared_task(name="posthog.tasks.process_event.process_event_batch", ignore_result=True)
+def process_event_batch(events: List[List[Any]]) -> None:
+    """
+    Ingests many events at once. Each item of `events` holds the arguments of `process_event`.
+    Identify and alias calls are handled first, one by one, as they can merge persons.
+    """
+    events_by_team: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    session_recording_events = []
+    for distinct_id, ip, site_url, data, team_id, now, sent_at in events:
+        properties = data.get("properties", {})
+        if data.get("$set"):
+            properties["$set"] = data["$set"]
+        if data.get("$set_once"):
+            properties["$set_once"] = data["$set_once"]
+
+        handle_identify_or_alias(data["event"], properties, distinct_id, team_id)
+
+        if data["event"] == "$snapshot":
+            session_recording_events.append(
+                SessionRecordingEvent(
+                    team_id=team_id,
+                    distinct_id=distinct_id,
+                    session_id=properties["$session_id"],
+                    timestamp=handle_timestamp(data, now, sent_at),
+                    snapshot_data=properties["$snapshot_data"],
+                )
+            )
+            continue
+
+        events_by_team[team_id].append(
+            {
+                "ip": ip,
+                "site_url": site_url,
+                "event": data["event"],
+                "distinct_id": distinct_id,
+                "properties": properties,
+                "timestamp": handle_timestamp(data, now, sent_at),
+            }
+        )
+
+    if session_recording_events:
+        SessionRecordingEvent.objects.bulk_create(session_recording_events)
+    for team_id, team_events in events_by_team.items():
+        _capture_batch(team_id, team_events)
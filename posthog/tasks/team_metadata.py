@@ -0,0 +1,116 @@
+from numbers import Number
+from typing import Dict, List, Set
+
+import statsd
+from django.conf import settings
+from django.db import transaction
+
+from posthog.cache_utils import TTLCache
+from posthog.models import Team
+from posthog.redis import get_client
+
+# Team columns listing what has been seen, with the matching "with usage" column if there's one
+METADATA_COLUMNS = {
+    "event_names": "event_names_with_usage",
+    "event_properties": "event_properties_with_usage",
+    "event_properties_numerical": None,
+}
+PENDING_TEAMS_KEY = "@posthog/team-metadata/teams"
+
+# Per-process view of what each team has already recorded, so that known names don't cost a Redis round trip
+SEEN_METADATA: TTLCache[Dict[str, Set[str]]] = TTLCache(
+    maxsize=settings.TEAM_CACHE_MAX_SIZE, ttl=settings.TEAM_METADATA_SEEN_TTL
+)
+
+
+def _pending_key(team_id: int, column: str) -> str:
+    return "@posthog/team-metadata/{}/{}".format(team_id, column)
+
+
+def record_names_and_properties(team: Team, event: str, properties: Dict) -> None:
+    """
+    Write-behind equivalent of `store_names_and_properties`: names and properties the team hasn't seen yet are
+    queued in Redis and written to the team by `flush_team_metadata`, instead of saving the team on every event.
+    """
+    seen = SEEN_METADATA.get(team.pk)
+    if seen is None:
+        seen = {column: set(getattr(team, column)) for column in METADATA_COLUMNS}
+        SEEN_METADATA[team.pk] = seen
+
+    new: Dict[str, List[str]] = {column: [] for column in METADATA_COLUMNS}
+    if event not in seen["event_names"]:
+        new["event_names"].append(event)
+    for key, value in properties.items():
+        if key not in seen["event_properties"]:
+            new["event_properties"].append(key)
+        if isinstance(value, Number) and key not in seen["event_properties_numerical"]:
+            new["event_properties_numerical"].append(key)
+    if not any(new.values()):
+        return
+
+    pipeline = get_client().pipeline(transaction=False)
+    for column, values in new.items():
+        if values:
+            seen[column].update(values)
+            pipeline.sadd(_pending_key(team.pk, column), *values)
+    pipeline.sadd(PENDING_TEAMS_KEY, team.pk)
+    pipeline.execute()
+
+
+def flush_team_metadata() -> None:
+    """Write names and properties queued by `record_names_and_properties`, with one targeted update per team."""
+    client = get_client()
+    teams_flushed = 0
+    for team_id in client.smembers(PENDING_TEAMS_KEY):
+        team_id = int(team_id)
+        # Read and clear the queue atomically, so nothing recorded in the meantime gets lost
+        pipeline = client.pipeline(transaction=True)
+        for column in METADATA_COLUMNS:
+            pipeline.smembers(_pending_key(team_id, column))
+        for column in METADATA_COLUMNS:
+            pipeline.delete(_pending_key(team_id, column))
+        pipeline.srem(PENDING_TEAMS_KEY, team_id)
+        results = pipeline.execute()
+        pending = {
+            column: sorted(value.decode("utf-8") for value in values)
+            for column, values in zip(METADATA_COLUMNS, results)
+        }
+        if _write_team_metadata(team_id, pending):
+            teams_flushed += 1
+
+    statsd.Counter("%s_posthog_team_metadata" % (settings.STATSD_PREFIX,)).increment(
+        "teams_flushed", delta=teams_flushed
+    )
+
+
+def _write_team_metadata(team_id: int, pending: Dict[str, List[str]]) -> bool:
+    columns = [column for column in METADATA_COLUMNS if pending[column]]
+    columns += [METADATA_COLUMNS[column] for column in columns if METADATA_COLUMNS[column]]
+    if not columns:
+        return False
+
+    updates: Dict[str, List] = {}
+    with transaction.atomic():
+        team = Team.objects.select_for_update().only(*columns).filter(pk=team_id).first()
+        if team is None:
+            return False
+        for column, values in pending.items():
+            if not values:
+                continue
+            existing = set(getattr(team, column))
+            missing = [value for value in values if value not in existing]
+            if not missing:
+                continue
+            updates[column] = getattr(team, column) + missing
+            usage_column = METADATA_COLUMNS[column]
+            if usage_column == "event_names_with_usage":
+                updates[usage_column] = team.event_names_with_usage + [
+                    {"event": value, "usage_count": None, "volume": None} for value in missing
+                ]
+            elif usage_column == "event_properties_with_usage":
+                updates[usage_column] = team.event_properties_with_usage + [
+                    {"key": value, "usage_count": None, "volume": None} for value in missing
+                ]
+        if updates:
+            Team.objects.filter(pk=team_id).update(**updates)
+    return bool(updates)
@@ -4,6 +4,8 @@ from unittest.mock import patch
 from uuid import UUID
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils.timezone import now
 from freezegun import freeze_time
 
@@ -17,11 +19,15 @@ from posthog.models import (
     FeatureFlag,
     Organization,
     Person,
+    PersonDistinctId,
     SessionRecordingEvent,
     Team,
     User,
 )
+from posthog.models.person import PERSON_ID_CACHE
+from posthog.tasks.process_event import _get_or_create_persons
 from posthog.tasks.process_event import process_event as _process_event
+from posthog.tasks.process_event import process_event_batch, update_person_properties
 from posthog.test.base import BaseTest
 
 
@@ -277,6 +283,24 @@ def factory_test_process_event(
             event = get_events()[0]
             self.assertNotIn("$ip", event.properties.keys())
 
+        def test_person_deleted_by_another_worker(self) -> None:
+            person = Person.objects.create(team=self.team, distinct_ids=["distinct_id"])
+            person.delete()
+            # as still cached by a process that didn't see the deletion
+            PERSON_ID_CACHE[(self.team.pk, "distinct_id")] = person.pk
+
+            process_event(
+                "distinct_id",
+                "",
+                "",
+                {"event": "$pageview", "properties": {}},
+                self.team.pk,
+                now().isoformat(),
+                now().isoformat(),
+            )
+
+            self.assertEqual(Person.objects.get().distinct_ids, ["distinct_id"])
+
         def test_alias(self) -> None:
             Person.objects.create(team=self.team, distinct_ids=["old_distinct_id"])
 
@@ -1007,3 +1031,122 @@ def factory_test_process_event(
 
 class TestProcessEvent(factory_test_process_event(_process_event, Event.objects.all, SessionRecordingEvent.objects.all, get_elements)):  # type: ignore
     pass
+
+
+class TestProcessEventBatch(BaseTest):
+    def _event(self, distinct_id: str, data: Any) -> List[Any]:
+        return [distinct_id, "127.0.0.1", "", data, self.team.pk, now().isoformat(), now().isoformat()]
+
+    def test_capture_batch(self) -> None:
+        Person.objects.create(team=self.team, distinct_ids=["existing"], properties={"a_prop": "old"})
+        elements = [
+            {"tag_name": "a", "nth_child": 1, "nth_of_type": 2, "attr__class": "btn btn-sm"},
+            {"tag_name": "div", "nth_child": 1, "nth_of_type": 2, "$el_text": "💻"},
+        ]
+
+        process_event_batch(
+            [
+                self._event("existing", {"event": "$pageview", "properties": {"$set": {"a_prop": "new"}}}),
+                self._event("new", {"event": "$autocapture", "properties": {"$elements": elements}}),
+                self._event("new", {"event": "$autocapture", "properties": {"$elements": elements}}),
+                self._event("new", {"event": "$pageview", "$set_once": {"b_prop": 1}}),
+                self._event("new", {"event": "$pageview", "$set_once": {"b_prop": 2}}),
+            ]
+        )
+
+        self.assertEqual(Event.objects.count(), 5)
+        self.assertEqual(Person.objects.count(), 2)
+        self.assertEqual(Person.objects.get(persondistinctid__distinct_id="existing").properties, {"a_prop": "new"})
+        self.assertEqual(Person.objects.get(persondistinctid__distinct_id="new").properties, {"b_prop": 1})
+        self.assertEqual(ElementGroup.objects.count(), 1)
+        event = Event.objects.filter(event="$autocapture").first()
+        self.assertEqual([element.tag_name for element in get_elements(event.pk)], ["a", "div"])
+        self.assertEqual(Event.objects.get(distinct_id="existing").properties["$ip"], "127.0.0.1")
+
+        team = Team.objects.get()
+        self.assertEqual(sorted(team.event_names), ["$autocapture", "$pageview"])
+
+    def test_capture_batch_keeps_concurrent_person_updates(self) -> None:
+        person = Person.objects.create(team=self.team, distinct_ids=["existing"], properties={"a_prop": "old"})
+
+        def get_or_create_persons(*args):
+            person_ids = _get_or_create_persons(*args)
+            # Written by another worker while the batch is processed
+            Person.objects.filter(pk=person.pk).update(properties={"a_prop": "old", "c_prop": "concurrent"})
+            return person_ids
+
+        with patch("posthog.tasks.process_event._get_or_create_persons", side_effect=get_or_create_persons):
+            process_event_batch(
+                [
+                    self._event("existing", {"event": "$pageview", "$set_once": {"a_prop": "once", "b_prop": 1}}),
+                    self._event("existing", {"event": "$pageview", "$set": {"b_prop": 2}}),
+                    self._event("existing", {"event": "$pageview", "$set_once": {"b_prop": 3}}),
+                ]
+            )
+
+        person.refresh_from_db()
+        self.assertEqual(person.properties, {"a_prop": "old", "b_prop": 2, "c_prop": "concurrent"})
+
+    @override_settings(ASYNC_EVENT_ACTION_MAPPING=False)
+    def test_capture_batch_sync_action_mapping(self) -> None:
+        action = Action.objects.create(team=self.team, name="pageview")
+        ActionStep.objects.create(action=action, event="$pageview")
+        Person.objects.create(team=self.team, distinct_ids=["existing"])
+        self.team.ingested_event = True  # avoid sending `first team event ingested` to PostHog
+        self.team.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            process_event_batch([self._event("existing", {"event": "$pageview", "properties": {}})] * 3)
+
+        self.assertEqual(action.events.count(), 3)
+        # The batch's team is loaded once, not again for each event's actions
+        self.assertEqual(len([query for query in queries if 'FROM "posthog_team"' in query["sql"]]), 1)
+
+    def test_capture_batch_identify(self) -> None:
+        Person.objects.create(team=self.team, distinct_ids=["anonymous"])
+
+        process_event_batch(
+            [
+                self._event("identified", {"event": "$identify", "properties": {"$anon_distinct_id": "anonymous"}},),
+                self._event("identified", {"event": "$pageview", "properties": {}}),
+            ]
+        )
+
+        person = Person.objects.get()
+        self.assertEqual(sorted(person.distinct_ids), ["anonymous", "identified"])
+        self.assertTrue(person.is_identified)
+        self.assertEqual(Event.objects.count(), 2)
+
+
+class TestUpdatePersonProperties(BaseTest):
+    def test_merges_properties(self) -> None:
+        person = Person.objects.create(team=self.team, distinct_ids=["distinct_id"], properties={"a": 1, "b": 1})
+
+        update_person_properties(self.team.pk, "distinct_id", {"b": 2, "c": 2})
+        update_person_properties(self.team.pk, "distinct_id", {"a": 3, "d": 3}, set_once=True)
+
+        person.refresh_from_db()
+        self.assertEqual(person.properties, {"a": 1, "b": 2, "c": 2, "d": 3})
+
+    def test_unchanged_properties_are_not_written(self) -> None:
+        Person.objects.create(team=self.team, distinct_ids=["distinct_id"], properties={"a": 1})
+        update_person_properties(self.team.pk, "distinct_id", {"a": 1})
+
+        with patch("posthog.tasks.process_event.post_save.send") as post_save_send:
+            update_person_properties(self.team.pk, "distinct_id", {"a": 1})
+            update_person_properties(self.team.pk, "distinct_id", {"a": 2})
+
+        self.assertEqual(post_save_send.call_count, 1)
+        self.assertEqual(Person.objects.get().properties, {"a": 2})
+
+    def test_person_merged_by_another_worker(self) -> None:
+        person0 = Person.objects.create(team=self.team, distinct_ids=["distinct_id"])
+        person1 = Person.objects.create(team=self.team, distinct_ids=["other"])
+        update_person_properties(self.team.pk, "distinct_id", {"a": 1})
+        # merged without going through this process' cache
+        PersonDistinctId.objects.filter(person=person0).update(person=person1)
+        person0.delete()
+
+        update_person_properties(self.team.pk, "distinct_id", {"b": 2})
+
+        self.assertEqual(Person.objects.get().properties, {"b": 2})
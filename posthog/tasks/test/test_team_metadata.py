@@ -0,0 +1,71 @@
+from django.test import override_settings
+from django.utils.timezone import now
+
+from posthog.models import Team
+from posthog.redis import get_client
+from posthog.tasks.process_event import process_event
+from posthog.tasks.team_metadata import SEEN_METADATA, flush_team_metadata
+from posthog.test.base import BaseTest
+
+
+@override_settings(TEAM_METADATA_WRITE_BEHIND=True)
+class TestTeamMetadata(BaseTest):
+    def setUp(self) -> None:
+        super().setUp()
+        get_client().flushdb()
+        SEEN_METADATA.clear()
+        self.team.event_names = ["$pageview"]
+        self.team.event_names_with_usage = [{"event": "$pageview", "usage_count": 2, "volume": 3}]
+        self.team.event_properties = ["$browser"]
+        self.team.event_properties_with_usage = [{"key": "$browser", "usage_count": 2, "volume": 3}]
+        self.team.ingested_event = True
+        self.team.save()
+
+    def _process_event(self, event: str, properties: dict) -> None:
+        process_event(
+            "distinct_id",
+            "",
+            "",
+            {"event": event, "properties": properties},
+            self.team.pk,
+            now().isoformat(),
+            now().isoformat(),
+        )
+
+    def test_names_and_properties_are_written_on_flush(self) -> None:
+        self._process_event("$pageview", {"$browser": "Chrome"})
+        self._process_event("purchase", {"$browser": "Chrome", "price": 10})
+        self._process_event("purchase", {"price": 20, "plan": "pro"})
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual(team.event_names, ["$pageview"])
+
+        flush_team_metadata()
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual(team.event_names, ["$pageview", "purchase"])
+        self.assertEqual(
+            team.event_names_with_usage,
+            [
+                {"event": "$pageview", "usage_count": 2, "volume": 3},
+                {"event": "purchase", "usage_count": None, "volume": None},
+            ],
+        )
+        self.assertEqual(team.event_properties, ["$browser", "plan", "price"])
+        self.assertEqual(team.event_properties_numerical, ["price"])
+
+        # nothing left to write
+        flush_team_metadata()
+        self.assertEqual(Team.objects.get(pk=self.team.pk).event_names, ["$pageview", "purchase"])
+
+    def test_known_names_are_not_queued(self) -> None:
+        self._process_event("$pageview", {"$browser": "Chrome"})
+
+        self.assertEqual(get_client().smembers("@posthog/team-metadata/teams"), set())
+
+    def test_first_event_ingested(self) -> None:
+        Team.objects.filter(pk=self.team.pk).update(ingested_event=False)
+
+        self._process_event("$pageview", {})
+
+        self.assertTrue(Team.objects.get(pk=self.team.pk).ingested_event)
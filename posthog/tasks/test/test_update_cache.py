@@ -1,11 +1,13 @@
+import json
 from datetime import timedelta
+from typing import List
 from unittest.mock import MagicMock, patch
 
 from django.utils.timezone import now
 from freezegun import freeze_time
 
 from posthog.constants import ENTITY_ID, ENTITY_TYPE
-from posthog.decorators import CacheType
+from posthog.decorators import CacheType, calculate_incrementally
 from posthog.models import Dashboard, DashboardItem, Event, Filter
 from posthog.models.filters.retention_filter import RetentionFilter
 from posthog.models.filters.stickiness_filter import StickinessFilter
@@ -13,7 +15,7 @@ from posthog.queries.trends import Trends
 from posthog.tasks.update_cache import update_cache_item, update_cached_items
 from posthog.test.base import BaseTest
 from posthog.types import FilterType
-from posthog.utils import generate_cache_key, get_safe_cache
+from posthog.utils import get_safe_cache
 
 
 class TestUpdateCache(BaseTest):
@@ -54,8 +56,8 @@ class TestUpdateCache(BaseTest):
             team=self.team,
         )
 
-        item_key = generate_cache_key(filter.toJSON() + "_" + str(self.team.pk))
-        funnel_key = generate_cache_key(filter.toJSON() + "_" + str(self.team.pk))
+        item_key = filter.cache_key(self.team.pk)
+        funnel_key = filter.cache_key(self.team.pk)
         update_cached_items()
 
         # pass the caught calls straight to the function
@@ -114,7 +116,7 @@ class TestUpdateCache(BaseTest):
 
         with self.settings(EE_AVAILABLE=False):
             update_cache_item(
-                generate_cache_key("{}_{}".format(filter.toJSON(), self.team.pk)),
+                filter.cache_key(self.team.pk),
                 CacheType.TRENDS,
                 {"filter": filter.toJSON(), "team_id": self.team.pk,},
             )
@@ -125,6 +127,100 @@ class TestUpdateCache(BaseTest):
         self.assertEqual(updated_dashboard_item.refreshing, False)
         self.assertEqual(updated_dashboard_item.last_refresh, now())
 
+    @patch("posthog.tasks.update_cache.PARALLEL_DASHBOARD_ITEM_CACHE", 2)
+    @patch("posthog.tasks.update_cache.group.apply_async")
+    @patch("posthog.celery.update_cache_item_task.s")
+    def test_refresh_dashboard_cache_priority(
+        self, patch_update_cache_item: MagicMock, _patch_apply_async: MagicMock
+    ) -> None:
+        dashboard = Dashboard.objects.create(team=self.team, is_shared=True, last_accessed_at=now())
+        old_dashboard = Dashboard.objects.create(
+            team=self.team, is_shared=True, last_accessed_at=now() - timedelta(days=5)
+        )
+        filters = {name: Filter(data={"events": [{"id": name}]}).to_dict() for name in "abcde"}
+        # Not due yet
+        DashboardItem.objects.create(dashboard=dashboard, filters=filters["a"], team=self.team, last_refresh=now())
+        # Due, on a dashboard viewed less recently
+        DashboardItem.objects.create(
+            dashboard=old_dashboard, filters=filters["b"], team=self.team, last_refresh=now() - timedelta(hours=2)
+        )
+        # Due, expensive
+        DashboardItem.objects.create(
+            dashboard=dashboard,
+            filters=filters["c"],
+            team=self.team,
+            last_refresh=now() - timedelta(hours=2),
+            last_refresh_duration=60,
+        )
+        # Due, cheap, on two dashboards
+        DashboardItem.objects.create(
+            dashboard=dashboard,
+            filters=filters["d"],
+            team=self.team,
+            last_refresh=now() - timedelta(hours=2),
+            last_refresh_duration=1,
+        )
+        DashboardItem.objects.create(
+            dashboard=old_dashboard, filters=filters["d"], team=self.team, last_refresh=now() - timedelta(hours=2)
+        )
+        # Due, refreshed hourly
+        DashboardItem.objects.create(
+            dashboard=dashboard,
+            filters={**filters["e"], "interval": "hour"},
+            team=self.team,
+            last_refresh=now() - timedelta(hours=2),
+            last_refresh_duration=1,
+        )
+
+        update_cached_items()
+
+        refreshed = [
+            json.loads(call[0][2]["filter"])["events"][0]["id"] for call in patch_update_cache_item.call_args_list
+        ]
+        self.assertEqual(refreshed, ["e", "d"])
+
+        patch_update_cache_item.reset_mock()
+        with patch("posthog.tasks.update_cache.get_redis_queue_depth", return_value=1000):
+            update_cached_items()
+        patch_update_cache_item.assert_not_called()
+
+    def test_calculate_incrementally(self) -> None:
+        def calculate(filter: Filter):
+            calculated_from.append(filter.date_from)
+            return Trends().run(filter, self.team)
+
+        calculated_from: List = []
+        Event.objects.create(team=self.team, event="$pageview", distinct_id="1", timestamp="2012-01-10T12:00:00Z")
+        Event.objects.create(team=self.team, event="$pageview", distinct_id="1", timestamp="2012-01-15T10:00:00Z")
+
+        with self.settings(INCREMENTAL_INSIGHTS_ENABLED=True, INCREMENTAL_INSIGHTS_LATE_ARRIVAL_HOURS=2):
+            with freeze_time("2012-01-15T12:00:00Z"):
+                filter = Filter(data={"events": [{"id": "$pageview"}], "date_from": "-7d"})
+                result = calculate_incrementally(filter, self.team.pk, calculate)
+            self.assertEqual(result[0]["count"], 2)
+
+            # Too late to be counted until the next full refresh
+            Event.objects.create(team=self.team, event="$pageview", distinct_id="1", timestamp="2012-01-12T12:00:00Z")
+            Event.objects.create(team=self.team, event="$pageview", distinct_id="1", timestamp="2012-01-16T10:00:00Z")
+
+            with freeze_time("2012-01-16T11:00:00Z"):
+                filter = Filter(data={"events": [{"id": "$pageview"}], "date_from": "-7d"})
+                result = calculate_incrementally(filter, self.team.pk, calculate)
+            self.assertEqual(result[0]["days"][0], "2012-01-09")
+            self.assertEqual(result[0]["days"][-1], "2012-01-16")
+            self.assertEqual(result[0]["data"], [0, 1, 0, 0, 0, 0, 1, 1])
+            self.assertEqual(result[0]["count"], 3)
+
+            with freeze_time("2012-01-17T13:00:00Z"):
+                filter = Filter(data={"events": [{"id": "$pageview"}], "date_from": "-7d"})
+                result = calculate_incrementally(filter, self.team.pk, calculate)
+            self.assertEqual(result[0]["data"], [1, 0, 1, 0, 0, 1, 1, 0])
+
+        self.assertEqual(
+            [date_from.isoformat() for date_from in calculated_from],
+            ["2012-01-08T00:00:00+00:00", "2012-01-15T00:00:00+00:00", "2012-01-10T00:00:00+00:00"],
+        )
+
     def _test_refresh_dashboard_cache_types(
         self, filter: FilterType, cache_type: CacheType, patch_update_cache_item: MagicMock,
     ) -> None:
@@ -133,7 +229,7 @@ class TestUpdateCache(BaseTest):
         update_cached_items()
 
         expected_args = [
-            generate_cache_key("{}_{}".format(filter.toJSON(), self.team.pk)),
+            filter.cache_key(self.team.pk),
             cache_type,
             {"filter": filter.toJSON(), "team_id": self.team.pk,},
         ]
@@ -142,7 +238,7 @@ class TestUpdateCache(BaseTest):
 
         update_cache_item(*expected_args)  # type: ignore
 
-        item_key = generate_cache_key("{}_{}".format(filter.toJSON(), self.team.pk))
+        item_key = filter.cache_key(self.team.pk)
         self.assertIsNotNone(get_safe_cache(item_key))
 
     def _create_dashboard(self, filter: FilterType, item_refreshing: bool = False) -> DashboardItem:
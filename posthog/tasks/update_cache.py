@@ -1,14 +1,19 @@
 import importlib
 import json
 import logging
+import math
 import os
-from typing import Any, Dict, List, Optional, Union
+from collections import defaultdict
+from datetime import datetime, timedelta
+from time import time
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
+import statsd
 from celery import group
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Prefetch, Q
-from django.db.models.expressions import F, Subquery
+from django.db.models import Prefetch, Q, QuerySet
 from django.utils import timezone
 
 from posthog.celery import update_cache_item_task
@@ -18,10 +23,11 @@ from posthog.constants import (
     INSIGHT_RETENTION,
     INSIGHT_SESSIONS,
     INSIGHT_TRENDS,
+    INTERVAL,
     TRENDS_STICKINESS,
 )
-from posthog.decorators import CacheType
-from posthog.ee import is_ee_enabled
+from posthog.decorators import CacheType, calculate_incrementally
+from posthog.ee import is_ee_enabled, query_tags
 from posthog.models import DashboardItem, Filter, Team
 from posthog.models.filters.path_filter import PathFilter
 from posthog.models.filters.retention_filter import RetentionFilter
@@ -29,9 +35,21 @@ from posthog.models.filters.stickiness_filter import StickinessFilter
 from posthog.models.filters.utils import get_filter
 from posthog.settings import CACHED_RESULTS_TTL
 from posthog.types import FilterType
-from posthog.utils import generate_cache_key
-
-PARALLEL_DASHBOARD_ITEM_CACHE = int(os.environ.get("PARALLEL_DASHBOARD_ITEM_CACHE", 5))
+from posthog.utils import get_redis_queue_depth
+
+# Most dashboard items refreshed per check_cached_items run, when Celery and ClickHouse are idle
+PARALLEL_DASHBOARD_ITEM_CACHE = int(os.environ.get("PARALLEL_DASHBOARD_ITEM_CACHE", 20))
+# Celery queue depth from which no dashboard items are refreshed
+DASHBOARD_REFRESH_MAX_QUEUE_DEPTH = int(os.environ.get("DASHBOARD_REFRESH_MAX_QUEUE_DEPTH", 1000))
+
+# How often dashboard items are refreshed, by interval. Items without an interval are refreshed as daily ones
+REFRESH_TARGETS = {
+    "minute": timedelta(minutes=5),
+    "hour": timedelta(minutes=15),
+    "day": timedelta(minutes=30),
+    "week": timedelta(hours=6),
+    "month": timedelta(hours=12),
+}
 
 logger = logging.getLogger(__name__)
 
@@ -52,19 +70,27 @@ TYPE_TO_IMPORT = {
 }
 
 
-def update_cache_item(key: str, cache_type: CacheType, payload: dict) -> None:
+def update_cache_item(key: str, cache_type: CacheType, payload: dict) -> Optional[Union[List, Dict]]:
 
     result: Optional[Union[List, Dict]] = None
     filter_dict = json.loads(payload["filter"])
     team_id = int(payload["team_id"])
     filter = get_filter(data=filter_dict, team=Team(pk=team_id))
-    if cache_type == CacheType.FUNNEL:
-        result = _calculate_funnel(filter, key, team_id)
-    else:
-        result = _calculate_by_filter(filter, key, team_id, cache_type)
+    with query_tags(insight=filter.insight, team_id=team_id, route="update_cache_item"):
+        if cache_type == CacheType.FUNNEL:
+            result = _calculate_funnel(filter, key, team_id)
+        else:
+            result = _calculate_by_filter(filter, key, team_id, cache_type)
 
     if result:
         cache.set(key, {"result": result, "type": cache_type, "last_refresh": timezone.now()}, CACHED_RESULTS_TTL)
+    return result
+
+
+def dashboard_item_cache_params(item: DashboardItem) -> Tuple[str, CacheType, Dict[str, Any]]:
+    "Arguments of update_cache_item for a dashboard item, with its dashboard's filters applied"
+    filter = get_filter(data=item.dashboard_filters(), team=item.team)
+    return filter.cache_key(item.team_id), get_cache_type(filter), {"filter": filter.toJSON(), "team_id": item.team_id}
 
 
 def get_cache_type(filter: FilterType) -> CacheType:
@@ -87,33 +113,86 @@ def get_cache_type(filter: FilterType) -> CacheType:
 
 
 def update_cached_items() -> None:
-
-    tasks = []
+    """
+    Queues refreshes of the dashboard items most worth refreshing: the ones that are the most overdue for a refresh
+    (see REFRESH_TARGETS), on the most recently viewed dashboards, and the cheapest to calculate. Fewer are refreshed
+    at once the busier Celery and ClickHouse are.
+    """
+    current_time = timezone.now()
     items = (
         DashboardItem.objects.filter(
-            Q(Q(dashboard__is_shared=True) | Q(dashboard__last_accessed_at__gt=timezone.now() - relativedelta(days=7)))
+            Q(Q(dashboard__is_shared=True) | Q(dashboard__last_accessed_at__gt=current_time - relativedelta(days=7)))
         )
         .exclude(dashboard__deleted=True)
         .exclude(refreshing=True)
         .exclude(deleted=True)
-        .distinct("filters_hash")
+        .filter(filters__isnull=False)
+        .exclude(filters={})
+        .select_related("dashboard")
     )
 
-    for item in DashboardItem.objects.filter(
-        pk__in=Subquery(items.filter(filters__isnull=False).exclude(filters={}).distinct("filters").values("pk"))
-    ).order_by(F("last_refresh").asc(nulls_first=True))[0:PARALLEL_DASHBOARD_ITEM_CACHE]:
-        filter = get_filter(data=item.dashboard_filters(), team=item.team)
-        cache_key = generate_cache_key("{}_{}".format(filter.toJSON(), item.team_id))
+    # Items with the same filters hash share their cached result, so they're refreshed once for all of them
+    items_by_hash: Dict[str, List[DashboardItem]] = defaultdict(list)
+    for item in items:
+        items_by_hash[item.filters_hash or str(item.pk)].append(item)
 
-        cache_type = get_cache_type(filter)
-        payload = {"filter": filter.toJSON(), "team_id": item.team_id}
-        tasks.append(update_cache_item_task.s(cache_key, cache_type, payload))
+    priorities = []
+    for same_items in items_by_hash.values():
+        priority = _refresh_priority(same_items, current_time)
+        if priority is not None:
+            priorities.append((priority, same_items[0]))
+    priorities.sort(key=lambda priority_and_item: priority_and_item[0], reverse=True)
 
-    logger.info("Found {} items to refresh".format(len(tasks)))
+    tasks = []
+    for _, item in priorities[: _refresh_parallelism()]:
+        tasks.append(update_cache_item_task.s(*dashboard_item_cache_params(item)))
+
+    logger.info("Found {} items to refresh, refreshing {}".format(len(priorities), len(tasks)))
     taskset = group(tasks)
     taskset.apply_async()
 
 
+def _refresh_priority(items: List[DashboardItem], current_time: datetime) -> Optional[Tuple[float, float]]:
+    """
+    How much refreshing items sharing a result is worth, or None if they were refreshed recently enough.
+    Compared by how overdue they are, weighed by how recently they were viewed and how long they take to calculate,
+    then by how recently they were viewed.
+    """
+    last_refresh = min((item.last_refresh for item in items if item.last_refresh), default=None)
+    interval = items[0].dashboard_filters().get(INTERVAL) or "day"
+    target = REFRESH_TARGETS.get(interval, REFRESH_TARGETS["day"])
+    overdue = float("inf") if last_refresh is None else (current_time - last_refresh) / target
+    if overdue < 1:
+        return None
+
+    # Viewed just now counts as 1, a week ago (or shared, but not viewed since) as 1/8
+    last_accessed_at = max(
+        (item.dashboard.last_accessed_at for item in items if item.dashboard.last_accessed_at), default=None
+    )
+    days_since_viewed = (
+        7.0 if last_accessed_at is None else max((current_time - last_accessed_at) / timedelta(days=1), 0)
+    )
+    views = 1 / (1 + days_since_viewed)
+
+    # Expensive items are refreshed less eagerly, though still once they're overdue enough
+    cost = 1 + max((item.last_refresh_duration or 0 for item in items), default=0)
+    return overdue * views / math.sqrt(cost), views
+
+
+def _refresh_parallelism() -> int:
+    """
+    How many refreshes to queue: PARALLEL_DASHBOARD_ITEM_CACHE with idle workers and ClickHouse, down to none when the
+    Celery queue reaches DASHBOARD_REFRESH_MAX_QUEUE_DEPTH tasks or all ClickHouse query slots are taken.
+    """
+    load = get_redis_queue_depth() / DASHBOARD_REFRESH_MAX_QUEUE_DEPTH
+    if is_ee_enabled():
+        running_queries = import_from("ee.clickhouse.client", "get_running_query_count")()
+        load = max(load, running_queries / settings.CLICKHOUSE_MAX_CONCURRENT_QUERIES)
+    if load >= 1:
+        return 0
+    return math.ceil(PARALLEL_DASHBOARD_ITEM_CACHE * (1 - load))
+
+
 def import_from(module: str, name: str) -> Any:
     return getattr(importlib.import_module(module), name)
 
@@ -128,8 +207,14 @@ def _calculate_by_filter(filter: FilterType, key: str, team_id: int, cache_type:
         insight_class_path = TYPE_TO_IMPORT[cache_type]
 
     insight_class = import_from(insight_class_path[0], insight_class_path[1])
-    result = insight_class().run(filter, Team(pk=team_id))
-    dashboard_items.update(last_refresh=timezone.now(), refreshing=False)
+    start_time = time()
+    if cache_type == CacheType.TRENDS:
+        result = calculate_incrementally(
+            cast(Filter, filter), team_id, lambda filter: insight_class().run(filter, Team(pk=team_id))
+        )
+    else:
+        result = insight_class().run(filter, Team(pk=team_id))
+    _record_refresh(dashboard_items, cache_type, time() - start_time)
     return result
 
 
@@ -142,6 +227,12 @@ def _calculate_funnel(filter: Filter, key: str, team_id: int) -> List[Dict[str,
     else:
         insight_class = import_from("posthog.queries.funnel", "Funnel")
 
+    start_time = time()
     result = insight_class(filter=filter, team=Team(pk=team_id)).run()
-    dashboard_items.update(last_refresh=timezone.now(), refreshing=False)
+    _record_refresh(dashboard_items, CacheType.FUNNEL, time() - start_time)
     return result
+
+
+def _record_refresh(dashboard_items: QuerySet, cache_type: CacheType, duration: float) -> None:
+    dashboard_items.update(last_refresh=timezone.now(), refreshing=False, last_refresh_duration=duration)
+    statsd.Timer("%s_posthog_dashboard_item_refresh" % (settings.STATSD_PREFIX,)).send(cache_type.value, duration)
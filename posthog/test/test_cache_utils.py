@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from posthog.cache_utils import TTLCache
+
+
+class TestTTLCache(SimpleTestCase):
+    def test_get_and_set(self):
+        cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60)
+        cache["a"] = 1
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache["a"], 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("b", 2), 2)
+        with self.assertRaises(KeyError):
+            cache["b"]
+
+    def test_expiry(self):
+        now = [0.0]
+        cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60, timer=lambda: now[0])
+        cache["a"] = 1
+        cache.set("b", 2, ttl=120)
+        now[0] = 61
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(list(cache.items()), [("b", 2)])
+
+    def test_evicts_least_recently_used(self):
+        cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3
+        self.assertEqual(sorted(key for key, _ in cache.items()), ["a", "c"])
+
+    def test_pop_and_clear(self):
+        cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache.pop("a"), 1)
+        self.assertIsNone(cache.pop("a"))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
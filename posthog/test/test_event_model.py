@@ -3,6 +3,7 @@ from unittest.mock import call, patch
 from freezegun import freeze_time
 
 from posthog.models import Action, ActionStep, Element, ElementGroup, Event, Organization, Person
+from posthog.models.action_matcher import ACTION_MATCHER_CACHE
 from posthog.models.event import Selector
 from posthog.tasks.calculate_action import calculate_actions_from_last_calculation
 from posthog.test.base import BaseTest
@@ -507,6 +508,83 @@ class TestActions(BaseTest):
         # This would error when attr_class wasn't set.
         self.assertEqual(event.actions, [])
 
+    def test_url_and_properties(self):
+        action_exact = Action.objects.create(team=self.team, name="exact")
+        ActionStep.objects.create(action=action_exact, url="https://posthog.com/pricing", url_matching="exact")
+        action_contains = Action.objects.create(team=self.team, name="contains")
+        ActionStep.objects.create(action=action_contains, event="$pageview", url="posthog.com/pri")
+        action_regex = Action.objects.create(team=self.team, name="regex")
+        ActionStep.objects.create(action=action_regex, url=r"/pricing$", url_matching="regex")
+        action_properties = Action.objects.create(team=self.team, name="properties")
+        ActionStep.objects.create(
+            action=action_properties,
+            event="$pageview",
+            properties=[
+                {"key": "plan", "value": "pro"},
+                {"key": "email", "value": "posthog.com", "operator": "icontains", "type": "person"},
+            ],
+        )
+        Person.objects.create(distinct_ids=["person"], team=self.team, properties={"email": "tim@posthog.com"})
+
+        event = Event.objects.create(
+            event="$pageview",
+            distinct_id="person",
+            team=self.team,
+            properties={"$current_url": "https://posthog.com/pricing", "plan": "pro"},
+        )
+        self.assertEqual(event.actions, [action_exact, action_contains, action_regex, action_properties])
+
+        event = Event.objects.create(
+            event="$autocapture",
+            distinct_id="person",
+            team=self.team,
+            properties={"$current_url": "https://posthog.com/"},
+        )
+        self.assertEqual(event.actions, [])
+
+    def test_matching_without_queries(self):
+        action = Action.objects.create(team=self.team, name="watch movie")
+        ActionStep.objects.create(action=action, selector="div > a.watch_movie", event="$autocapture")
+        event = self._movie_event("watched_movie")
+        self.assertEqual(event.actions, [action])
+
+        elements = [Element(tag_name="a", attr_class=["watch_movie"], order=0), Element(tag_name="div", order=1)]
+        with self.assertNumQueries(0):
+            self.assertEqual(event.get_matching_actions(elements=elements), [action])
+            self.assertEqual(event.get_matching_actions(elements=list(reversed(elements))[:1]), [])
+
+    def test_matcher_invalidated_on_action_step_change(self):
+        action = Action.objects.create(team=self.team, name="user paid")
+        step = ActionStep.objects.create(action=action, event="user paid")
+        event = Event.objects.create(event="user paid", distinct_id="user_paid", team=self.team)
+        self.assertEqual(event.actions, [action])
+
+        step.event = "user signed up"
+        step.save()
+        self.assertEqual(event.actions, [])
+
+        action.deleted = True
+        action.save()
+        event.event = "user signed up"
+        self.assertEqual(event.actions, [])
+
+    def test_matcher_invalidated_by_another_process(self):
+        action = Action.objects.create(team=self.team, name="user paid")
+        step = ActionStep.objects.create(action=action, event="user paid")
+        event = Event.objects.create(event="user paid", distinct_id="user_paid", team=self.team)
+        self.assertEqual(event.actions, [action])
+        cached = ACTION_MATCHER_CACHE[self.team.pk]
+
+        step.event = "user signed up"
+        step.save()
+        # as still cached by a process that didn't see the change
+        ACTION_MATCHER_CACHE[self.team.pk] = cached
+
+        with self.assertNumQueries(2):  # actions and their steps
+            self.assertEqual(event.actions, [])
+        with self.assertNumQueries(0):
+            self.assertEqual(event.actions, [])
+
 
 class TestPreCalculation(BaseTest):
     def test_update_or_delete_action_steps(self):
@@ -1,4 +1,5 @@
 from posthog.models import Cohort, FeatureFlag, Person
+from posthog.models.feature_flag import get_active_feature_flags
 from posthog.test.base import BaseTest
 
 
@@ -125,6 +126,46 @@ class TestFeatureFlag(BaseTest):
         self.assertTrue(feature_flag.distinct_id_matches("example_id"))
         self.assertFalse(feature_flag.distinct_id_matches("another_id"))
 
+    def test_active_feature_flags_fetch_person_once(self):
+        Person.objects.create(
+            team=self.team, distinct_ids=["example_id"], properties={"email": "tim@posthog.com", "plan": "pro"},
+        )
+        FeatureFlag.objects.create(
+            team=self.team, name="Rollout", key="rollout", created_by=self.user, rollout_percentage=100
+        )
+        for index, key in enumerate(["email", "plan", "email"]):
+            FeatureFlag.objects.create(
+                team=self.team,
+                name="Flag {}".format(index),
+                key="flag-{}".format(index),
+                created_by=self.user,
+                filters={"groups": [{"properties": [{"key": key, "type": "person", "operator": "is_set"}]}]},
+            )
+
+        with self.assertNumQueries(2):  # flags and person
+            self.assertCountEqual(
+                get_active_feature_flags(self.team, "example_id"), ["rollout", "flag-0", "flag-1", "flag-2"]
+            )
+        with self.assertNumQueries(1):  # flags are cached, person only
+            self.assertEqual(get_active_feature_flags(self.team, "another_id"), ["rollout"])
+
+    def test_rollout_only_flags_need_no_person(self):
+        FeatureFlag.objects.create(
+            team=self.team, name="Rollout", key="rollout", created_by=self.user, rollout_percentage=100
+        )
+        get_active_feature_flags(self.team, "example_id")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_active_feature_flags(self.team, "example_id"), ["rollout"])
+
+    def test_active_feature_flags_cache_invalidated_on_save(self):
+        feature_flag = FeatureFlag.objects.create(
+            team=self.team, name="Rollout", key="rollout", created_by=self.user, rollout_percentage=100
+        )
+        self.assertEqual(get_active_feature_flags(self.team, "example_id"), ["rollout"])
+        feature_flag.active = False
+        feature_flag.save()
+        self.assertEqual(get_active_feature_flags(self.team, "example_id"), [])
+
     def create_feature_flag(self, **kwargs):
         return FeatureFlag.objects.create(
             team=self.team, name="Beta feature", key="beta-feature", created_by=self.user, **kwargs
@@ -50,3 +50,30 @@ class TestPerson(BaseTest):
         person_anonymous = Person.objects.create(team=self.team)
         self.assertEqual(person_identified.is_identified, True)
         self.assertEqual(person_anonymous.is_identified, False)
+
+    def test_person_id_cache(self):
+        person = Person.objects.create(distinct_ids=["person_0"], team=self.team)
+
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_0"), person.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_0"), person.pk)
+            self.assertTrue(Person.objects.distinct_ids_exist(self.team.pk, ["person_0"]))
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "other"), None)
+
+    def test_person_id_cache_invalidated_on_merge(self):
+        person0 = Person.objects.create(distinct_ids=["person_0"], team=self.team)
+        person1 = Person.objects.create(distinct_ids=["person_1"], team=self.team)
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_1"), person1.pk)
+
+        person0.merge_people([person1])
+
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_1"), person0.pk)
+
+    def test_person_id_cache_invalidated_on_delete(self):
+        person = Person.objects.create(distinct_ids=["person_0"], team=self.team)
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_0"), person.pk)
+
+        person.delete()
+
+        self.assertEqual(Person.objects.get_person_id(self.team.pk, "person_0"), None)
+        self.assertFalse(Person.objects.distinct_ids_exist(self.team.pk, ["person_0"]))
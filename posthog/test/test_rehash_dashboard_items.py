@@ -0,0 +1,31 @@
+from django.core.management import call_command
+
+from posthog.models import Dashboard, DashboardItem, Filter
+
+from .base import BaseTest
+
+
+class TestRehashDashboardItems(BaseTest):
+    def test_rehash_dashboard_items(self):
+        dashboard = Dashboard.objects.create(team=self.team, filters={"date_from": "-14d"})
+        items = [
+            DashboardItem.objects.create(
+                team=self.team, dashboard=dashboard, filters={"events": [{"id": "$pageview"}]}
+            ),
+            DashboardItem.objects.create(team=self.team, filters={"events": [{"id": "$pageview"}], "interval": "week"}),
+            DashboardItem.objects.create(
+                team=self.team, filters={"events": [{"id": "$pageview"}]}, deleted=True, saved=True
+            ),
+        ]
+        DashboardItem.objects.filter(pk__in=[item.pk for item in items]).update(filters_hash="stale")
+
+        call_command("rehash_dashboard_items")
+
+        expected = [
+            Filter(data={"events": [{"id": "$pageview"}], "date_from": "-14d"}).cache_key(self.team.pk),
+            Filter(data={"events": [{"id": "$pageview"}], "interval": "week"}).cache_key(self.team.pk),
+            Filter(data={"events": [{"id": "$pageview"}]}).cache_key(self.team.pk),
+        ]
+        for item, filters_hash in zip(items, expected):
+            item.refresh_from_db()
+            self.assertEqual(item.filters_hash, filters_hash)
@@ -35,3 +35,46 @@ class TestTeam(BaseTest):
                 },
             ],
         )
+
+
+class TestTeamCache(BaseTest):
+    def test_get_team_from_token_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(Team.objects.get_team_from_token(self.team.api_token), self.team)
+        with self.assertNumQueries(0):
+            self.assertEqual(Team.objects.get_team_from_token(self.team.api_token), self.team)
+            self.assertIsNone(Team.objects.get_team_from_token(None))
+
+    def test_unknown_token_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(Team.objects.get_team_from_token("unknown_token"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(Team.objects.get_team_from_token("unknown_token"))
+
+    def test_cache_invalidated_on_save(self):
+        Team.objects.get_team_from_token(self.team.api_token)
+        self.team.anonymize_ips = True
+        self.team.save()
+        self.assertTrue(Team.objects.get_team_from_token(self.team.api_token).anonymize_ips)  # type: ignore
+
+    def test_cache_invalidated_on_token_rotation(self):
+        old_token = self.team.api_token
+        Team.objects.get_team_from_token(old_token)
+        self.team.api_token = "rotated_token_1234"
+        self.team.save()
+        self.assertIsNone(Team.objects.get_team_from_token(old_token))
+        self.assertEqual(Team.objects.get_team_from_token("rotated_token_1234"), self.team)
+
+    def test_cache_invalidated_on_delete(self):
+        team = Team.objects.create(organization=self.organization, api_token="token_to_be_deleted")
+        Team.objects.get_team_from_token("token_to_be_deleted")
+        team.delete()
+        self.assertIsNone(Team.objects.get_team_from_token("token_to_be_deleted"))
+
+    def test_cache_invalidated_on_partial_save(self):
+        Team.objects.get_team_from_token(self.team.api_token)
+        team = Team.objects.only("id", "anonymize_ips").get(pk=self.team.pk)
+        team.anonymize_ips = True
+        with self.assertNumQueries(1):  # the update, not the deferred api_token
+            team.save(update_fields=["anonymize_ips"])
+        self.assertTrue(Team.objects.get_team_from_token(self.team.api_token).anonymize_ips)  # type: ignore
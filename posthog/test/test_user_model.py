@@ -6,11 +6,31 @@ from django.test import tag
 from django.utils.timezone import now
 from freezegun import freeze_time
 
-from posthog.models import OrganizationMembership, Team, User
+from posthog.models import OrganizationMembership, PersonalAPIKey, Team, User
 from posthog.test.base import BaseTest
 
 
 class TestUser(BaseTest):
+    def test_get_from_personal_api_key(self):
+        with freeze_time("2021-01-01T12:00:00Z"):
+            key = PersonalAPIKey.objects.create(label="X", user=self.user)
+            self.assertEqual(User.objects.get_from_personal_api_key(key.value), self.user)
+            key.refresh_from_db()
+            self.assertEqual(key.last_used_at, now())
+
+        with freeze_time("2021-01-01T12:00:30Z"):
+            User.objects.get_from_personal_api_key(key.value)
+            key.refresh_from_db()
+            self.assertEqual(key.last_used_at.isoformat(), "2021-01-01T12:00:00+00:00")
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(User.objects.get_from_personal_api_key(key.value))
+        self.user.is_active = True
+        self.user.save()
+        key.delete()
+        self.assertIsNone(User.objects.get_from_personal_api_key(key.value))
+
     @pytest.mark.ee
     @patch("posthog.models.organization.License.PLANS", {"enterprise": ["whatever"]})
     @patch("ee.models.license.requests.post")
@@ -1,7 +1,12 @@
+import base64
+import gzip
+import json
+
+import lzstring
 from django.test import TestCase
 from freezegun import freeze_time
 
-from posthog.utils import mask_email_address, relative_date_parse
+from posthog.utils import decode_payload, lz64_decompress, mask_email_address, relative_date_parse
 
 
 class TestGeneralUtils(TestCase):
@@ -53,3 +58,25 @@ class TestRelativeDateParse(TestCase):
     @freeze_time("2020-01-31")
     def test_normal_date(self):
         self.assertEqual(relative_date_parse("2019-12-31").strftime("%Y-%m-%d"), "2019-12-31")
+
+
+class TestDecodePayload(TestCase):
+    def test_lz64_decompress_matches_lzstring(self):
+        for data in ["a", "hello world " * 50, '{"event": "🤓", "properties": {"ünïcode": "漢字"}}', "x" * 5000]:
+            compressed = lzstring.LZString().compressToBase64(data)
+            self.assertEqual(lz64_decompress(compressed), lzstring.LZString().decompressFromBase64(compressed))
+
+    def test_decode_payload(self):
+        data = {"event": "$pageview", "properties": {"emoji": "🤓", "number": 1.5}}
+        raw = json.dumps(data)
+
+        self.assertEqual(decode_payload(raw.encode(), ""), data)
+        self.assertEqual(decode_payload("  " + raw, ""), data)
+        self.assertEqual(decode_payload(base64.b64encode(raw.encode()).decode(), ""), data)
+        self.assertEqual(decode_payload(gzip.compress(raw.encode()), "gzip-js"), data)
+        self.assertEqual(decode_payload(lzstring.LZString().compressToBase64(raw).encode(), "lz64"), data)
+
+    def test_decode_payload_nan(self):
+        for orjson_enabled in (False, True):
+            with self.settings(ORJSON_PAYLOAD_DECODING=orjson_enabled):
+                self.assertEqual(decode_payload(b'{"value": NaN}', ""), {"value": None})
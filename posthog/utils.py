@@ -5,6 +5,7 @@ import hashlib
 import json
 import os
 import re
+import string
 import subprocess
 import time
 import uuid
@@ -21,7 +22,6 @@ from typing import (
 )
 from urllib.parse import urljoin, urlparse
 
-import lzstring
 import pytz
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
@@ -38,6 +38,11 @@ from sentry_sdk import capture_exception, push_scope
 from posthog.redis import get_client
 from posthog.settings import print_warning
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DATERANGE_MAP = {
     "minute": datetime.timedelta(minutes=1),
     "hour": datetime.timedelta(hours=1),
@@ -342,24 +347,132 @@ def get_celery_heartbeat() -> Union[str, int]:
 
 
 def base64_to_json(data) -> Dict:
-    return json.loads(
-        base64.b64decode(data.replace(" ", "+") + "===")
-        .decode("utf8", "surrogatepass")
-        .encode("utf-16", "surrogatepass")
+    if isinstance(data, bytes):
+        data = data.decode("ascii")
+    return _json_loads(
+        _join_surrogates(base64.b64decode(data.replace(" ", "+") + "===").decode("utf8", "surrogatepass"))
     )
 
 
+_SURROGATES_REGEX = re.compile("[\ud800-\udfff]")
+
+
+def _join_surrogates(data: str) -> str:
+    # JS strings are UTF-16, lz-string and some base64 encoders give us surrogate pairs as two separate characters
+    if _SURROGATES_REGEX.search(data) is None:
+        return data
+    return data.encode("utf-16", "surrogatepass").decode("utf-16")
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    if settings.ORJSON_PAYLOAD_DECODING and orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN, which orjson doesn't accept, let json deal with it
+    # parse_constant gets called in case of NaN, Infinity etc
+    # default behaviour is to put those into the DB directly
+    # but we just want it to return None
+    return json.loads(data, parse_constant=lambda x: None)
+
+
+_LZ64_BITS = {
+    ord(char): format(index, "06b")
+    for index, char in enumerate(string.ascii_uppercase + string.ascii_lowercase + string.digits + "+/")
+}
+_LZ64_BITS[ord("=")] = "000000"
+_LZ64_PADDING = 32
+
+
+def lz64_decompress(compressed: str) -> Optional[str]:
+    """
+    Equivalent of `lzstring.LZString().decompressFromBase64`, which looks every character up bit by bit.
+    Here the input is turned into a string of bits once, and codes are read from it with int(bits, 2).
+    """
+    if not compressed:
+        return None
+    bits = compressed.translate(_LZ64_BITS)
+    if len(bits) != 6 * len(compressed):
+        raise ValueError("Invalid lz64 data")
+    # Codes are written least significant bit first: reverse everything so that a code is read with a single
+    # int(), from the end of the string. Reading past the data gives zeros, as in JS
+    bits = "0" * _LZ64_PADDING + bits[::-1]
+    end = len(bits)
+
+    def read(bit_count: int) -> int:
+        nonlocal end
+        end -= bit_count
+        return int(bits[end : end + bit_count], 2)
+
+    control = read(2)
+    if control == 0:
+        w = chr(read(8))
+    elif control == 1:
+        w = chr(read(16))
+    else:
+        return ""
+
+    # codes 0 to 2 are control codes: next 8 bit char, next 16 bit char and end of data
+    dictionary = ["", "", "", w]
+    result = [w]
+    enlarge_in = 4
+    num_bits = 3
+    while True:
+        if end <= _LZ64_PADDING:
+            return ""
+        code = read(num_bits)
+        if code == 0 or code == 1:
+            dictionary.append(chr(read(8 if code == 0 else 16)))
+            code = len(dictionary) - 1
+            enlarge_in -= 1
+        elif code == 2:
+            return "".join(result)
+
+        if enlarge_in == 0:
+            enlarge_in = 1 << num_bits
+            num_bits += 1
+
+        if code < len(dictionary):
+            entry = dictionary[code]
+        elif code == len(dictionary):
+            entry = w + w[0]
+        else:
+            return None
+        result.append(entry)
+
+        dictionary.append(w + entry[0])
+        enlarge_in -= 1
+        w = entry
+        if enlarge_in == 0:
+            enlarge_in = 1 << num_bits
+            num_bits += 1
+
+
+_JSON_START_REGEX = re.compile(r"\s*[\[{]")
+_JSON_START_BYTES_REGEX = re.compile(rb"\s*[\[{]")
+
+
+def decode_payload(data: Union[str, bytes], compression: str) -> Any:
+    """Decodes a request payload given its declared compression, without trying decoders one after the other."""
+    if compression == "gzip" or compression == "gzip-js":
+        return _json_loads(gzip.decompress(data))  # type: ignore
+    if compression == "lz64":
+        if isinstance(data, bytes):
+            data = data.decode()
+        return _json_loads(_join_surrogates(lz64_decompress(data.replace(" ", "+")) or ""))
+    if compression != "base64":
+        # Uncompressed: plain JSON, or base64 encoded JSON from some libraries
+        json_start_regex = _JSON_START_BYTES_REGEX if isinstance(data, bytes) else _JSON_START_REGEX
+        if json_start_regex.match(data):  # type: ignore
+            return _json_loads(data)
+    return base64_to_json(data)
+
+
 # Used by non-DRF endpoins from capture.py and decide.py (/decide, /batch, /capture, etc)
 def load_data_from_request(request):
     data_res: Dict[str, Any] = {"data": {}, "body": None}
     if request.method == "POST":
-        if request.content_type == "application/json":
-            data = request.body
-            try:
-                data_res["body"] = {**json.loads(request.body)}
-            except:
-                pass
-        elif request.content_type == "text/plain" or request.content_type == "":
+        if request.content_type in ("application/json", "text/plain", ""):
             data = request.body
         else:
             data = request.POST.get("data")
@@ -377,25 +490,9 @@ def load_data_from_request(request):
     )
     compression = compression.lower()
 
-    if compression == "gzip" or compression == "gzip-js":
-        data = gzip.decompress(data)
-
-    if compression == "lz64":
-        if isinstance(data, str):
-            data = lzstring.LZString().decompressFromBase64(data.replace(" ", "+"))
-        else:
-            data = lzstring.LZString().decompressFromBase64(data.decode().replace(" ", "+"))
-        data = data.encode("utf-16", "surrogatepass").decode("utf-16")
-
-    #  Is it plain json?
-    try:
-        # parse_constant gets called in case of NaN, Infinity etc
-        # default behaviour is to put those into the DB directly
-        # but we just want it to return None
-        data = json.loads(data, parse_constant=lambda x: None)
-    except json.JSONDecodeError:
-        # if not, it's probably base64 encoded from other libraries
-        data = base64_to_json(data)
+    data = decode_payload(data, compression)
+    if request.content_type == "application/json" and not compression and isinstance(data, dict):
+        data_res["body"] = data
     data_res["data"] = data
     # FIXME: data can also be an array, function assumes it's either None or a dictionary.
     return data_res